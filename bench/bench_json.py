@@ -0,0 +1,113 @@
+#!/usr/bin/env python3.9
+"""
+Measure the CPU time taken to decode one page of tickets for the ticket list, at 25 and
+100 tickets per page, with each JSON backend available to `main.upstream.json_decoding`,
+against the previous path: `requests.Response.json()` followed by `summarize_batch()`.
+
+The pages are generated by the local fake Zendesk API, with extra custom fields on each
+ticket, as Zendesk accounts commonly define, to weigh the fields the list never reads.
+
+Run from the project repository root:
+    python3.9 -m bench.bench_json [--custom-fields 20] [--repeat 5] [--number 200]
+"""
+
+import argparse
+import json
+import sys
+import time
+import timeit
+from functools import partial
+from typing import Callable
+
+import requests
+
+from bench.fake_zendesk import FakeZendesk
+from main.upstream.json_decoding import BACKENDS, decode_ticket_page
+from main.upstream.ticket_summary import summarize_batch
+
+# the page sizes measured: the web UI's, and the largest the API allows
+PAGE_SIZES: tuple[int, ...] = (25, 100)
+
+
+def page_body(tickets: list[dict], custom_fields: int) -> bytes:
+    """
+    Return the body of a `/tickets.json` response holding the tickets, each given
+    `custom_fields` custom field values.
+    """
+    return json.dumps({
+        "tickets": [
+            {**ticket, "custom_fields": [
+                {"id": 360000000000 + i, "value": f"value {i}"} for i in range(custom_fields)
+            ]}
+            for ticket in tickets
+        ],
+        "meta": {"has_more": True, "after_cursor": "a", "before_cursor": "b"},
+        "links": {
+            "prev": "https://example.zendesk.com/api/v2/tickets.json?page[before]=b",
+            "next": "https://example.zendesk.com/api/v2/tickets.json?page[after]=a",
+        },
+    }).encode()
+
+
+def requests_json(body: bytes) -> Callable[[], object]:
+    """
+    Return a function decoding the body as the app did before: through a
+    `requests.Response`, then summarised.
+    """
+    def decode() -> object:
+        response: requests.Response = requests.Response()
+        response._content = body
+        response.headers['Content-Type'] = 'application/json'
+        return summarize_batch(response.json())
+    return decode
+
+
+def cpu_time(decode: Callable[[], object], repeat: int, number: int) -> float:
+    """
+    Return the least CPU time in seconds taken by one call of `decode`, over `repeat`
+    runs of `number` calls, with the garbage collector paused as `timeit` does.
+    """
+    return min(
+        timeit.repeat(decode, timer=time.process_time, repeat=repeat, number=number)
+    ) / number
+
+
+def main() -> int:
+    """
+    Decode pages of each size with each decoder, and print the CPU time per page and the
+    saving against the previous path.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--custom-fields', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+
+    tickets: list[dict] = FakeZendesk(tickets=max(PAGE_SIZES)).tickets
+    print(f"JSON backends: {', '.join(BACKENDS)}; {args.custom_fields} custom fields")
+    print(f"{'tickets':>8} {'page KiB':>9} {'decoder':>22} {'us/page':>9} {'saving':>7}")
+
+    for size in PAGE_SIZES:
+        body: bytes = page_body(tickets[:size], args.custom_fields)
+        decoders: dict[str, Callable[[], object]] = {
+            'response.json()': requests_json(body),
+            **{
+                f'decode_ticket_page/{name}': partial(decode_ticket_page, body, name)
+                for name in BACKENDS
+            },
+        }
+
+        baseline: float = 0.0
+        for name, decode in decoders.items():
+            seconds: float = cpu_time(decode, args.repeat, args.number)
+            baseline = baseline or seconds
+            print(
+                f"{size:>8} {len(body) / 1024:>9.1f} {name:>22} {seconds * 1e6:>9.1f} "
+                f"{(1 - seconds / baseline) * 100:>6.0f}%"
+            )
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3.9
+"""
+Drive the app end to end against the local fake Zendesk API with many concurrent
+simulated agents, and report the latency percentiles, throughput and upstream calls of
+each user action. Runs offline; the app and the fake API are both served locally.
+
+Each agent opens the ticket list, pages forward and back through it, then opens the
+details of tickets on its page. The actions run in phases, all agents taking one kind of
+action at a time, so that the upstream calls of each phase are those of its action.
+
+Run from the project repository root:
+    python3.9 -m bench.bench_load [--agents 20] [--rounds 5] [--latency 0.05]
+                                  [--async-views] [--max-p95 MS]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Callable
+
+import requests
+from werkzeug.serving import make_server
+
+from bench.fake_zendesk import FakeZendesk, QuietRequestHandler
+from main.app import create_app
+
+# the ticket URLs of the ticket list, as passed to the details modal
+TICKET_URL_PATTERN: re.Pattern = re.compile(r"ticketDetails\('([^']+)'\)")
+
+
+def percentile(samples: list[float], p: float) -> float:
+    """
+    Return the `p`-th percentile of the samples by the nearest-rank method, or 0 if
+    there are none.
+    """
+    if not samples:
+        return 0.0
+
+    ordered: list[float] = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))]
+
+
+class Agent:
+    """
+    A simulated agent browsing the app in its own session.
+    """
+
+    def __init__(self, app_url: str, seed: int) -> None:
+        """
+        Start a session with the app at `app_url`.
+        """
+        self.app_url: str = app_url
+        self.http: requests.Session = requests.Session()
+        self.random: random.Random = random.Random(seed)
+        self.ticket_urls: list[str] = []
+
+    def index(self) -> bool:
+        """
+        Open the ticket list, and remember the tickets it lists.
+        """
+        response = self.http.get(self.app_url + '/')
+        self.ticket_urls = TICKET_URL_PATTERN.findall(response.text) or self.ticket_urls
+        return response.status_code == 200
+
+    def navigate(self, direction: str) -> bool:
+        """
+        Page to the previous or next batch of tickets, and remember the tickets it lists.
+        """
+        response = self.http.get(
+            self.app_url + '/navigate', params={'direction': direction}
+        )
+        if response.status_code != 200:
+            return False
+        tickets_html: str = response.json()['tickets_html']
+        self.ticket_urls = TICKET_URL_PATTERN.findall(tickets_html) or self.ticket_urls
+        return True
+
+    def ticket_details(self) -> bool:
+        """
+        Open the details of one of the tickets on the current page.
+        """
+        response = self.http.get(
+            self.app_url + '/ticket_details',
+            params={'ticket_url': self.random.choice(self.ticket_urls)}
+        )
+        return response.status_code == 200 and 'Failed' not in response.text
+
+
+def run_phase(agents: list[Agent], action: Callable[[Agent], bool], count: int) -> dict:
+    """
+    Let every agent take `action` `count` times, all agents concurrently, and return the
+    latencies of the actions in seconds, the number that failed, and the wall time.
+    """
+    latencies: list[float] = []
+    failures: list[int] = []
+    lock: threading.Lock = threading.Lock()
+
+    def browse(agent: Agent) -> None:
+        for _ in range(count):
+            start: float = time.perf_counter()
+            try:
+                ok: bool = action(agent)
+            except requests.RequestException:
+                ok = False
+            elapsed: float = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    failures.append(1)
+
+    threads: list[threading.Thread] = [
+        threading.Thread(target=browse, args=(agent,)) for agent in agents
+    ]
+    start: float = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'latencies': latencies,
+        'failures': len(failures),
+        'wall': time.perf_counter() - start,
+    }
+
+
+def main() -> int:
+    """
+    Serve the fake Zendesk API and the app, run the phases, and print their results.
+    Return a non-zero exit status if an action failed, or if a phase's p95 latency
+    exceeds `--max-p95`.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--agents', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--tickets', type=int, default=500)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help="upstream latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.02,
+                        help="upstream latency jitter in seconds")
+    parser.add_argument('--rate-limit', type=int, default=0,
+                        help="upstream requests per minute; unlimited if 0")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="fraction of upstream requests failing with 503")
+    parser.add_argument('--async-views', action='store_true')
+    parser.add_argument('--max-p95', type=float, default=0.0,
+                        help="fail if a phase's p95 latency exceeds this, in ms")
+    args = parser.parse_args()
+
+    fake: FakeZendesk = FakeZendesk(
+        tickets=args.tickets, users=args.users, latency=args.latency, jitter=args.jitter,
+        rate_limit=args.rate_limit, error_rate=args.error_rate,
+    )
+
+    # the process-wide upstream rate limit is read from the environment on first use
+    os.environ['ZENDESK_API_RATE_LIMIT'] = str(args.rate_limit or 100000)
+    app = create_app({
+        'API_URL_ROOT': fake.start(),
+        'AUTH_TUPLE': ('agent@example.com/token', 'bench'),
+        'ASYNC_VIEWS': args.async_views,
+        'SECRET_KEY': 'bench',
+    })
+
+    server = make_server(
+        '127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    app_url: str = f"http://127.0.0.1:{server.server_port}"
+    agents: list[Agent] = [Agent(app_url, seed) for seed in range(args.agents)]
+
+    phases: list[tuple[str, Callable[[Agent], bool], int]] = [
+        ('index', Agent.index, 1),
+        ('navigate next', lambda agent: agent.navigate('next'), args.rounds),
+        ('navigate prev', lambda agent: agent.navigate('prev'), args.rounds),
+        ('ticket_details', Agent.ticket_details, args.rounds),
+    ]
+
+    print(
+        f"agents: {args.agents}, rounds: {args.rounds}, upstream latency: "
+        f"{args.latency * 1000:.0f}+{args.jitter * 1000:.0f} ms, "
+        f"views: {'async' if args.async_views else 'sync'}"
+    )
+    print(
+        f"{'action':>15} {'count':>6} {'failed':>6} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'req/s':>8} {'upstream/action':>16}"
+    )
+    status: int = 0
+    for name, action, count in phases:
+        fake.reset_stats()
+        result: dict = run_phase(agents, action, count)
+        latencies: list[float] = result['latencies']
+        upstream: int = fake.stats().get('total', 0)
+        p95: float = percentile(latencies, 95) * 1000
+        print(
+            f"{name:>15} {len(latencies):>6} {result['failures']:>6} "
+            f"{percentile(latencies, 50) * 1000:>8.1f} {p95:>8.1f} "
+            f"{percentile(latencies, 99) * 1000:>8.1f} "
+            f"{len(latencies) / result['wall']:>8.1f} "
+            f"{upstream / max(1, len(latencies)):>16.2f}"
+        )
+        if result['failures'] or (args.max_p95 and p95 > args.max_p95):
+            status = 1
+
+    server.shutdown()
+    fake.stop()
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3.9
+"""
+Measure the memory held by one cached batch of tickets, as full ticket payloads decoded
+from the Zendesk API and as TicketSummary records, along with the memory the batch cache
+of many sessions would hold.
+
+Run from the project repository root:
+    python3.9 -m bench.bench_ticket_memory [--page-size 25] [--sessions 1000]
+"""
+
+import argparse
+import json
+import tracemalloc
+from typing import Callable
+
+from main.upstream.ticket_summary import summarize_batch
+
+
+def make_ticket(ticket_id: int) -> dict:
+    """
+    Build a ticket shaped like a `/tickets.json` ticket, with a typical description,
+    via metadata and a handful of custom fields.
+    """
+    return {
+        "url": f"https://example.zendesk.com/api/v2/tickets/{ticket_id}.json",
+        "id": ticket_id,
+        "external_id": None,
+        "via": {
+            "channel": "email",
+            "source": {
+                "from": {"address": "customer@example.com", "name": "A Customer"},
+                "to": {"name": "Example", "address": "support@example.zendesk.com"},
+                "rel": None,
+            },
+        },
+        "created_at": "2021-11-28T03:59:12Z",
+        "updated_at": "2021-11-28T03:59:12Z",
+        "type": "incident",
+        "subject": f"Cannot log in to my account after the latest update ({ticket_id})",
+        "raw_subject": f"Cannot log in to my account after the latest update ({ticket_id})",
+        "description": "Hello,\n\n" + "I am unable to log in since this morning. " * 12,
+        "priority": "normal",
+        "status": "open",
+        "recipient": "support@example.zendesk.com",
+        "requester_id": 1524028554601,
+        "submitter_id": 1524028554601,
+        "assignee_id": 1524028553881,
+        "organization_id": 1500454387541,
+        "group_id": 1500002268001,
+        "collaborator_ids": [],
+        "follower_ids": [],
+        "email_cc_ids": [],
+        "forum_topic_id": None,
+        "problem_id": None,
+        "has_incidents": False,
+        "is_public": True,
+        "due_at": None,
+        "tags": ["login", "account", "urgent"],
+        "custom_fields": [
+            {"id": 1500004187621 + i, "value": None} for i in range(8)
+        ],
+        "satisfaction_rating": None,
+        "sharing_agreement_ids": [],
+        "fields": [{"id": 1500004187621 + i, "value": None} for i in range(8)],
+        "followup_ids": [],
+        "ticket_form_id": 1500001474981,
+        "brand_id": 1500001263541,
+        "allow_channelback": False,
+        "allow_attachments": True,
+    }
+
+
+def measure(build: Callable[[], object]) -> int:
+    """
+    Return the number of bytes still allocated by `build()` once it returns, i.e. held
+    by the object it built.
+    """
+    tracemalloc.start()
+    obj: object = build()
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+
+    return size
+
+
+def main() -> None:
+    """
+    Print the memory held by one batch of each kind, and by the batch cache of the given
+    number of sessions, each holding a window of three batches.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--page-size', type=int, default=25)
+    parser.add_argument('--sessions', type=int, default=1000)
+    args = parser.parse_args()
+
+    # each batch is decoded from its own response body, as it is upstream
+    body: bytes = json.dumps({
+        "tickets": [make_ticket(i) for i in range(1, args.page_size + 1)],
+        "links": {"prev": None, "next": None},
+    }).encode()
+
+    results: dict = {
+        'full payload': measure(lambda: json.loads(body)),
+        'TicketSummary': measure(lambda: summarize_batch(json.loads(body))),
+    }
+
+    print(f"page size: {args.page_size}, sessions: {args.sessions}")
+    for name, size in results.items():
+        print(
+            f"{name:>14}: {size / 1024:8.1f} KiB per batch, "
+            f"{size * 3 * args.sessions / 1024 ** 2:8.1f} MiB for all sessions"
+        )
+    print(f"{'reduction':>14}: {results['full payload'] / results['TicketSummary']:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
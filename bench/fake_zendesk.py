@@ -0,0 +1,371 @@
+#!/usr/bin/env python3.9
+"""
+A local stand-in for the parts of the Zendesk API this project uses, so that the app can
+be exercised end to end, and benchmarked, without network access or a Zendesk account.
+It serves generated tickets and users with configurable latency, rate limit and error
+injection, answers conditional requests with 304, and counts the calls it receives.
+
+Endpoints, under `/api/v2`:
+    - GET /tickets.json                 cursor pagination with page[size], page[after]
+                                        and page[before]
+    - GET /tickets/{id}.json            include=users sideloads the ticket's users
+    - GET /tickets/show_many.json       ids= comma-separated ticket ids
+    - GET /users/{id}.json
+    - GET /users/show_many.json         ids= comma-separated user ids
+
+To run it on its own, from the project repository root:
+    python3.9 -m bench.fake_zendesk [--port 8765] [--tickets 500] [--latency 0.05]
+then point the app at it with ZENDESK_API_URL_ROOT=http://127.0.0.1:8765/api/v2
+
+Public methods:
+    - FakeZendesk(tickets: int = 500, users: int = 20, latency: float = 0.0,
+                  jitter: float = 0.0, rate_limit: int = 0, error_rate: float = 0.0,
+                  seed: int = 0)
+    - FakeZendesk.start(host: str = '127.0.0.1', port: int = 0) -> str
+    - FakeZendesk.stop() -> None
+    - FakeZendesk.stats() -> dict[str, int]
+    - FakeZendesk.reset_stats() -> None
+    - QuietRequestHandler
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from flask import Flask, Response, request
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, make_server
+
+# the largest page Zendesk serves, and the most ids a show_many request may name
+MAX_PAGE_SIZE: int = 100
+
+TICKET_STATUSES: tuple = ('new', 'open', 'pending', 'hold', 'solved', 'closed')
+TICKET_TAGS: tuple = ('billing', 'login', 'bug', 'vip', 'refund', 'feature')
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """
+    A request handler that does not log every request, which would slow down and drown
+    out a benchmark.
+    """
+
+    def log_request(self, *args, **kwargs) -> None:
+        pass
+
+
+class FakeZendesk:
+    """
+    A Flask app mimicking the Zendesk tickets and users endpoints over a fixed set of
+    generated records, served by a threaded server in a background thread. Every call
+    sleeps `latency` seconds plus up to `jitter` seconds, is answered with 429 once
+    `rate_limit` calls were made within the current minute (unlimited if 0), and fails
+    with 503 at random with probability `error_rate`.
+    """
+
+    def __init__(
+        self,
+        tickets: int = 500,
+        users: int = 20,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit: int = 0,
+        error_rate: float = 0.0,
+        seed: int = 0
+    ) -> None:
+        """
+        Generate `tickets` tickets, with ids counting from 1, whose requesters and
+        assignees are drawn from `users` users, and configure the server's behaviour.
+        """
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.rate_limit: int = rate_limit
+        self.error_rate: float = error_rate
+        self._random: random.Random = random.Random(seed)
+
+        self.users: dict[int, dict] = {
+            user_id: self._make_user(user_id) for user_id in range(1, users + 1)
+        }
+        self.tickets: list[dict] = [
+            self._make_ticket(ticket_id, users) for ticket_id in range(1, tickets + 1)
+        ]
+        self._tickets_by_id: dict[int, dict] = {t['id']: t for t in self.tickets}
+
+        self._lock: threading.Lock = threading.Lock()
+        self._calls: Counter = Counter()
+        self._window: tuple[int, int] = (0, 0)  # (minute, calls made within it)
+        self._server: Optional[BaseWSGIServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.url_root: str = ''
+
+        self.app: Flask = Flask(__name__)
+        self._add_routes()
+
+    def _make_user(self, user_id: int) -> dict:
+        """
+        Return a user shaped like a `/users/{id}.json` user.
+        """
+        return {
+            "id": user_id,
+            "url": f"/api/v2/users/{user_id}.json",
+            "name": f"Agent {user_id}",
+            "email": f"agent{user_id}@example.com",
+            "created_at": "2021-11-24T20:56:30Z",
+            "updated_at": "2021-11-30T07:45:33Z",
+            "time_zone": "Eastern Time (US & Canada)",
+            "role": "agent",
+            "active": True,
+            "user_fields": {},
+        }
+
+    def _make_ticket(self, ticket_id: int, users: int) -> dict:
+        """
+        Return a ticket shaped like a `/tickets.json` ticket, with a random status, tags,
+        requester and assignee.
+        """
+        return {
+            "url": f"/api/v2/tickets/{ticket_id}.json",
+            "id": ticket_id,
+            "via": {"channel": "email", "source": {"from": {}, "to": {}, "rel": None}},
+            "created_at": "2021-11-27T07:00:17Z",
+            "updated_at": f"2021-11-28T{ticket_id // 3600 % 24:02}:"
+                          f"{ticket_id // 60 % 60:02}:{ticket_id % 60:02}Z",
+            "subject": f"Sample ticket {ticket_id}: cannot log in after the update",
+            "description": "Hello,\n\n" + "I cannot log in since this morning. " * 8,
+            "priority": "normal",
+            "status": self._random.choice(TICKET_STATUSES),
+            "requester_id": self._random.randint(1, users),
+            "submitter_id": 1,
+            "assignee_id": self._random.randint(1, users),
+            "tags": self._random.sample(TICKET_TAGS, 2),
+            "custom_fields": [],
+            "is_public": True,
+        }
+
+    def _absolute(self, record: dict) -> dict:
+        """
+        Return a copy of a ticket or user whose `url` is absolute, as Zendesk's are.
+        """
+        return {**record, 'url': self.url_root + record['url'][len('/api/v2'):]}
+
+    def _count(self, endpoint: str) -> Optional[Response]:
+        """
+        Count a call to `endpoint`, wait out the configured latency, and return the 429
+        or 503 response the call is answered with, if any.
+        """
+        minute: int = int(time.time() // 60)
+        with self._lock:
+            self._calls[endpoint] += 1
+            self._calls['total'] += 1
+            calls_this_minute: int = \
+                self._window[1] + 1 if self._window[0] == minute else 1
+            self._window = (minute, calls_this_minute)
+            error: bool = self._random.random() < self.error_rate
+
+        time.sleep(self.latency + self._random.uniform(0.0, self.jitter))
+
+        if request.authorization is None:
+            return self._json({"error": "Couldn't authenticate you"}, 401)
+        if self.rate_limit and calls_this_minute > self.rate_limit:
+            with self._lock:
+                self._calls['429'] += 1
+            response: Response = self._json({"error": "APIRateLimitExceeded"}, 429)
+            response.headers['Retry-After'] = str(60 - int(time.time()) % 60)
+            return response
+        if error:
+            with self._lock:
+                self._calls['503'] += 1
+            return self._json({"error": "ServiceUnavailable"}, 503)
+
+        return None
+
+    def _json(self, body: dict, status: int = 200) -> Response:
+        """
+        Return a JSON response with a weak ETag and the rate limit headers, or a 304
+        response if the client already holds the body.
+        """
+        data: bytes = json.dumps(body).encode()
+        response: Response = Response(data, status=status, mimetype='application/json')
+        if status == 200:
+            response.set_etag(hashlib.sha256(data).hexdigest()[:16], weak=True)
+            response.make_conditional(request)
+        if self.rate_limit:
+            response.headers['X-Rate-Limit'] = str(self.rate_limit)
+            response.headers['X-Rate-Limit-Remaining'] = \
+                str(max(0, self.rate_limit - self._window[1]))
+        return response
+
+    @staticmethod
+    def _cursor(ticket_id: int) -> str:
+        """
+        Return the opaque cursor pointing at a ticket.
+        """
+        return base64.urlsafe_b64encode(f'id:{ticket_id}'.encode()).decode()
+
+    @staticmethod
+    def _cursor_id(cursor: str) -> int:
+        """
+        Return the ticket id a cursor points at.
+        """
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode().split(':')[1])
+
+    @staticmethod
+    def _ids_arg() -> list[int]:
+        """
+        Return the ticket or user ids named by the `ids` argument of the request.
+        """
+        ids: list[str] = request.args.get('ids', '').split(',')
+        return [int(i) for i in ids if i][:MAX_PAGE_SIZE]
+
+    def _tickets_page(self) -> Response:
+        """
+        Serve a page of tickets in ascending id order after or before a cursor, with the
+        cursors and links of its neighbouring pages, as `/tickets.json` does.
+        """
+        if response := self._count('tickets'):
+            return response
+
+        size: int = min(int(request.args.get('page[size]', MAX_PAGE_SIZE)), MAX_PAGE_SIZE)
+        if before := request.args.get('page[before]'):
+            older: list = [t for t in self.tickets if t['id'] < self._cursor_id(before)]
+            page: list = older[-size:]
+            has_more: bool = len(older) > size
+        else:
+            after: int = self._cursor_id(request.args['page[after]']) \
+                if request.args.get('page[after]') else 0
+            newer: list = [t for t in self.tickets if t['id'] > after]
+            page = newer[:size]
+            has_more = len(newer) > size
+
+        # pages past either end are empty and link nowhere
+        links: dict = {"prev": None, "next": None}
+        meta: dict = {"has_more": has_more, "after_cursor": None, "before_cursor": None}
+        if page:
+            meta['before_cursor'] = self._cursor(page[0]['id'])
+            meta['after_cursor'] = self._cursor(page[-1]['id'])
+            page_url: str = self.url_root + f"/tickets.json?page%5Bsize%5D={size}"
+            links['prev'] = page_url + f"&page%5Bbefore%5D={meta['before_cursor']}"
+            links['next'] = page_url + f"&page%5Bafter%5D={meta['after_cursor']}"
+
+        return self._json({
+            "tickets": [self._absolute(t) for t in page], "meta": meta, "links": links,
+        })
+
+    def _not_found(self) -> Response:
+        """
+        Return Zendesk's response for a missing record.
+        """
+        return self._json({"error": "RecordNotFound", "description": "Not found"}, 404)
+
+    def _add_routes(self) -> None:
+        """
+        Register the endpoints on the app.
+        """
+        self.app.add_url_rule(
+            '/api/v2/tickets.json', 'tickets', self._tickets_page
+        )
+
+        @self.app.route('/api/v2/tickets/show_many.json')
+        def tickets_show_many() -> Response:
+            if response := self._count('tickets/show_many'):
+                return response
+            return self._json({"tickets": [
+                self._absolute(self._tickets_by_id[i])
+                for i in self._ids_arg() if i in self._tickets_by_id
+            ]})
+
+        @self.app.route('/api/v2/tickets/<int:ticket_id>.json')
+        def ticket(ticket_id: int) -> Response:
+            if response := self._count('ticket'):
+                return response
+            if ticket_id not in self._tickets_by_id:
+                return self._not_found()
+            body: dict = {"ticket": self._absolute(self._tickets_by_id[ticket_id])}
+            if request.args.get('include') == 'users':
+                user_ids: set = {
+                    body['ticket']['requester_id'], body['ticket']['assignee_id']
+                }
+                body['users'] = [self._absolute(self.users[i]) for i in sorted(user_ids)]
+            return self._json(body)
+
+        @self.app.route('/api/v2/users/show_many.json')
+        def users_show_many() -> Response:
+            if response := self._count('users/show_many'):
+                return response
+            return self._json({"users": [
+                self._absolute(self.users[i]) for i in self._ids_arg() if i in self.users
+            ]})
+
+        @self.app.route('/api/v2/users/<int:user_id>.json')
+        def user(user_id: int) -> Response:
+            if response := self._count('user'):
+                return response
+            if user_id not in self.users:
+                return self._not_found()
+            return self._json({"user": self._absolute(self.users[user_id])})
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """
+        Serve the app in a background thread on the given port, or a free one if 0, and
+        return the API URL root to point the app at.
+        """
+        server: BaseWSGIServer = make_server(
+            host, port, self.app, threaded=True, request_handler=QuietRequestHandler
+        )
+        self._server = server
+        self.url_root = f"http://{host}:{server.server_port}/api/v2"
+        self._thread = threading.Thread(
+            target=server.serve_forever, name='fake-zendesk', daemon=True
+        )
+        self._thread.start()
+        return self.url_root
+
+    def stop(self) -> None:
+        """
+        Stop serving.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the number of calls received so far by endpoint, in total, and answered
+        with 429 or 503.
+        """
+        with self._lock:
+            return dict(self._calls)
+
+    def reset_stats(self) -> None:
+        """
+        Forget the calls received so far.
+        """
+        with self._lock:
+            self._calls.clear()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--tickets', type=int, default=500)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake: FakeZendesk = FakeZendesk(
+        tickets=args.tickets, users=args.users, latency=args.latency, jitter=args.jitter,
+        rate_limit=args.rate_limit, error_rate=args.error_rate,
+    )
+    print(f"Serving a fake Zendesk API at {fake.start(port=args.port)}; Ctrl-C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake.stop()
@@ -1,81 +1,522 @@
 #!/usr/bin/env python3.9
 """
-Main application entry point. Serves the following endpoints:
+Main application entry point. `create_app()` builds the app, which serves the following
+endpoints:
     - GET /                                 renders and returns the web UI HTML templates
-    - GET /navigate         direction=      navigation direction, either "prev" or "next"
+    - GET /navigate         direction=      navigation direction, either "prev" or "next";
+                                            returns the navigated page's HTML fragments
     - GET /ticket_details   ticket_url=     URL of the ticket whose details are requested
+    - GET /export           format=         "ndjson" (default) or "csv"; streams every
+                                            ticket, as a file download
+    - GET /metrics                          returns the app's metrics in the Prometheus
+                                            text format, unless ZENDESK_METRICS is "0"
+
+`/`, `/navigate` and `/export` also accept the following optional arguments, which filter and
+sort the ticket list if it is served from the ticket mirror:
+    - status=   only list tickets of this status, e.g. "open"
+    - tag=      only list tickets with this tag
+    - sort=     "id", "updated_at", or either prefixed with "-" for descending order
+
+If the ZENDESK_ASYNC_VIEWS environment variable is set to "1", these endpoints are served
+by async views whose upstream requests go through the asynchronous HTTP client.
+
+If the ZENDESK_MIRROR_DB_PATH environment variable is set, the ticket list is served from
+a local SQLite mirror at that path, kept up to date by a background sync thread unless
+ZENDESK_MIRROR_SYNC is set to "0". Until the mirror has completed its first full sync, the
+ticket list is served from the Zendesk API, and filtered or sorted requests are answered
+with 503 Service Unavailable.
+
+If the ZENDESK_PREFETCH_DETAILS environment variable is set to "1", the details of the
+tickets on each served page are fetched in the background, so that opening them is
+served from a shared cache.
+
+If the ZENDESK_STREAM_INDEX environment variable is set to "1", `/` is streamed: the page
+shell is sent before the tickets are fetched, and the ticket list before its neighbours.
+This requires a server-side state backend, since the session cookie is sent before the
+page; streamed pages carry no ETag, and their Server-Timing header only covers the time
+before the first byte. The async views are never streamed.
+
+If the ZENDESK_WARM_UP environment variable is set to "1", the app opens its upstream
+connection pool and primes the first batch of tickets and the shared user and details
+caches before `create_app()` returns it, i.e. before the worker accepts traffic.
+
+Every key of `app.config` set from these variables can instead be given to
+`create_app()`, e.g. by tests. The Zendesk API URL root and credentials are only read
+from `zendesk_common` if they are not given, so importing this module needs no
+configuration. The app configured by the environment variables alone is built on first
+access of `main.app.app`.
+
+Public methods:
+    - default_config() -> dict
+    - create_app(config: Optional[dict] = None) -> Flask
+    - warm_up(app: Flask) -> None
 """
 
+import os
 import secrets
-from flask import Flask, render_template, request, make_response, jsonify, session
+import threading
+import time
+from typing import Optional
+
+from flask import Flask, Response, abort, current_app, request, make_response, jsonify, \
+    session, after_this_request, stream_with_context
+
+from main.export import EXPORT_FORMATS, export_body
+from main.metrics import init_metrics
+from main.profiling import init_profiling
+from main.server_timing import init_server_timing, timed_render_template
+from main.http_caching import init_http_caching, not_modified, tree_version, view_etag, \
+    with_etag
+from main.upstream import zendesk_common
+from main.upstream.all_tickets import AllTickets, AsyncAllTickets, EXPORT_PAGE_SIZE
+from main.upstream.ticket_details import TicketDetails, AsyncTicketDetails, \
+    TicketDetailsPrefetcher, details_cache, user_cache
+from main.upstream.ticket_mirror import TicketMirror, MirrorSync, normalize_query
+from main.sessions import SessionStore
+from main.state_backends import StateBackend, make_state_backend
+
+
+def default_config() -> dict:
+    """
+    Return the configuration of the app read from the environment variables, with the
+    defaults of those that are not set.
+    """
+    return {
+        # configure session cookie for Flask; worker processes serving the same sessions
+        # must share the secret key, so it can be provided by FLASK_SECRET_KEY
+        'SECRET_KEY': os.getenv("FLASK_SECRET_KEY") or secrets.token_urlsafe(nbytes=64),
+        'SESSION_COOKIE_SAMESITE': "Lax",
+
+        # break down the time of every response in a Server-Timing header, and profile
+        # requests sampled at random or carrying a signed profiling token (see
+        # main/profiling.py)
+        'SERVER_TIMING': os.getenv("ZENDESK_SERVER_TIMING", "1") == "1",
+        'PROFILE_SAMPLE_RATE': float(os.getenv("ZENDESK_PROFILE_SAMPLE_RATE", "0")),
+        'PROFILE_DIR': os.getenv("ZENDESK_PROFILE_DIR", "profiles"),
+
+        # where each session's navigation state is kept: "cookie", "sqlite" or "memory"
+        'STATE_BACKEND': os.getenv("ZENDESK_STATE_BACKEND", "cookie"),
+        'STATE_DB_PATH': os.getenv("ZENDESK_STATE_DB_PATH", "nav_state.sqlite3"),
+
+        # whether to serve the endpoints with the async views
+        'ASYNC_VIEWS': os.getenv("ZENDESK_ASYNC_VIEWS", "0") == "1",
+
+        # serve the ticket list from a local mirror of the account's tickets, if
+        # configured; when running several worker processes, only one of them should
+        # sync the mirror
+        'MIRROR_DB_PATH': os.getenv("ZENDESK_MIRROR_DB_PATH", ""),
+        'MIRROR_SYNC': os.getenv("ZENDESK_MIRROR_SYNC", "1") == "1",
+        'MIRROR_SYNC_INTERVAL': float(os.getenv("ZENDESK_MIRROR_SYNC_INTERVAL", "60")),
+
+        # warm up the details of the tickets on each served page in the background
+        'PREFETCH_DETAILS': os.getenv("ZENDESK_PREFETCH_DETAILS", "0") == "1",
+
+        # stream the main web UI as its tickets are fetched; the navigation state of a
+        # streamed page is saved after its headers are sent, so it cannot be kept in the
+        # cookie, and streaming is turned off with the cookie backend
+        'STREAM_INDEX': os.getenv("ZENDESK_STREAM_INDEX", "0") == "1",
+
+        # the web UI lists 25 tickets per page; they are requested from the API in
+        # blocks of up to 100, the largest page size, so that browsing through a block
+        # costs one request
+        'PAGE_SIZE': 25,
+        'UPSTREAM_PAGE_SIZE': int(os.getenv("ZENDESK_UPSTREAM_PAGE_SIZE", "100")),
+
+        # bounds for the per-session objects kept in memory
+        'SESSION_STORE_MAXSIZE': 10000,
+        'SESSION_STORE_IDLE_TTL': 30 * 60,
+
+        # serve the upstream, route, cache and session metrics
+        'METRICS_ENDPOINT': os.getenv("ZENDESK_METRICS", "1") == "1",
+
+        # open the upstream connection pool and prime the shared caches before serving
+        'WARM_UP': os.getenv("ZENDESK_WARM_UP", "0") == "1",
+    }
+
+
+class AppServices:
+    """
+    The objects shared by the views of one app, built from its configuration.
+    """
+
+    def __init__(self, app: Flask) -> None:
+        """
+        Build the objects from the app's configuration: the Zendesk API URL root and
+        credentials, the version of its rendered views, the backend keeping each
+        session's navigation state, the ticket mirror and its sync thread and the
+        details prefetcher, if enabled, and the stores of per-session objects.
+        """
+        config = app.config
+        self.api_url_root: str = config['API_URL_ROOT']
+        self.auth_tuple: tuple = config['AUTH_TUPLE']
+
+        # version the ETags of rendered views by the templates and static assets that
+        # render them
+        self.render_version: str = tree_version(
+            os.path.join(app.root_path, app.template_folder), app.static_folder
+        )
+
+        self.state_backend: StateBackend = make_state_backend(
+            config['STATE_BACKEND'], path=config['STATE_DB_PATH'],
+            maxsize=config['SESSION_STORE_MAXSIZE'],
+            idle_ttl=config['SESSION_STORE_IDLE_TTL'],
+        )
+
+        self.ticket_mirror: Optional[TicketMirror] = None
+        if config['MIRROR_DB_PATH']:
+            self.ticket_mirror = TicketMirror(config['MIRROR_DB_PATH'])
+            if config['MIRROR_SYNC']:
+                MirrorSync(
+                    self.ticket_mirror,
+                    api_url_root=self.api_url_root,
+                    auth_tuple=self.auth_tuple,
+                    interval=config['MIRROR_SYNC_INTERVAL'],
+                ).start()
+
+        self.details_prefetcher: Optional[TicketDetailsPrefetcher] = None
+        if config['PREFETCH_DETAILS']:
+            self.details_prefetcher = TicketDetailsPrefetcher(
+                api_url_root=self.api_url_root, auth_tuple=self.auth_tuple
+            )
+
+        # keep track of the AllTickets objects and TicketDetails objects for each
+        # session in memory; each object is identified by a unique session_id. Idle and
+        # least recently used sessions are evicted; the navigation state itself lives in
+        # the state backend.
+        self.allticket_objs: SessionStore = SessionStore(
+            maxsize=config['SESSION_STORE_MAXSIZE'],
+            idle_ttl=config['SESSION_STORE_IDLE_TTL'],
+        )
+        self.ticketdetails_objs: SessionStore = SessionStore(
+            maxsize=config['SESSION_STORE_MAXSIZE'],
+            idle_ttl=config['SESSION_STORE_IDLE_TTL'],
+        )
+
+    def ready_mirror(self) -> Optional[TicketMirror]:
+        """
+        Return the ticket mirror if it has completed a full sync, so that it holds every
+        ticket, or None otherwise, in which case tickets are listed from the API.
+        """
+        if self.ticket_mirror is not None and self.ticket_mirror.is_synced():
+            return self.ticket_mirror
+
+        return None
+
+    def all_tickets(
+        self,
+        config: dict,
+        all_tickets_class: type = AllTickets
+    ) -> AllTickets:
+        """
+        Return a new object of `all_tickets_class` listing the tickets of the account,
+        with the page sizes given in the app's `config`, from the mirror once it is ready.
+        """
+        return all_tickets_class(
+            api_url_root=self.api_url_root, auth_tuple=self.auth_tuple,
+            page_size=config['PAGE_SIZE'],
+            upstream_page_size=config['UPSTREAM_PAGE_SIZE'],
+            mirror=self.ready_mirror()
+        )
+
+
+def services() -> AppServices:
+    """
+    Return the shared objects of the app handling the current request.
+    """
+    return current_app.extensions['zendesk']
+
+
+def session_all_tickets() -> AllTickets:
+    """
+    Return the AllTickets object of the current session, building one if it is not held
+    in memory, because the session is new, was evicted, or was last served by another
+    worker process. Restore its URL pointers from the state backend, since another
+    process may have navigated since this one last served the session.
+    An object built before the ticket mirror completed its first sync is rebuilt to list
+    the tickets from the mirror once it has, starting over from the first batch, since
+    the state saved by the old object addresses the API.
+    """
+    app_services: AppServices = services()
+    all_tickets_class: type = \
+        AsyncAllTickets if current_app.config['ASYNC_VIEWS'] else AllTickets
+    all_tickets: AllTickets = app_services.allticket_objs.get_or_create(
+        session['session_id'],
+        lambda: app_services.all_tickets(current_app.config, all_tickets_class),
+    )
+    if all_tickets.mirror is not app_services.ready_mirror():
+        app_services.allticket_objs.discard(session['session_id'])
+        all_tickets = app_services.allticket_objs.get_or_create(
+            session['session_id'],
+            lambda: app_services.all_tickets(current_app.config, all_tickets_class),
+        )
+
+    if state := app_services.state_backend.load(session['session_id']):
+        all_tickets.set_state(state)
+
+    return all_tickets
+
+
+def session_ticket_details() -> TicketDetails:
+    """
+    Return the TicketDetails object of the current session, building one if the session
+    does not have one.
+    """
+    app_services: AppServices = services()
+    ticket_details_class: type = \
+        AsyncTicketDetails if current_app.config['ASYNC_VIEWS'] else TicketDetails
+    return app_services.ticketdetails_objs.get_or_create(
+        session['session_id'],
+        lambda: ticket_details_class(
+            api_url_root=app_services.api_url_root, auth_tuple=app_services.auth_tuple
+        ),
+    )
+
+
+def request_query() -> dict:
+    """
+    Return the filter and sort query given by the `status`, `tag` and `sort` arguments
+    of the current request. Raise a ValueError if any of them is invalid. Abort with
+    503 Service Unavailable if the query filters or sorts tickets while the ticket mirror
+    has not completed its first sync, so that a partial list is never served.
+    """
+    query: dict = normalize_query(
+        status=request.args.get('status', ''),
+        tag=request.args.get('tag', ''),
+        sort=request.args.get('sort', ''),
+    )
+
+    app_services: AppServices = services()
+    if query != normalize_query() and app_services.ticket_mirror is not None and \
+            app_services.ready_mirror() is None:
+        response: Response = make_response(
+            "The ticket mirror is still syncing; filtering and sorting tickets will be "
+            "available once it has synced every ticket.", 503
+        )
+        response.headers['Retry-After'] = \
+            str(int(current_app.config['MIRROR_SYNC_INTERVAL']))
+        abort(response)
+
+    return query
+
+
+def save_session_state(all_tickets: AllTickets) -> None:
+    """
+    Save the navigation state of the current session's AllTickets object to the state
+    backend.
+    """
+    services().state_backend.save(session['session_id'], all_tickets.get_state())
+
+
+def prefetch_details(current_list: list) -> None:
+    """
+    Once the response to the current request is built, schedule the details of the
+    tickets it lists to be prefetched, if enabled.
+    """
+    prefetcher: Optional[TicketDetailsPrefetcher] = services().details_prefetcher
+    if prefetcher is None or not current_list:
+        return
+
+    @after_this_request
+    def schedule_prefetch(response):
+        """
+        Hand the tickets to the prefetcher's worker threads, without waiting for them.
+        """
+        prefetcher.prefetch(current_list)
+        return response
+
+
+def render_index(query: dict, current_list: list, prev_batch: dict, next_batch: dict):
+    """
+    Render the main web UI for the current batch of tickets, unless the client already
+    holds it: its ETag is derived from the ids and `updated_at` values of the tickets,
+    the availability of their neighbours, and the query that listed them.
+    """
+    etag: str = view_etag(
+        services().render_version, query, [(t.id, t.updated_at) for t in current_list],
+        prev_batch != {}, next_batch != {},
+    )
+    if response := not_modified(etag):
+        return response
+
+    # the tickets are already fetched, so the template's loaders return them as they are
+    return with_etag(make_response(timed_render_template(
+        'index.html',
+        load_current_list=lambda: current_list,
+        load_neighbours=lambda: (prev_batch, next_batch),
+        flush=lambda: '',
+        query=query,
+        filtering=services().ticket_mirror is not None,
+    )), etag)
+
+
+def stream_index(all_tickets: AllTickets) -> Response:
+    """
+    Stream the main web UI: the page shell is sent at once, then the template fetches the
+    current batch of tickets and sends the ticket list, then fetches its neighbours and
+    sends the navigation bars. Flask 2.0 has no `stream_template()`, so the template's
+    output is buffered and sent at each of its `flush()` markers.
+    """
+    prefetcher: Optional[TicketDetailsPrefetcher] = services().details_prefetcher
+
+    # whether the template reached a `flush()` marker since the last chunk was sent
+    flush_pending: list[bool] = [False]
+    current_list: list = []
+
+    def flush() -> str:
+        """
+        Mark the template's output so far to be sent.
+        """
+        flush_pending[0] = True
+        return ''
 
-from main.upstream.zendesk_common import API_URL_ROOT, AUTH_TUPLE
-from main.upstream.all_tickets import AllTickets
-from main.upstream.ticket_details import TicketDetails
+    def load_current_list() -> list:
+        """
+        Fetch the current batch of tickets, and save the new navigation state.
+        """
+        current_list.extend(all_tickets.get_current_batch())
+        save_session_state(all_tickets)
+        return current_list
 
+    def load_neighbours() -> tuple[dict, dict]:
+        """
+        Fetch the neighbours of the current batch concurrently.
+        """
+        neighbours: tuple[dict, dict] = all_tickets.get_neighbours()
+        # the response has already been returned, so prefetch without after_this_request
+        if prefetcher is not None:
+            prefetcher.prefetch(current_list)
+        return neighbours
 
-app = Flask(__name__)
+    context: dict = dict(
+        load_current_list=load_current_list,
+        load_neighbours=load_neighbours,
+        flush=flush,
+        query=all_tickets.query,
+        filtering=services().ticket_mirror is not None,
+    )
+    current_app.update_template_context(context)
+    template = current_app.jinja_env.get_template('index.html')
 
-# configure session cookie for Flask
-app.secret_key = secrets.token_urlsafe(nbytes=64)
-app.config['SESSION_COOKIE_SAMESITE'] = "Lax"
+    def generate():
+        """
+        Render the template, yielding its output at each `flush()` marker.
+        """
+        buffer: list[str] = []
+        for chunk in template.generate(context):
+            buffer.append(chunk)
+            if flush_pending[0]:
+                flush_pending[0] = False
+                yield ''.join(buffer)
+                buffer.clear()
+        yield ''.join(buffer)
 
-# keep track of the AllTickets objects and TicketDetails objects for each session in
-# memory; each object is identified by a unique session_id
-allticket_objs: dict = {}
-ticketdetails_objs: dict = {}
+    return Response(stream_with_context(generate()), mimetype='text/html')
+
+
+def render_ticket_details(ticket: dict):
+    """
+    Render the ticket details modal, unless the client already holds it: its ETag is
+    derived from the ids and `updated_at` values of the ticket and its users. Failures
+    to fetch the ticket are never cached.
+    """
+    if ticket == {}:
+        return timed_render_template('ticket_details.html', ticket=ticket)
+
+    etag: str = view_etag(services().render_version, *(
+        (record.get('id'), record.get('updated_at'))
+        for record in (ticket, ticket['requester'], ticket['assignee'])
+    ))
+    if response := not_modified(etag):
+        return response
+
+    return with_etag(
+        make_response(timed_render_template('ticket_details.html', ticket=ticket)), etag
+    )
+
+
+def navigation_response(current_list: list, prev_batch: dict, next_batch: dict):
+    """
+    Return the response to a successful navigation: a JSON object holding the rendered
+    ticket list and navigation bar fragments of the navigated batch, to be swapped into
+    the page in place, along with whether its previous and next batches exist.
+    """
+    return jsonify(
+        tickets_html=timed_render_template('tickets.html', current_list=current_list),
+        navigation_html=timed_render_template(
+            'navigation.html', prev_batch=prev_batch, next_batch=next_batch
+        ),
+        has_prev=prev_batch != {},
+        has_next=next_batch != {},
+    )
 
 
-@app.route('/', methods=['GET'])
 def index():
     """
     Render and return the main web UI to the frontend.
     Generate a unique session_id if it does not exist.
-    Initialize an AllTickets object to be used during the session.
+    Obtain the AllTickets object to be used during the session.
     """
-    # if a session_id is not found for this session
+    # if a session_id is not found for this session, generate a unique session id
     if 'session_id' not in session:
-        # generate a unique session id
         session['session_id'] = secrets.token_urlsafe(nbytes=64)
 
-        # initialize a new AllTickets object for this session and store in allticket_objs
-        allticket_objs[session['session_id']] = AllTickets(
-            api_url_root=API_URL_ROOT,
-            auth_tuple=AUTH_TUPLE,
-            page_size=25
-        )
+    # list the tickets by the requested filter and sort order, starting over from the
+    # first batch if they changed
+    all_tickets: AllTickets = session_all_tickets()
+    try:
+        all_tickets.set_query(request_query())
+    except ValueError as e:
+        return make_response(str(e), 400)
+
+    # if enabled, send the page shell before fetching the tickets
+    if current_app.config['STREAM_INDEX']:
+        return stream_index(all_tickets)
+
+    # fetch the current batch of tickets, then its neighbours concurrently, before
+    # rendering so that the template itself never triggers upstream requests
+    current_list, prev_batch, next_batch = all_tickets.get_batch_window()
+    save_session_state(all_tickets)
+    prefetch_details(current_list)
 
-    return render_template('index.html', all_tickets=allticket_objs[session['session_id']])
+    return render_index(all_tickets.query, current_list, prev_batch, next_batch)
 
 
-@app.route('/navigate', methods=['GET'])
 def navigate():
     """
     Upon request, navigate to the previous or next batch of tickets within the session's
-    corresponding AllTickets object.
+    corresponding AllTickets object, and return the page fragments to display it.
     Do not permit access to this endpoint without an existing session.
     """
     # only permit access after a session has been established
     if 'session_id' not in session:
         return make_response("Do not access this endpoint directly!", 403)
 
-    # navigate to the specified batch of tickets
+    # navigate to the specified batch of tickets, and save the new navigation state
+    all_tickets: AllTickets = session_all_tickets()
+    try:
+        # navigate from the first batch of a changed query, once its links are known
+        if all_tickets.set_query(request_query()):
+            all_tickets.get_current_batch()
+    except ValueError as e:
+        return make_response(str(e), 400)
     direction: str = request.args.get('direction')
     if direction == 'prev':
-        return_batch: list = allticket_objs[session['session_id']].goto_prev_batch()
+        return_batch: list = all_tickets.goto_prev_batch()
     elif direction == 'next':
-        return_batch: list = allticket_objs[session['session_id']].goto_next_batch()
+        return_batch: list = all_tickets.goto_next_batch()
     else:
         return make_response("'direction' must either be 'prev' or 'next'!", 400)
+    save_session_state(all_tickets)
 
-    # display an error for empty result; if successful, return the navigated batch
+    # display an error for empty result; if successful, fetch the neighbours of the
+    # navigated batch, the one navigated away from being cached, and return its fragments
     if not return_batch:
         return make_response(f"Failed to fetch the {direction} page.", 404)
     else:
-        return jsonify(return_batch)
+        prefetch_details(return_batch)
+        return navigation_response(return_batch, *all_tickets.get_neighbours())
 
 
-@app.route('/ticket_details', methods=['GET'])
 def ticket_details():
     """
     Upon request, generate a TicketDetails object for the user's session if it does not
@@ -89,16 +530,218 @@ def ticket_details():
         return make_response("Do not access this endpoint directly!", 403)
 
     # if the session does not have an associated TicketDetails objects, initialize one
-    if session['session_id'] not in ticketdetails_objs:
-        ticketdetails_objs[session['session_id']] = TicketDetails(
-            api_url_root=API_URL_ROOT,
-            auth_tuple=AUTH_TUPLE,
-        )
+    ticket_details_obj: TicketDetails = session_ticket_details()
 
     # obtain the provided url of the ticket
     ticket_url = request.args.get('ticket_url')
 
     # fetch the ticket's details with associated user information
-    ticket: dict = ticketdetails_objs[session['session_id']].get_ticket(ticket_url)
+    ticket: dict = ticket_details_obj.get_ticket(ticket_url)
+
+    return render_ticket_details(ticket)
+
+
+def export():
+    """
+    Stream every ticket matching the request's filter and sort query, in the requested
+    format, as a file download. Pages of tickets are fetched at the largest page size as
+    the body is sent, the next one while the current one is written, so the export is
+    served in constant memory. It does not use or change the session's navigation state.
+    If a page cannot be fetched, the export ends early with an error row.
+    """
+    # walk the tickets with their own AllTickets object, apart from any session
+    app_services: AppServices = services()
+    all_tickets: AllTickets = AllTickets(
+        api_url_root=app_services.api_url_root, auth_tuple=app_services.auth_tuple,
+        page_size=EXPORT_PAGE_SIZE, mirror=app_services.ready_mirror()
+    )
+    export_format: str = request.args.get('format', 'ndjson')
+    try:
+        all_tickets.set_query(request_query())
+        body = export_body(all_tickets.iter_tickets(), export_format)
+    except ValueError as e:
+        return make_response(str(e), 400)
+
+    _, mimetype, extension, _ = EXPORT_FORMATS[export_format]
+    response: Response = Response(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=tickets.{extension}'
+    return response
+
+
+async def index_async():
+    """
+    The async version of `index()`; awaits the current batch of tickets, then both of its
+    neighbours concurrently.
+    """
+    if 'session_id' not in session:
+        session['session_id'] = secrets.token_urlsafe(nbytes=64)
+
+    all_tickets: AsyncAllTickets = session_all_tickets()
+    try:
+        all_tickets.set_query(request_query())
+    except ValueError as e:
+        return make_response(str(e), 400)
+    current_list, prev_batch, next_batch = await all_tickets.aget_batch_window()
+    save_session_state(all_tickets)
+    prefetch_details(current_list)
+
+    return render_index(all_tickets.query, current_list, prev_batch, next_batch)
+
+
+async def navigate_async():
+    """
+    The async version of `navigate()`.
+    """
+    if 'session_id' not in session:
+        return make_response("Do not access this endpoint directly!", 403)
+
+    all_tickets: AsyncAllTickets = session_all_tickets()
+    try:
+        if all_tickets.set_query(request_query()):
+            await all_tickets.aget_current_batch()
+    except ValueError as e:
+        return make_response(str(e), 400)
+    direction: str = request.args.get('direction')
+    if direction == 'prev':
+        return_batch: list = await all_tickets.agoto_prev_batch()
+    elif direction == 'next':
+        return_batch: list = await all_tickets.agoto_next_batch()
+    else:
+        return make_response("'direction' must either be 'prev' or 'next'!", 400)
+    save_session_state(all_tickets)
+
+    if not return_batch:
+        return make_response(f"Failed to fetch the {direction} page.", 404)
+    else:
+        prefetch_details(return_batch)
+        return navigation_response(return_batch, *await all_tickets.aget_neighbours())
+
+
+async def ticket_details_async():
+    """
+    The async version of `ticket_details()`.
+    """
+    if 'session_id' not in session:
+        return make_response("Do not access this endpoint directly!", 403)
+
+    ticket_details_obj: AsyncTicketDetails = session_ticket_details()
+    ticket: dict = await ticket_details_obj.aget_ticket(request.args.get('ticket_url'))
+
+    return render_ticket_details(ticket)
+
+
+def warm_up(app: Flask) -> None:
+    """
+    Warm the app up before it serves traffic. Request the first batch of tickets, which
+    opens a connection to Zendesk in the upstream pool and leaves the batch's ETag and
+    decoded body in the shared ETag store, so that the first sessions are answered with
+    `304 Not Modified`. Then fetch the details of its tickets and their users into the
+    shared details and user caches. Failures are printed, and never keep the app from
+    starting. The async views' connection pool is opened by their first request.
+    """
+    app_services: AppServices = app.extensions['zendesk']
+    start: float = time.perf_counter()
+
+    try:
+        # the first batch of the default query, as requested by new sessions
+        current_list: list = app_services.all_tickets(app.config).get_current_batch()
+
+        # prime the caches with the details of its tickets and their users
+        prefetcher: TicketDetailsPrefetcher = app_services.details_prefetcher or \
+            TicketDetailsPrefetcher(
+                api_url_root=app_services.api_url_root,
+                auth_tuple=app_services.auth_tuple,
+            )
+        cached: int = prefetcher.prefetch_now(current_list)
+    except Exception as e:
+        # the app serves its first requests cold rather than not starting
+        print(f'---\nWarm-up failed: {e}\n---')
+        return
+
+    print(
+        f"Warmed up in {time.perf_counter() - start:.2f}s: {len(current_list)} tickets "
+        f"listed, {cached} ticket details cached."
+    )
+
+
+def create_app(config: Optional[dict] = None) -> Flask:
+    """
+    Build the app, configured by the environment variables read by `default_config()`,
+    overridden by any keys of `app.config` given in `config`. The Zendesk API URL root
+    and credentials are given as API_URL_ROOT and AUTH_TUPLE, or read from
+    `zendesk_common` otherwise. If WARM_UP is set, warm the app up with `warm_up()`
+    before returning it, so that a new worker does not serve its first requests cold.
+    """
+    app: Flask = Flask(__name__)
+    app.config.update(default_config())
+    app.config.update(config or {})
+
+    # the Zendesk configuration is only read from the environment variables if needed
+    if 'API_URL_ROOT' not in app.config:
+        app.config['API_URL_ROOT'] = zendesk_common.API_URL_ROOT
+    if 'AUTH_TUPLE' not in app.config:
+        app.config['AUTH_TUPLE'] = zendesk_common.AUTH_TUPLE
+    if app.config['STATE_BACKEND'] == "cookie":
+        app.config['STREAM_INDEX'] = False
+
+    # serve static assets at content-hashed URLs and compress responses, break down the
+    # time of every response, and profile requests
+    init_http_caching(app)
+    init_server_timing(app)
+    init_profiling(app)
+
+    app_services: AppServices = AppServices(app)
+    app.extensions['zendesk'] = app_services
+
+    # time every request, and serve the upstream, route, cache and session metrics
+    init_metrics(app, gauges={
+        'app_live_sessions': (
+            "Sessions whose ticket list is held in memory.",
+            lambda: app_services.allticket_objs.live_sessions,
+        ),
+        'app_user_cache_entries': (
+            "User profiles held in the user cache.",
+            lambda: len(user_cache),
+        ),
+        'app_details_cache_entries': (
+            "Prefetched ticket details held in the details cache.",
+            lambda: len(details_cache),
+        ),
+    })
+
+    # serve the endpoints with the async views instead, if enabled
+    async_views: bool = app.config['ASYNC_VIEWS']
+    app.add_url_rule('/', 'index', index_async if async_views else index)
+    app.add_url_rule('/navigate', 'navigate', navigate_async if async_views else navigate)
+    app.add_url_rule(
+        '/ticket_details', 'ticket_details',
+        ticket_details_async if async_views else ticket_details
+    )
+    app.add_url_rule('/export', 'export', export)
+
+    if app.config['WARM_UP']:
+        warm_up(app)
+
+    return app
+
+
+# the app configured by the environment variables alone, built on first access of
+# `main.app.app`, e.g. by `run.py` or `gunicorn 'main.app:app'`
+_app: Optional[Flask] = None
+_app_lock: threading.Lock = threading.Lock()
+
+
+def __getattr__(name: str) -> Flask:
+    """
+    Build the module-level `app` on first access.
+    """
+    global _app
+
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    with _app_lock:
+        if _app is None:
+            _app = create_app()
 
-    return render_template('ticket_details.html', ticket=ticket)
+    return _app
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3.9
+"""
+Serialise a stream of full ticket dicts, as yielded by `AllTickets.iter_tickets()`, into
+the body of a bulk export response, one ticket at a time, so that an export of any size
+is written in constant memory. Rows are gathered into chunks of about `CHUNK_SIZE`
+characters, so that the server does not write to the socket once per ticket.
+
+The supported formats are
+    - ndjson    one JSON object per line, holding every field of the ticket
+    - csv       a header row, then one row per ticket with the columns in CSV_FIELDS;
+                list values such as tags are joined with spaces
+
+By the time a page of tickets fails to be fetched, the response headers and the tickets
+before it have been sent, so the failure cannot be reported by the status code. Instead,
+the export ends with an error row, so that a truncated export can be told from a complete
+one:
+    - ndjson    a last line holding `{"error": "<message>"}`
+    - csv       a last line starting with `# export incomplete: `
+
+Public methods:
+    - ndjson_rows(tickets: Iterable[dict]) -> Iterator[str]
+    - csv_rows(tickets: Iterable[dict]) -> Iterator[str]
+    - ndjson_error(message: str) -> str
+    - csv_error(message: str) -> str
+    - chunked(rows: Iterable[str], size: int = CHUNK_SIZE) -> Iterator[str]
+    - export_body(tickets: Iterable[dict], export_format: str) -> Iterator[str]
+"""
+
+import csv
+import io
+import json
+from typing import Callable, Iterable, Iterator
+
+# the ticket fields exported as CSV columns, in order
+CSV_FIELDS: tuple[str, ...] = (
+    'id', 'url', 'subject', 'status', 'priority', 'type', 'requester_id',
+    'assignee_id', 'organization_id', 'group_id', 'tags', 'created_at', 'updated_at',
+)
+
+# the number of characters gathered before a chunk of the body is sent
+CHUNK_SIZE: int = 64 * 1024
+
+
+def ndjson_rows(tickets: Iterable[dict]) -> Iterator[str]:
+    """
+    Yield each ticket as one line of JSON.
+    """
+    for ticket in tickets:
+        yield json.dumps(ticket, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def csv_rows(tickets: Iterable[dict]) -> Iterator[str]:
+    """
+    Yield the CSV header row, then one row per ticket, reusing one small buffer.
+    """
+    buffer: io.StringIO = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def row(values: Iterable) -> str:
+        """
+        Return the values formatted as one CSV row, and empty the buffer.
+        """
+        writer.writerow(values)
+        text: str = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    yield row(CSV_FIELDS)
+    for ticket in tickets:
+        yield row(
+            ' '.join(map(str, value)) if isinstance(value, list) else value
+            for value in (ticket.get(field) for field in CSV_FIELDS)
+        )
+
+
+def ndjson_error(message: str) -> str:
+    """
+    Return the NDJSON line ending an export that failed with the given message.
+    """
+    return json.dumps({'error': message}, ensure_ascii=False) + '\n'
+
+
+def csv_error(message: str) -> str:
+    """
+    Return the CSV line ending an export that failed with the given message; no ticket
+    row starts with "#".
+    """
+    return f'# export incomplete: {message}\r\n'
+
+
+def _ending_with_error(
+    rows: Iterable[str],
+    error_row: Callable[[str], str]
+) -> Iterator[str]:
+    """
+    Yield the rows, followed by an error row if producing them raises an exception.
+    """
+    try:
+        yield from rows
+    except Exception as e:
+        print(f'---\n{e}\n---')
+        # the message of a failed page spans several indented lines
+        yield error_row(' '.join(str(e).split()))
+
+
+def chunked(rows: Iterable[str], size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yield the rows joined into chunks of at least `size` characters, except the last.
+    """
+    chunk: list[str] = []
+    length: int = 0
+    for row in rows:
+        chunk.append(row)
+        length += len(row)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk, length = [], 0
+
+    if chunk:
+        yield ''.join(chunk)
+
+
+# the row serialiser, media type, file extension and error row of each export format
+EXPORT_FORMATS: dict[str, tuple[
+    Callable[[Iterable[dict]], Iterator[str]], str, str, Callable[[str], str]
+]] = {
+    'ndjson': (ndjson_rows, 'application/x-ndjson', 'ndjson', ndjson_error),
+    'csv': (csv_rows, 'text/csv', 'csv', csv_error),
+}
+
+
+def export_body(tickets: Iterable[dict], export_format: str) -> Iterator[str]:
+    """
+    Return an iterator over the chunks of the export of the tickets in the given
+    format, ending with an error row if iterating over the tickets raises an exception.
+    Raise a ValueError at once if the format is not supported.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"'format' must be one of: {', '.join(EXPORT_FORMATS)}!")
+
+    rows, _, _, error_row = EXPORT_FORMATS[export_format]
+    return chunked(_ending_with_error(rows(tickets), error_row))
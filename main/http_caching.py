@@ -0,0 +1,268 @@
+#!/usr/bin/env python3.9
+"""
+HTTP caching and compression for the Flask app:
+    - static asset URLs built by `url_for('static', ...)` carry a hash of the file content,
+      and are served with a long-lived immutable `Cache-Control` header
+    - static assets are served from precompressed `.br`/`.gz` variants next to them when
+      the client accepts them; run this module to generate the variants
+    - other responses are compressed on the fly with brotli, if the `brotli` package is
+      installed, or gzip
+    - views derive an ETag from the data they render, and answer 304 without rendering
+      when the client already holds it
+
+To precompress the static assets, run from the project repository root:
+    python3.9 -m main.http_caching
+
+Public methods:
+    - init_http_caching(app: Flask) -> None
+    - static_version(static_folder: str, filename: str) -> str
+    - tree_version(*folders: str) -> str
+    - view_etag(*parts) -> str
+    - not_modified(etag: str) -> Optional[Response]
+    - with_etag(response: Response, etag: str) -> Response
+    - precompress_static(static_folder: str) -> int
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Optional
+
+from flask import Flask, Response, make_response, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; responses are then only gzip-compressed
+    brotli = None
+
+
+# the content encodings this module produces, in order of preference, with the file
+# extension of their precompressed static variants
+ENCODINGS: dict[str, str] = {'br': '.br', 'gzip': '.gz'} if brotli else {'gzip': '.gz'}
+
+# the media types worth compressing; images other than SVG and fonts are already compressed
+COMPRESSIBLE_TYPES: frozenset[str] = frozenset({
+    'text/html', 'text/css', 'text/plain', 'application/javascript', 'text/javascript',
+    'application/json', 'image/svg+xml',
+})
+
+# the file content hashes of static assets, keyed by file path and modification time
+_static_versions: dict[tuple[str, float], str] = {}
+
+
+def static_version(static_folder: str, filename: str) -> str:
+    """
+    Return a short hash of the content of a static asset, to be included in its URL so
+    that the URL changes whenever the file does. Return an empty string if the file does
+    not exist.
+    """
+    path: str = os.path.join(static_folder, filename)
+    try:
+        key: tuple[str, float] = (path, os.path.getmtime(path))
+    except OSError:
+        return ''
+
+    # hash each version of a file once
+    if key not in _static_versions:
+        with open(path, 'rb') as f:
+            _static_versions[key] = hashlib.sha256(f.read()).hexdigest()[:12]
+
+    return _static_versions[key]
+
+
+def tree_version(*folders: str) -> str:
+    """
+    Return a short hash of the content of all files under the given folders, e.g. the
+    templates and static assets, which changes whenever the app's rendering does.
+    """
+    digest = hashlib.sha256()
+    for folder in folders:
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                with open(os.path.join(root, name), 'rb') as f:
+                    digest.update(name.encode() + f.read())
+
+    return digest.hexdigest()[:12]
+
+
+def view_etag(*parts) -> str:
+    """
+    Return an ETag for a view derived from the given parts, e.g. the ids and `updated_at`
+    values of the tickets it renders.
+    """
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+
+def not_modified(etag: str) -> Optional[Response]:
+    """
+    Return a 304 response if the current request's `If-None-Match` header matches the
+    given ETag, so that the view can skip rendering; otherwise return None. Compressed
+    responses carry the ETag as a weak one, so it is compared weakly.
+    """
+    if request.if_none_match.contains_weak(etag):
+        return with_etag(make_response('', 304), etag)
+
+    return None
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    """
+    Set the ETag of a view's response, and let clients cache it privately, as it renders
+    their session's data, as long as they revalidate it on every use.
+    """
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _vary_on_encoding(response: Response) -> None:
+    """
+    Mark the response as varying with the client's `Accept-Encoding` header.
+    """
+    # the Flask type stubs declare `vary` as a string rather than a header set
+    response.vary.add('Accept-Encoding')  # type: ignore[union-attr]
+
+
+def _compress(data: bytes, encoding: str, level: int) -> bytes:
+    """
+    Compress the data with the given content encoding, either "br" or "gzip".
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _is_fresh_variant(path: str, variant: str) -> bool:
+    """
+    Return whether the compressed variant of a static asset exists and was written after
+    the asset was last modified, i.e. whether it still holds the asset's content.
+    """
+    try:
+        return os.path.isfile(variant) and \
+            os.path.getmtime(variant) >= os.path.getmtime(path)
+    except OSError:
+        return False
+
+
+def precompress_static(static_folder: str) -> int:
+    """
+    Write compressed variants of the compressible static assets next to them, at the
+    maximum compression level, and return the number of variants written. Variants that
+    are newer than their asset are kept.
+    """
+    written: int = 0
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            # skip the compressed variants themselves, which share their asset's type
+            path: str = os.path.join(root, name)
+            if name.endswith(('.br', '.gz')) or \
+                    mimetypes.guess_type(name)[0] not in COMPRESSIBLE_TYPES:
+                continue
+
+            for encoding, extension in ENCODINGS.items():
+                variant: str = path + extension
+                if _is_fresh_variant(path, variant):
+                    continue
+                with open(path, 'rb') as f:
+                    data: bytes = _compress(f.read(), encoding, level=11 if brotli else 9)
+                with open(variant, 'wb') as f:
+                    f.write(data)
+                written += 1
+
+    return written
+
+
+def init_http_caching(app: Flask) -> None:
+    """
+    Register the static URL hashing, static caching and compression hooks on the app,
+    configured by the following keys of `app.config`, if set:
+        - STATIC_MAX_AGE        seconds hashed static URLs may be cached (default 1 year)
+        - COMPRESS_MIN_SIZE     smallest response body compressed, in bytes (default 500)
+        - COMPRESS_LEVEL        compression level of dynamic responses (default 6)
+    """
+    app.config.setdefault('STATIC_MAX_AGE', 365 * 24 * 60 * 60)
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    static_folder: str = app.static_folder or ''
+
+    @app.url_defaults
+    def hash_static_url(endpoint: str, values: dict) -> None:
+        """
+        Add the content hash of a static asset to its URL.
+        """
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            if version := static_version(static_folder, values['filename']):
+                values['v'] = version
+
+    @app.before_request
+    def serve_precompressed_static() -> Optional[Response]:
+        """
+        Serve a precompressed variant of the requested static asset, if one exists in an
+        encoding the client accepts. A variant older than its asset, i.e. not regenerated
+        since the asset was edited, is ignored, and the asset is served uncompressed, so
+        that stale content is never cached under the asset's new hashed URL.
+        """
+        if request.endpoint != 'static' or not request.view_args:
+            return None
+
+        filename: str = request.view_args['filename']
+        encoding: Optional[str] = request.accept_encodings.best_match(list(ENCODINGS))
+        if encoding is None:
+            return None
+        variant: str = filename + ENCODINGS[encoding]
+        if not _is_fresh_variant(
+            os.path.join(static_folder, filename), os.path.join(static_folder, variant)
+        ):
+            return None
+
+        response: Response = send_from_directory(
+            static_folder, variant, mimetype=mimetypes.guess_type(filename)[0]
+        )
+        response.headers['Content-Encoding'] = encoding
+        _vary_on_encoding(response)
+        return response
+
+    @app.after_request
+    def cache_and_compress(response: Response) -> Response:
+        """
+        Mark static assets requested by their current hashed URL as immutable, and
+        compress other compressible responses.
+        """
+        if request.endpoint == 'static':
+            filename: str = (request.view_args or {}).get('filename', '')
+            if response.status_code == 200 and \
+                    request.args.get('v') == static_version(static_folder, filename):
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = app.config['STATIC_MAX_AGE']
+                response.cache_control.immutable = True
+            return response
+
+        # leave streamed, already encoded, small and incompressible responses as they are
+        encoding: Optional[str] = request.accept_encodings.best_match(list(ENCODINGS))
+        if encoding is None or response.status_code != 200 or \
+                response.direct_passthrough or response.is_streamed or \
+                'Content-Encoding' in response.headers or \
+                response.mimetype not in COMPRESSIBLE_TYPES or \
+                (response.content_length or 0) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        response.set_data(
+            _compress(response.get_data(), encoding, app.config['COMPRESS_LEVEL'])
+        )
+        response.headers['Content-Encoding'] = encoding
+        _vary_on_encoding(response)
+        # an ETag names one representation; mark the compressed one as weakly equal
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+if __name__ == '__main__':
+    static_folder: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    print(f"Wrote {precompress_static(static_folder)} precompressed static assets.")
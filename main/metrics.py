@@ -0,0 +1,327 @@
+#!/usr/bin/env python3.9
+"""
+Process-wide instrumentation of the app, exposed in the Prometheus text format:
+    - every upstream Zendesk request: its endpoint, status, duration, response size, and
+      the time it waited for the rate limit scheduler
+    - every request served by the app's routes: its duration by endpoint and status
+    - hits, misses and evictions of the named in-memory caches
+    - live session counts and other values read when the metrics are collected
+
+Each worker process keeps its own metrics; a Prometheus server scrapes every process.
+The gauges belong to the app that registered them, so that several apps built in one
+process each report their own sessions and caches.
+
+Public methods:
+    - Counter(name: str, documentation: str, labelnames: tuple[str, ...] = ())
+    - Counter.inc(amount: float = 1.0, **labels: str) -> None
+    - Histogram(name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                buckets: tuple[float, ...] = DURATION_BUCKETS)
+    - Histogram.observe(value: float, **labels: str) -> None
+    - Gauge(name: str, documentation: str, collect: Callable[[], float],
+            registry: Optional[list] = None)
+    - render_metrics(gauges: Iterable = ()) -> str
+    - upstream_endpoint(url: str) -> str
+    - observe_upstream(url: str, status: int, duration: float, size: int) -> None
+    - init_metrics(app: Flask, gauges: dict[str, tuple[str, Callable[[], float]]])
+"""
+
+import math
+import re
+import threading
+import time
+from typing import Callable, Iterable, Optional
+from urllib.parse import urlsplit
+
+from flask import Flask, Response, g, request
+
+# histogram buckets for durations in seconds, and for response sizes in bytes
+DURATION_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SIZE_BUCKETS: tuple[float, ...] = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304
+)
+
+# the media type of the Prometheus text exposition format
+CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+
+# every process-wide metric, in the order they are rendered
+_registry: list = []
+
+# ids in upstream URL paths, replaced so that each endpoint is one label value
+_ID_PATTERN: re.Pattern = re.compile(r'/\d+(?=[/.]|$)')
+
+
+def _label_value(value: str) -> str:
+    """
+    Escape a label value for the text format.
+    """
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _sample(name: str, labels: dict, value: float) -> str:
+    """
+    Return one sample line of the text format.
+    """
+    label_text: str = ','.join(f'{k}="{_label_value(str(v))}"' for k, v in labels.items())
+    number: str = repr(float(value))
+    return f'{name}{{{label_text}}} {number}' if labels else f'{name} {number}'
+
+
+class Counter:
+    """
+    A monotonically increasing count, kept separately for each combination of values of
+    its labels.
+    """
+
+    kind: str = 'counter'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = ()
+    ) -> None:
+        """
+        Save the metric's name, help text and label names, and register it.
+        """
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: tuple[str, ...] = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock: threading.Lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """
+        Add `amount` to the count of the given label values.
+        """
+        key: tuple = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """
+        Return the count of the given label values.
+        """
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def samples(self) -> list[str]:
+        """
+        Return the sample lines of the metric.
+        """
+        with self._lock:
+            values: list = sorted(self._values.items())
+
+        return [
+            _sample(self.name, dict(zip(self.labelnames, key)), value)
+            for key, value in values
+        ]
+
+
+class Histogram:
+    """
+    Counts of observed values falling into cumulative buckets, along with their sum and
+    count, kept separately for each combination of values of its labels.
+    """
+
+    kind: str = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DURATION_BUCKETS
+    ) -> None:
+        """
+        Save the metric's name, help text, label names and bucket upper bounds, and
+        register it.
+        """
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: tuple[str, ...] = labelnames
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets)) + (math.inf,)
+        self._values: dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock: threading.Lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Record an observed value for the given label values.
+        """
+        key: tuple = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            counts: list = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    def count(self, **labels: str) -> int:
+        """
+        Return the number of values observed for the given label values.
+        """
+        key: tuple = tuple(str(labels[name]) for name in self.labelnames)
+        return self._values[key][-1] if key in self._values else 0
+
+    def samples(self) -> list[str]:
+        """
+        Return the sample lines of the metric, with cumulative bucket counts.
+        """
+        with self._lock:
+            values: list = sorted(
+                (key, list(counts)) for key, counts in self._values.items()
+            )
+
+        lines: list[str] = []
+        for key, counts in values:
+            labels: dict = dict(zip(self.labelnames, key))
+            cumulative: int = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le: str = '+Inf' if bound == math.inf else repr(float(bound))
+                lines.append(_sample(f'{self.name}_bucket', {**labels, 'le': le}, cumulative))
+            lines.append(_sample(f'{self.name}_sum', labels, counts[-2]))
+            lines.append(_sample(f'{self.name}_count', labels, counts[-1]))
+
+        return lines
+
+
+class Gauge:
+    """
+    A value read from the app by `collect()` whenever the metrics are rendered, such as
+    the number of live sessions.
+    """
+
+    kind: str = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], float],
+        registry: Optional[list] = None
+    ) -> None:
+        """
+        Save the metric's name, help text and the function reading its value, and
+        register it in `registry`, e.g. an app's, or the process-wide one if omitted.
+        """
+        self.name: str = name
+        self.documentation: str = documentation
+        self.collect: Callable[[], float] = collect
+        (_registry if registry is None else registry).append(self)
+
+    def samples(self) -> list[str]:
+        """
+        Return the sample line of the metric.
+        """
+        return [_sample(self.name, {}, self.collect())]
+
+
+def render_metrics(gauges: Iterable = ()) -> str:
+    """
+    Return every process-wide metric, followed by the given gauges, e.g. an app's, in
+    the Prometheus text exposition format.
+    """
+    lines: list[str] = []
+    for metric in [*_registry, *gauges]:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines += metric.samples()
+
+    return '\n'.join(lines) + '\n'
+
+
+upstream_requests: Histogram = Histogram(
+    'zendesk_upstream_request_duration_seconds',
+    "Duration of upstream Zendesk API requests, excluding rate limit waits.",
+    ('endpoint', 'status'),
+)
+upstream_response_bytes: Histogram = Histogram(
+    'zendesk_upstream_response_bytes',
+    "Size of upstream Zendesk API response bodies.",
+    ('endpoint', 'status'), buckets=SIZE_BUCKETS,
+)
+upstream_queue: Histogram = Histogram(
+    'zendesk_upstream_queue_seconds',
+    "Time upstream requests waited for the rate limit scheduler.",
+    ('priority',),
+)
+route_requests: Histogram = Histogram(
+    'app_request_duration_seconds',
+    "Duration of requests served by the app's routes.",
+    ('endpoint', 'method', 'status'),
+)
+cache_requests: Counter = Counter(
+    'app_cache_requests_total',
+    "Lookups in the app's in-memory caches, by whether they were hits or misses.",
+    ('cache', 'result'),
+)
+cache_evictions: Counter = Counter(
+    'app_cache_evictions_total',
+    "Entries evicted from the app's in-memory caches because they were full.",
+    ('cache',),
+)
+
+
+def upstream_endpoint(url: str) -> str:
+    """
+    Return the path of an upstream URL with its ids replaced by `{id}`, e.g.
+    `/api/v2/tickets/{id}.json`, so that all requests to an endpoint share one label.
+    """
+    return _ID_PATTERN.sub('/{id}', urlsplit(url).path)
+
+
+def observe_upstream(url: str, status: int, duration: float, size: int) -> None:
+    """
+    Record an upstream request to `url`, answered with `status` after `duration`
+    seconds with a body of `size` bytes.
+    """
+    endpoint: str = upstream_endpoint(url)
+    upstream_requests.observe(duration, endpoint=endpoint, status=str(status))
+    upstream_response_bytes.observe(size, endpoint=endpoint, status=str(status))
+
+
+def init_metrics(app: Flask, gauges: dict[str, tuple[str, Callable[[], float]]]) -> None:
+    """
+    Time every request served by the app's routes, register the given gauges, keyed by
+    name, with their help text and the function reading their value, and serve all
+    metrics at `/metrics` unless the `METRICS_ENDPOINT` key of `app.config` is unset.
+    The gauges are kept in the app's own registry, `app.extensions['metrics']`.
+    """
+    app.config.setdefault('METRICS_ENDPOINT', True)
+    app_gauges: list = app.extensions.setdefault('metrics', [])
+    for name, (documentation, collect) in gauges.items():
+        Gauge(name, documentation, collect, registry=app_gauges)
+
+    @app.before_request
+    def start_timer() -> None:
+        """
+        Note when the request started.
+        """
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def observe_route(response: Response) -> Response:
+        """
+        Record the duration of the request, unless it is for a static asset or the
+        metrics themselves.
+        """
+        if request.endpoint not in (None, 'static', 'metrics') and 'metrics_start' in g:
+            route_requests.observe(
+                time.perf_counter() - g.metrics_start,
+                endpoint=request.endpoint or '', method=request.method,
+                status=str(response.status_code),
+            )
+        return response
+
+    if app.config['METRICS_ENDPOINT']:
+        @app.route('/metrics', methods=['GET'])
+        def metrics() -> Response:
+            """
+            Return all metrics in the Prometheus text format.
+            """
+            return Response(render_metrics(app_gauges), content_type=CONTENT_TYPE)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3.9
+"""
+Opt-in profiling of individual requests with `cProfile`, to find hot spots in production
+without attaching a debugger. A request is profiled if either
+    - it is picked at random, with the probability set by the `PROFILE_SAMPLE_RATE` key
+      of `app.config` (0 by default, i.e. never), or
+    - it carries a profiling token signed with the app's secret key, in its `profile`
+      argument or `X-Profile` header; tokens are valid for `PROFILE_TOKEN_MAX_AGE` seconds
+The profile of the request's thread is saved in the `PROFILE_DIR` folder, whose name is
+returned in the response's `X-Profile` header; only the latest `PROFILE_KEEP` profiles
+are kept. Async views run on another thread, so their profiles only show the wait.
+
+To generate a profiling token for the secret key in FLASK_SECRET_KEY, run from the
+project repository root:
+    python3.9 -m main.profiling
+To inspect a profile:
+    python3.9 -m pstats profiles/<file>.prof
+
+Public methods:
+    - profile_token(secret_key: str) -> str
+    - init_profiling(app: Flask) -> None
+"""
+
+import cProfile
+import os
+import random
+import time
+import uuid
+from typing import Optional
+
+from flask import Flask, Response, g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# the salt separating profiling tokens from other values signed with the secret key
+TOKEN_SALT: str = 'profile-request'
+
+
+def profile_token(secret_key: str) -> str:
+    """
+    Return a token that has the requests carrying it profiled by an app using the given
+    secret key.
+    """
+    return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT).dumps('profile')
+
+
+def _prune_profiles(folder: str, keep: int) -> None:
+    """
+    Delete all but the `keep` most recent profiles in the folder.
+    """
+    profiles: list[str] = sorted(
+        (os.path.join(folder, name) for name in os.listdir(folder) if name.endswith('.prof')),
+        key=os.path.getmtime,
+    )
+    for path in profiles[:max(0, len(profiles) - keep)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def init_profiling(app: Flask) -> None:
+    """
+    Register the profiling hooks on the app, configured by the following keys of
+    `app.config`, if set:
+        - PROFILE_SAMPLE_RATE       fraction of requests profiled at random (default 0)
+        - PROFILE_DIR               folder the profiles are saved in (default "profiles")
+        - PROFILE_KEEP              number of latest profiles kept (default 100)
+        - PROFILE_TOKEN_MAX_AGE     seconds a profiling token is valid (default 1 day)
+    """
+    app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+    app.config.setdefault('PROFILE_DIR', 'profiles')
+    app.config.setdefault('PROFILE_KEEP', 100)
+    app.config.setdefault('PROFILE_TOKEN_MAX_AGE', 24 * 60 * 60)
+
+    def requested() -> bool:
+        """
+        Return whether the request carries a valid profiling token.
+        """
+        token: Optional[str] = \
+            request.args.get('profile') or request.headers.get('X-Profile')
+        if not token or not app.secret_key:
+            return False
+        try:
+            URLSafeTimedSerializer(str(app.secret_key), salt=TOKEN_SALT).loads(
+                token, max_age=app.config['PROFILE_TOKEN_MAX_AGE']
+            )
+        except BadSignature:
+            return False
+        return True
+
+    @app.before_request
+    def start_profile() -> None:
+        """
+        Start profiling the request, if it is sampled or asks for it.
+        """
+        if request.endpoint == 'static':
+            return
+        if random.random() >= app.config['PROFILE_SAMPLE_RATE'] and not requested():
+            return
+
+        profiler: cProfile.Profile = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already running
+            return
+        g.profiler = profiler
+
+    @app.after_request
+    def save_profile(response: Response) -> Response:
+        """
+        Stop profiling the request, save its profile, and name it in the response.
+        """
+        profiler: Optional[cProfile.Profile] = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+
+        folder: str = app.config['PROFILE_DIR']
+        name: str = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.endpoint}-" \
+                    f"{uuid.uuid4().hex[:8]}.prof"
+        try:
+            os.makedirs(folder, exist_ok=True)
+            profiler.dump_stats(os.path.join(folder, name))
+            _prune_profiles(folder, app.config['PROFILE_KEEP'])
+        except OSError as e:
+            print(f'---\n{e}\n---')
+            return response
+
+        response.headers['X-Profile'] = name
+        return response
+
+
+if __name__ == '__main__':
+    if not (secret_key := os.getenv("FLASK_SECRET_KEY")):
+        raise EnvironmentError("\tError: environment variable FLASK_SECRET_KEY not set.")
+    print(profile_token(secret_key))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3.9
+"""
+A per-request breakdown of where the app spends its time, returned to the client in a
+`Server-Timing` response header, e.g.
+    Server-Timing: upstream;dur=212.4, decode;dur=3.1, render;dur=8.7, total;dur=226.0
+
+Code anywhere in the app marks a phase with `timed(phase)`; the phases are
+    - upstream  waiting for Zendesk API responses, including rate limit waits
+    - decode    decoding Zendesk API responses
+    - render    rendering templates
+The timings of a request are kept in a context variable, so they are also collected from
+the coroutines of async views, and from threads running work for the request in a copy
+of its context. A phase's duration is the wall time during which at least one part of it
+was running, so concurrent upstream requests are not counted twice.
+
+Public methods:
+    - RequestTimings()
+    - RequestTimings.add(phase: str, start: float, end: float) -> None
+    - RequestTimings.duration(phase: str) -> float
+    - RequestTimings.header(total: float) -> str
+    - timed(phase: str) -> ContextManager[None]
+    - current_timings() -> Optional[RequestTimings]
+    - timed_render_template(template_name: str, **context) -> str
+    - init_server_timing(app: Flask) -> None
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from flask import Flask, Response, g, render_template
+
+# the phases reported in the header, in order
+PHASES: tuple[str, ...] = ('upstream', 'decode', 'render')
+
+
+class RequestTimings:
+    """
+    The time intervals spent in each phase while serving one request.
+    """
+
+    def __init__(self) -> None:
+        """
+        Start with no intervals; they may be added from several threads.
+        """
+        self._intervals: dict[str, list[tuple[float, float]]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def add(self, phase: str, start: float, end: float) -> None:
+        """
+        Record that the phase ran from `start` to `end`, in `time.perf_counter()` seconds.
+        """
+        with self._lock:
+            self._intervals.setdefault(phase, []).append((start, end))
+
+    def duration(self, phase: str) -> float:
+        """
+        Return the time in seconds during which at least one interval of the phase was
+        running, i.e. the length of the union of its intervals.
+        """
+        with self._lock:
+            intervals: list[tuple[float, float]] = sorted(self._intervals.get(phase, []))
+
+        total: float = 0.0
+        covered_until: float = float('-inf')
+        for start, end in intervals:
+            if end > covered_until:
+                total += end - max(start, covered_until)
+                covered_until = end
+
+        return total
+
+    def header(self, total: float) -> str:
+        """
+        Return the `Server-Timing` header value for the phases, and the request's total
+        time in seconds, in milliseconds.
+        """
+        metrics: list[str] = [
+            f'{phase};dur={self.duration(phase) * 1000:.1f}' for phase in PHASES
+        ]
+        return ', '.join(metrics + [f'total;dur={total * 1000:.1f}'])
+
+
+# the timings of the request being served in the current context, if any
+_timings: ContextVar[Optional[RequestTimings]] = \
+    ContextVar('request_timings', default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """
+    Return the timings of the request being served in the current context, or None
+    outside of a request.
+    """
+    return _timings.get()
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """
+    Record the time spent in the body of the `with` block as part of the phase, in the
+    timings of the current request, if any.
+    """
+    timings: Optional[RequestTimings] = _timings.get()
+    start: float = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.add(phase, start, time.perf_counter())
+
+
+def timed_render_template(template_name: str, **context) -> str:
+    """
+    Render a template as `flask.render_template()` does, as part of the render phase.
+    """
+    with timed('render'):
+        return render_template(template_name, **context)
+
+
+def init_server_timing(app: Flask) -> None:
+    """
+    Collect the timings of every request, and return them in a `Server-Timing` header,
+    unless the `SERVER_TIMING` key of `app.config` is unset.
+    """
+    app.config.setdefault('SERVER_TIMING', True)
+
+    @app.before_request
+    def start_timings() -> None:
+        """
+        Start collecting the timings of the request.
+        """
+        g.server_timing_start = time.perf_counter()
+        _timings.set(RequestTimings())
+
+    @app.after_request
+    def add_server_timing(response: Response) -> Response:
+        """
+        Add the `Server-Timing` header.
+        """
+        timings: Optional[RequestTimings] = _timings.get()
+        if app.config['SERVER_TIMING'] and timings is not None and \
+                'server_timing_start' in g:
+            response.headers['Server-Timing'] = \
+                timings.header(time.perf_counter() - g.server_timing_start)
+        return response
+
+    @app.teardown_request
+    def stop_timings(exc: Optional[BaseException]) -> None:
+        """
+        Stop collecting timings once the request is done, even if it failed.
+        """
+        _timings.set(None)
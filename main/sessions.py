@@ -0,0 +1,68 @@
+#!/usr/bin/env python3.9
+"""
+A bounded, expiring in-memory store for the per-session upstream objects kept by the app.
+
+Public methods:
+    - SessionStore(maxsize: int, idle_ttl: float)
+    - SessionStore.get_or_create(session_id: str, factory: Callable[[], Any]) -> Any
+    - SessionStore.discard(session_id: str) -> None
+    - SessionStore.live_sessions -> int
+    - SessionStore.evictions -> int
+"""
+
+from typing import Any, Callable, Optional
+
+from main.upstream.cache import TTLCache
+
+
+class SessionStore:
+    """
+    A class that keeps one object per session, up to `maxsize` sessions. Sessions idle
+    for longer than `idle_ttl` seconds expire, and the least recently used session is
+    evicted when the store is full. Evicted sessions are rebuilt by the caller's factory.
+    Its hits, misses and evictions are reported in the metrics as the "sessions" cache.
+    """
+
+    def __init__(self, maxsize: int, idle_ttl: float) -> None:
+        """
+        Save the maximum number of sessions and the idle time-to-live in seconds.
+        """
+        self._objs: TTLCache = TTLCache(
+            maxsize=maxsize, ttl=idle_ttl, sliding=True, name='sessions'
+        )
+
+    def get_or_create(self, session_id: str, factory: Callable[[], Any]) -> Any:
+        """
+        Return the object stored for `session_id`. If there is none, because the session
+        is new or was evicted, build one with `factory()`, store it, and return it.
+        """
+        obj: Optional[Any] = self._objs.get(session_id)
+
+        if obj is None:
+            # make room by dropping idle sessions before evicting active ones
+            self._objs.purge_expired()
+            obj = factory()
+            self._objs.put(session_id, obj)
+
+        return obj
+
+    def discard(self, session_id: str) -> None:
+        """
+        Remove the object stored for `session_id`, if any.
+        """
+        self._objs.pop(session_id)
+
+    @property
+    def live_sessions(self) -> int:
+        """
+        The number of sessions currently held.
+        """
+        return len(self._objs)
+
+    @property
+    def evictions(self) -> int:
+        """
+        The number of sessions removed so far, either because they expired or because
+        the store was full.
+        """
+        return self._objs.evictions + self._objs.expirations
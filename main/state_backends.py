@@ -0,0 +1,201 @@
+#!/usr/bin/env python3.9
+"""
+Pluggable backends that keep each session's navigation state outside of the worker
+process, so that any worker process can serve any request of a session.
+
+The server-side backends forget the state of a session once it has not been saved for
+`idle_ttl` seconds, like the per-session objects of `SessionStore`, so that they do not
+grow with every session ever served.
+
+Public methods:
+    - StateBackend.load(session_id: str) -> dict
+    - StateBackend.save(session_id: str, state: dict) -> None
+    - CookieStateBackend()
+    - SQLiteStateBackend(path: str, idle_ttl: float = IDLE_TTL,
+                         purge_interval: float = PURGE_INTERVAL)
+    - MemoryStateBackend(maxsize: int = MAXSIZE, idle_ttl: float = IDLE_TTL)
+    - make_state_backend(name: str, path: str = '', maxsize: int = MAXSIZE,
+                         idle_ttl: float = IDLE_TTL) -> StateBackend
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from flask import session
+
+from main.upstream.cache import TTLCache
+
+# the most sessions held by the memory backend, and the seconds after their last save
+# that the states of idle sessions are forgotten
+MAXSIZE: int = 10000
+IDLE_TTL: float = 30 * 60
+
+# the least seconds between two purges of idle states from the SQLite backend
+PURGE_INTERVAL: float = 60.0
+
+
+class StateBackend(ABC):
+    """
+    The interface of a navigation state backend. A state is a small JSON-serialisable
+    dict, such as the one returned by `AllTickets.get_state()`.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str) -> dict:
+        """
+        Return the saved state of the specified session, or an empty dict if none.
+        """
+
+    @abstractmethod
+    def save(self, session_id: str, state: dict) -> None:
+        """
+        Save the state of the specified session, replacing any previous state.
+        """
+
+
+class CookieStateBackend(StateBackend):
+    """
+    Keep the state in the signed Flask session cookie of the current request. Needs no
+    server-side storage, but every worker process must share the same secret key.
+    """
+
+    def load(self, session_id: str) -> dict:
+        """
+        Return the state saved in the session cookie, or an empty dict if none.
+        """
+        return session.get('nav_state', {})
+
+    def save(self, session_id: str, state: dict) -> None:
+        """
+        Save the state in the session cookie sent with the current response.
+        """
+        session['nav_state'] = state
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Keep the state in a SQLite database file shared by all worker processes on a host.
+    States not saved for `idle_ttl` seconds are no longer loaded, and are deleted by the
+    next save at least `purge_interval` seconds after the previous purge.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        idle_ttl: float = IDLE_TTL,
+        purge_interval: float = PURGE_INTERVAL
+    ) -> None:
+        """
+        Save the database file path, the idle time-to-live and the interval between
+        purges in seconds, and create the state table if it does not exist.
+        """
+        self.path: str = path
+        self.idle_ttl: float = idle_ttl
+        self.purge_interval: float = purge_interval
+        self._last_purge: float = 0.0
+        self._local: threading.local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS nav_state (
+                    session_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS nav_state_updated_at ON nav_state (updated_at)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Return the database connection of the calling thread, opening it on first use.
+        """
+        if (conn := getattr(self._local, 'conn', None)) is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> dict:
+        """
+        Return the state saved for the specified session, or an empty dict if none.
+        """
+        row = self._connect().execute(
+            'SELECT state FROM nav_state WHERE session_id = ? AND updated_at >= ?',
+            (session_id, time.time() - self.idle_ttl)
+        ).fetchone()
+
+        return json.loads(row[0]) if row else {}
+
+    def save(self, session_id: str, state: dict) -> None:
+        """
+        Insert or replace the state saved for the specified session, and delete the
+        states of idle sessions if they were not purged within `purge_interval` seconds.
+        """
+        now: float = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO nav_state VALUES (?, ?, ?)',
+                (session_id, json.dumps(state), now)
+            )
+            if now - self._last_purge >= self.purge_interval:
+                self._last_purge = now
+                conn.execute(
+                    'DELETE FROM nav_state WHERE updated_at < ?', (now - self.idle_ttl,)
+                )
+
+
+class MemoryStateBackend(StateBackend):
+    """
+    Keep the state in a bounded cache local to this process; a stand-in for an external
+    key-value store during development and testing. Up to `maxsize` sessions are held;
+    sessions idle for `idle_ttl` seconds expire, and the least recently used session is
+    evicted when the store is full.
+    """
+
+    def __init__(self, maxsize: int = MAXSIZE, idle_ttl: float = IDLE_TTL) -> None:
+        """
+        Initialize the empty store, holding up to `maxsize` sessions for `idle_ttl`
+        seconds after their last use.
+        """
+        self._states: TTLCache = TTLCache(maxsize=maxsize, ttl=idle_ttl, sliding=True)
+
+    def load(self, session_id: str) -> dict:
+        """
+        Return a copy of the state saved for the specified session, or an empty dict.
+        """
+        return dict(self._states.get(session_id) or {})
+
+    def save(self, session_id: str, state: dict) -> None:
+        """
+        Save a copy of the state for the specified session.
+        """
+        self._states.put(session_id, dict(state))
+
+
+def make_state_backend(
+    name: str,
+    path: str = '',
+    maxsize: int = MAXSIZE,
+    idle_ttl: float = IDLE_TTL
+) -> StateBackend:
+    """
+    Build the state backend of the given name, one of "cookie", "sqlite" or "memory".
+    The "sqlite" backend stores its database at `path`; the "memory" backend holds up to
+    `maxsize` sessions, and both forget sessions idle for `idle_ttl` seconds.
+    Raise a ValueError for an unknown name.
+    """
+    if name == 'cookie':
+        return CookieStateBackend()
+    if name == 'sqlite':
+        return SQLiteStateBackend(path, idle_ttl=idle_ttl)
+    if name == 'memory':
+        return MemoryStateBackend(maxsize=maxsize, idle_ttl=idle_ttl)
+
+    raise ValueError(f"Unknown navigation state backend: {name}")
@@ -3,16 +3,25 @@ const page_url_root = window.location.protocol + '//' + window.location.host;
 
 /*
     Triggered by the "Previous" and "Next" navigation buttons. Calls the naviation API
-    to get the previous or next batch of tickets, and refresh the page upon success.
+    to get the previous or next batch of tickets, and swap its rendered ticket list and
+    navigation bars into the page upon success.
 */
 async function gotoBatch(direction) {
     try {
-        // ask the server for the next/previous batch of tickets
-        const response = await fetch(page_url_root + '/navigate?direction=' + direction);
+        // ask the server for the next/previous batch of tickets, within the filter and
+        // sort order of the current page
+        const params = new URLSearchParams(window.location.search);
+        params.set('direction', direction);
+        const response = await fetch(page_url_root + '/navigate?' + params.toString());
 
-        // if request was successful, refresh the page
+        // if request was successful, swap the returned fragments into the page in place
         if (response.status === 200) {
-            location.reload();
+            const fragments = await response.json();
+            document.querySelector('main').innerHTML = fragments.tickets_html;
+            document.querySelectorAll('nav').forEach((nav) => {
+                nav.outerHTML = fragments.navigation_html;
+            });
+            window.scrollTo(0, 0);
         }
         else {
             throw Exception(response.status);
@@ -1,16 +1,94 @@
 #!/usr/bin/env python3.9
 """
-Fetch all tickets from the Zendesk API for a given Zendesk account.
+Fetch all tickets from the Zendesk API for a given Zendesk account. Batches of tickets
+hold TicketSummary records of the tickets rather than their full payloads.
+
+Tickets can be fetched from the API in blocks larger than the batches shown in the web
+UI, e.g. blocks of 100 tickets for batches of 25, so that browsing through a block costs
+one upstream request. A batch is then addressed by the URL of its block, followed by its
+offset within the block in a `#offset=` fragment, e.g. `...tickets.json?...#offset=25`;
+the offset of the first batch is left out, and `#offset=last` addresses the last batch
+of a block whose length is not yet known.
 
 Public methods:
-    - AllTickets(api_url_root: str, auth_tuple: tuple[str, str], page_size: int = 25)
+    - AllTickets(api_url_root: str, auth_tuple: tuple[str, str], page_size: int = 25,
+                 http_client: Optional[ZendeskHTTPClient] = None,
+                 batch_cache_size: int = 4, batch_cache_ttl: float = 30.0,
+                 state: Optional[dict] = None, mirror: Optional[TicketMirror] = None,
+                 upstream_page_size: Optional[int] = None)
+    - AllTickets.get_state() -> dict
+    - AllTickets.set_state(state: dict) -> bool
+    - AllTickets.set_query(query: dict) -> bool
     - AllTickets.get_current_batch() -> list
     - AllTickets.seek_batch(direction: str) -> dict  # direction in {"prev", "next"}
+    - AllTickets.get_batch_window() -> tuple[list, dict, dict]
+    - AllTickets.get_neighbours() -> tuple[dict, dict]
     - AllTickets.goto_next_batch() -> list
     - AllTickets.goto_prev_batch() -> list
+    - AllTickets.iter_tickets(page_size: int = EXPORT_PAGE_SIZE) -> Iterator[dict]
+    - AsyncAllTickets(api_url_root: str, auth_tuple: tuple[str, str], page_size: int = 25,
+                      async_http_client: Optional[AsyncZendeskHTTPClient] = None, ...)
+    - await AsyncAllTickets.aget_current_batch() -> list
+    - await AsyncAllTickets.aseek_batch(direction: str) -> dict
+    - await AsyncAllTickets.aget_batch_window() -> tuple[list, dict, dict]
+    - await AsyncAllTickets.aget_neighbours() -> tuple[dict, dict]
+    - await AsyncAllTickets.agoto_next_batch() -> list
+    - await AsyncAllTickets.agoto_prev_batch() -> list
 """
 
-import requests
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Iterator, Optional
+
+from main.upstream.async_http_client import AsyncZendeskHTTPClient, get_async_http_client
+from main.upstream.cache import TTLCache
+from main.upstream.http_client import ZendeskHTTPClient, get_http_client
+from main.upstream.json_decoding import decode_json, decode_ticket_page
+from main.upstream.rate_limit import PRIORITY_BACKGROUND
+from main.upstream.ticket_mirror import MIRROR_URL_ROOT, TicketMirror, normalize_query
+from main.upstream.ticket_summary import summarize_batch
+
+
+# a bounded thread pool shared by all sessions for fetching neighbouring batches
+NEIGHBOUR_POOL_SIZE: int = 8
+_neighbour_pool: ThreadPoolExecutor = ThreadPoolExecutor(
+    max_workers=NEIGHBOUR_POOL_SIZE,
+    thread_name_prefix='neighbour-batch',
+)
+
+# the fragment of a batch URL giving the offset of the batch within its block
+OFFSET_FRAGMENT: str = '#offset='
+LAST_OFFSET: str = 'last'
+
+
+def split_batch_url(url: str) -> tuple[str, str]:
+    """
+    Split the URL of a batch of tickets into the URL of its block, and its offset within
+    the block: a number, `LAST_OFFSET`, or '' for the first batch.
+    """
+    block_url, _, offset = url.partition(OFFSET_FRAGMENT)
+    return block_url, offset
+
+
+def batch_url(block_url: Optional[str], offset) -> Optional[str]:
+    """
+    Return the URL of the batch at the given offset within the block at `block_url`, or
+    None if there is no such block.
+    """
+    if not block_url or offset in (0, '0', ''):
+        return block_url
+    return f'{block_url}{OFFSET_FRAGMENT}{offset}'
+
+
+# the largest page size of the cursor pagination, used when walking all tickets; each
+# export holds at most two pages, the one being consumed and the one being fetched
+EXPORT_PAGE_SIZE: int = 100
+EXPORT_POOL_SIZE: int = 4
+_export_pool: ThreadPoolExecutor = ThreadPoolExecutor(
+    max_workers=EXPORT_POOL_SIZE,
+    thread_name_prefix='export-page',
+)
 
 
 class AllTickets:
@@ -22,58 +100,247 @@ class AllTickets:
         self,
         api_url_root: str,
         auth_tuple: tuple[str, str],
-        page_size: int = 25
+        page_size: int = 25,
+        http_client: Optional[ZendeskHTTPClient] = None,
+        batch_cache_size: int = 4,
+        batch_cache_ttl: float = 30.0,
+        state: Optional[dict] = None,
+        mirror: Optional[TicketMirror] = None,
+        upstream_page_size: Optional[int] = None
     ) -> None:
         """
         Save Zendesk API URL root in a string and authentication info in a tuple.
         Accept an integer `page_size` parameter, and configure the number of tickets to be
         retrieved per batch of tickets. Also configure the initial request URL and
         initialize the previous and next page request URLs to be empty strings ''.
+        Requests go through `http_client`, or the process-wide pooled client if omitted.
+        Keep a small window of recently fetched blocks, keyed by their request URL, each
+        reused for `batch_cache_ttl` seconds: as many blocks as hold `batch_cache_size`
+        batches, but at least two, so that the blocks either side of a block edge are
+        both held. Blocks of several batches thus do not multiply the tickets each
+        session holds.
+        If a `state` saved by `get_state()` is given, resume from that state instead.
+        If a TicketMirror is given as `mirror`, serve batches from the local mirror
+        instead of the Zendesk API.
+        Request tickets from the API in blocks of `upstream_page_size` tickets, a multiple
+        of `page_size`, or of `page_size` tickets if omitted, and serve the batches from
+        the blocks. The mirror is read one batch at a time, since its reads are local.
+        Raise a ValueError if `upstream_page_size` is not a multiple of `page_size`.
         """
+        if upstream_page_size and upstream_page_size % page_size:
+            raise ValueError("The upstream page size must be a multiple of the page size.")
+
         self.api_url_root: str = api_url_root
         self.auth_tuple: tuple[str, str] = auth_tuple
         self.page_size: int = page_size
-        self._url_curr: str = self.api_url_root + f'/tickets.json?page[size]={page_size}'
+        self.mirror: Optional[TicketMirror] = mirror
+        self.upstream_page_size: int = \
+            page_size if mirror is not None else upstream_page_size or page_size
+        self.query: dict = normalize_query()
+        self._url_curr: str = self._first_batch_url()
         self._url_next: str = ''
         self._url_prev: str = ''
+        self.http_client: ZendeskHTTPClient = http_client or get_http_client()
+        batches_per_block: int = self.upstream_page_size // page_size
+        self._batch_cache: TTLCache = TTLCache(
+            maxsize=max(2, -(-batch_cache_size // batches_per_block)),
+            ttl=batch_cache_ttl, name='batches'
+        )
+
+        if state:
+            self.set_state(state)
+
+    def _first_batch_url(self, page_size: Optional[int] = None) -> str:
+        """
+        Return the URL of the first block of tickets for the current query, of
+        `page_size` tickets, or of this object's upstream page size if omitted.
+        """
+        page_size = page_size or self.upstream_page_size
+        if self.mirror is not None:
+            return self.mirror.first_batch_url(page_size, self.query)
+
+        return self.api_url_root + f'/tickets.json?page[size]={page_size}'
+
+    def set_query(self, query: dict) -> bool:
+        """
+        Filter and sort the tickets by a `query` returned by `normalize_query()`, starting
+        over from the first batch if it differs from the current query. Return whether it
+        started over; the next and previous URL pointers are then unset until the current
+        batch is fetched. Only the mirror can filter and sort tickets; raise a ValueError
+        if any other query is given to an object without a mirror.
+        """
+        if query == self.query:
+            return False
+        if self.mirror is None and query != normalize_query():
+            raise ValueError("Filtering and sorting tickets requires the ticket mirror.")
+
+        # start over from the first batch of the new query
+        self.query = query
+        self._url_curr = self._first_batch_url()
+        self._url_next = ''
+        self._url_prev = ''
+        return True
+
+    def _decode_tickets(self, response: Any, url) -> dict:
+        """
+        Decode the response of a request for a batch of tickets at the specified URL.
+        Return the JSON results as a dict, with the tickets reduced to TicketSummary
+        records. Raise a RuntimeError if the HTTP response is not 200 (thus unsuccessful).
+        """
+        # handle when HTTP request is unsuccessful
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"""
+                Failed to fetch a batch of tickets.
+                Status: {response.status_code}
+                URL: {url}
+                """
+            )
+
+        return decode_ticket_page(response.content)
+
+    def _read_mirror(self, url) -> dict:
+        """
+        Read a batch of tickets addressed by a `mirror://tickets` URL from the mirror,
+        with the tickets reduced to TicketSummary records. Raise a RuntimeError if this
+        object has no mirror.
+        """
+        if self.mirror is None:
+            raise RuntimeError(f"No ticket mirror to read {url} from.")
+
+        return summarize_batch(self.mirror.get_batch(url))
 
     def _request_tickets(self, url) -> dict:
         """
-        Request a batch of tickets from the Zendesk API at the specified URL. Return the
-        JSON results as a dict. Raise a RuntimeError if the HTTP response is not 200 (thus
-        unsuccessful). Return an empty dict upon failure.
+        Request a batch of tickets from the Zendesk API at the specified URL, or read it
+        from the mirror if it is a `mirror://tickets` URL. Return the JSON results as a
+        dict. Return an empty dict upon failure.
         """
         try:
-            # assemble the request URL and perform the GET request
-            response = requests.get(url, auth=self.auth_tuple)
-
-            # handle when HTTP request is unsuccessful
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f"""
-                    Failed to fetch a batch of tickets.
-                    Status: {response.status_code}
-                    URL: {url}
-                    """
-                )
+            if url.startswith(MIRROR_URL_ROOT):
+                return self._read_mirror(url)
 
-            return response.json()
+            # perform a conditional GET request, reusing the decoded batch if unchanged
+            return self.http_client.get_decoded(
+                url, self.auth_tuple, lambda response: self._decode_tickets(response, url)
+            )
 
         except Exception as e:
             print(f'---\n{e}\n---')
 
         return {}
 
-    def get_current_batch(self) -> list:
+    def _remember_batch(self, url, batch: dict) -> None:
         """
-        Attempt to fetch the current batch of tickets, determined by `self._url_curr`.
-        Update the next and previous URL pointers upon successful request.
-        Return an empty dict if unsuccessful.
+        Cache a block of tickets requested at the specified URL. Only remember successful
+        responses, so that failures are retried.
         """
-        # attemp to fetch the current batch of tickets
-        current_batch: dict = self._request_tickets(self._url_curr)
+        if batch != {}:
+            self._batch_cache.put(url, batch)
+
+    def _fetch_block(self, block_url) -> dict:
+        """
+        Return the block of tickets at the specified URL from the batch cache if a fresh
+        copy is held, otherwise request it with `_request_tickets()` and cache it upon
+        success. Return an empty dict upon failure.
+        """
+        block: Optional[dict] = self._batch_cache.get(block_url)
+
+        if block is None:
+            block = self._request_tickets(block_url)
+            self._remember_batch(block_url, block)
+
+        return block
+
+    def _batch_of_block(self, block_url: str, offset: str, block: dict) -> dict:
+        """
+        Return the batch of tickets at the given offset within a fetched block, in the
+        shape of a block, with the links of the batches before and after it: within the
+        block, or the last batch of the previous block and the first batch of the next
+        one. Return an empty dict if the fetch of the block failed.
+        """
+        if block == {}:
+            return {}
+
+        tickets: list = block["tickets"]
+        start: int = max(0, (len(tickets) - 1) // self.page_size * self.page_size) \
+            if offset == LAST_OFFSET else int(offset or 0)
+        end: int = start + self.page_size
+
+        # the last batch of a previous block only needs to be addressed as such if the
+        # blocks hold several batches
+        prev_offset: str = LAST_OFFSET if self.upstream_page_size > self.page_size else ''
+        return {
+            "tickets": tickets[start:end],
+            "links": {
+                "prev": batch_url(block_url, start - self.page_size) if start > 0
+                else batch_url(block["links"]["prev"], prev_offset),
+                "next": batch_url(block_url, end) if end < len(tickets)
+                else block["links"]["next"],
+            },
+        }
 
+    def _fetch_batch(self, url) -> dict:
+        """
+        Return the batch of tickets at the specified URL, cut from its block fetched with
+        `_fetch_block()`, so that the batches of a block cost one upstream request.
+        Return an empty dict upon failure.
+        """
+        block_url, offset = split_batch_url(url)
+        return self._batch_of_block(block_url, offset, self._fetch_block(block_url))
+
+    def _alias_batch(self, old_url: str, new_url: str) -> None:
+        """
+        Cursor links returned by different batches may name the same neighbouring batch
+        with different URLs. If a fresh copy of the block of the batch at `old_url` is
+        held, also cache it under the block URL of `new_url`, so that it is not requested
+        again.
+        """
+        if old_url and new_url and old_url != new_url:
+            old_block_url, old_offset = split_batch_url(old_url)
+            new_block_url, new_offset = split_batch_url(new_url)
+            block: Optional[dict] = self._batch_cache.get(old_block_url)
+            if block is not None and old_offset == new_offset:
+                self._batch_cache.put(new_block_url, block)
+
+    def get_state(self) -> dict:
+        """
+        Return the navigation state, i.e. the current, next, and previous URL pointers
+        and the query, as a small JSON-serialisable dict that can be saved outside this
+        object.
+        """
+        return {
+            'curr': self._url_curr, 'next': self._url_next, 'prev': self._url_prev,
+            'query': self.query,
+        }
+
+    def set_state(self, state: dict) -> bool:
+        """
+        Restore the URL pointers and the query from a navigation state returned by
+        `get_state()`, and return True. A state saved by an object listing the tickets
+        from the other source, the mirror or the API, is ignored, and False returned: its
+        URLs are cut to the other's page sizes, so that the links computed from them
+        would skip tickets, and it would keep a session off the mirror once it is ready.
+        """
+        if state['curr'].startswith(MIRROR_URL_ROOT) != (self.mirror is not None):
+            return False
+
+        self._url_curr = state['curr']
+        self._url_next = state['next']
+        self._url_prev = state['prev']
+        self.query = state.get('query', normalize_query())
+        return True
+
+    def _apply_current_batch(self, current_batch: dict) -> list:
+        """
+        Update the next and previous URL pointers from a fetched current batch of tickets,
+        and return its list of tickets. Return an empty list if the fetch failed.
+        """
         if current_batch != {}:
+            # the neighbours of the current batch are unchanged, whichever link names them
+            self._alias_batch(self._url_next, current_batch["links"]["next"])
+            self._alias_batch(self._url_prev, current_batch["links"]["prev"])
+
             # update the URL pointers
             self._url_next = current_batch["links"]["next"]
             self._url_prev = current_batch["links"]["prev"]
@@ -81,6 +348,41 @@ class AllTickets:
 
         return []
 
+    def get_current_batch(self) -> list:
+        """
+        Attempt to fetch the current batch of tickets, determined by `self._url_curr`,
+        serving it from the batch cache when a fresh copy is held. Update the next and
+        previous URL pointers upon successful request.
+        Return an empty list if unsuccessful.
+        """
+        # attemp to fetch the current batch of tickets
+        return self._apply_current_batch(self._fetch_batch(self._url_curr))
+
+    def _seek_url(self, direction) -> str:
+        """
+        Return the URL pointer of either the previous or the next batch of tickets,
+        determined by the `direction` parameter.
+        """
+        assert direction in {"prev", "next"}
+
+        # set the URL to that of the specified batch
+        if direction == "prev":
+            return self._url_prev
+        return self._url_next
+
+    @staticmethod
+    def _available_batch(batch: dict) -> dict:
+        """
+        Return the fetched batch if it is available and contains tickets, otherwise
+        return an empty dict.
+        """
+        # if the specified batch is available, then return the batch of tickets
+        if batch and batch["tickets"] != []:
+            return batch
+
+        # otherwise return an empty dictionary
+        return {}
+
     def seek_batch(self, direction) -> dict:
         """
         Fetch an return either the previous or the next batch of tickets determined by the
@@ -88,36 +390,50 @@ class AllTickets:
         If the relevant URL pointers are unset, or if the specified batch of tickets are
         unavailable, return an empty dict.
         """
-        assert direction in {"prev", "next"}
+        url: str = self._seek_url(direction)
 
-        # set the URL to that of the specified batch
-        url: str
-        if direction == "prev":
-            url = self._url_prev
-        else:
-            url = self._url_next
+        # if the URL pointer is non-empty for the specified direction, attempt to fetch
+        # the specified batch of tickets
+        return self._available_batch(self._fetch_batch(url)) if url else {}
 
-        # if the URL pointer is non-empty for the specified direction
-        if url:
-            # attemp to fetch the specified batch of tickets
-            batch: dict = self._request_tickets(url)
+    def get_batch_window(self) -> tuple[list, dict, dict]:
+        """
+        Fetch the current batch of tickets as in `get_current_batch()`, then fetch the
+        previous and next batches as in `seek_batch()` in parallel on the shared
+        neighbour pool. The neighbours can only be requested once the current batch has
+        returned its links, so this takes two upstream round trips instead of three.
+        Return the current list of tickets along with the previous and next batches;
+        the neighbours are empty dicts if the current batch is unavailable.
+        """
+        current_list: list = self.get_current_batch()
 
-            # if the specified batch is available, then return the batch of tickets
-            if batch and batch["tickets"] != []:
-                return batch
+        if not current_list:
+            return [], {}, {}
 
-        # otherwise return an empty dictionary
-        return {}
+        return (current_list, *self.get_neighbours())
 
-    def goto_next_batch(self) -> list:
+    def get_neighbours(self) -> tuple[dict, dict]:
         """
-        Attempt to fetch and return a list of the next batch of tickets.
-        If successful, update the current, next, and previous URL pointers.
-        Return an empty list if unsuccessful.
+        Fetch the previous and next batches of tickets as in `seek_batch()`, in parallel
+        on the shared neighbour pool, and return them. After navigating, one of them is
+        the batch navigated away from, which is served from the batch cache.
         """
-        # attemp to fetch the next batch of tickets
-        next_batch: dict = self.seek_batch("next")
+        # fetch both neighbours concurrently; seek_batch() does not modify URL pointers
+        # run each fetch in a copy of the caller's context, which carries its request's
+        # Server-Timing collector
+        prev_future: Future = \
+            _neighbour_pool.submit(copy_context().run, self.seek_batch, "prev")
+        next_future: Future = \
+            _neighbour_pool.submit(copy_context().run, self.seek_batch, "next")
+
+        return prev_future.result(), next_future.result()
 
+    def _shift_to_next_batch(self, next_batch: dict) -> list:
+        """
+        Update the current, next, and previous URL pointers after seeking the next batch
+        of tickets, and return its list of tickets. Return an empty list and leave the
+        pointers unchanged if the next batch does not exist.
+        """
         # if the next batch legitimately exists
         if next_batch != {} and next_batch["tickets"] != []:
             # update the URL pointers
@@ -129,16 +445,12 @@ class AllTickets:
 
         return []
 
-    def goto_prev_batch(self) -> list:
+    def _shift_to_prev_batch(self, prev_batch: dict) -> list:
         """
-        Attempt to fetch and return a list of the previous batch of tickets.
-        If successful, update the current, next, and previous URL pointers.
-        Return an empty list if unsuccessful.
+        Update the current, next, and previous URL pointers after seeking the previous
+        batch of tickets, and return its list of tickets. Return an empty list and leave
+        the pointers unchanged if the previous batch does not exist.
         """
-
-        # attemp to fetch the previous batch of tickets
-        prev_batch: dict = self.seek_batch("prev")
-
         # if the previous batch legitimately exists
         if prev_batch != {} and prev_batch["tickets"] != []:
             # update the URL pointers
@@ -149,3 +461,198 @@ class AllTickets:
             return prev_batch["tickets"]
 
         return []
+
+    def goto_next_batch(self) -> list:
+        """
+        Attempt to fetch and return a list of the next batch of tickets.
+        If successful, update the current, next, and previous URL pointers. The batches
+        stay in the batch cache, so a batch fetched by `seek_batch()` is not requested
+        again, and the old current batch is reused if navigating back.
+        Return an empty list if unsuccessful.
+        """
+        # attemp to fetch the next batch of tickets
+        return self._shift_to_next_batch(self.seek_batch("next"))
+
+    def goto_prev_batch(self) -> list:
+        """
+        Attempt to fetch and return a list of the previous batch of tickets.
+        If successful, update the current, next, and previous URL pointers.
+        Return an empty list if unsuccessful.
+        """
+        # attemp to fetch the previous batch of tickets
+        return self._shift_to_prev_batch(self.seek_batch("prev"))
+
+    def _request_export_page(self, url) -> dict:
+        """
+        Request a page of full tickets at the specified URL as a background request, or
+        read it from the mirror if it is a `mirror://tickets` URL, bypassing the batch
+        cache and the ETag store so that no page outlives the export. Return the JSON
+        results as a dict. Raise a RuntimeError if the HTTP response is not 200 (thus
+        unsuccessful).
+        """
+        if url.startswith(MIRROR_URL_ROOT):
+            if self.mirror is None:
+                raise RuntimeError(f"No ticket mirror to read {url} from.")
+            return self.mirror.get_batch(url)
+
+        response = self.http_client.get(
+            url, auth=self.auth_tuple, priority=PRIORITY_BACKGROUND
+        )
+
+        # handle when HTTP request is unsuccessful
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"""
+                Failed to fetch a page of tickets to export.
+                Status: {response.status_code}
+                URL: {url}
+                """
+            )
+
+        return decode_json(response)
+
+    def iter_tickets(self, page_size: int = EXPORT_PAGE_SIZE) -> Iterator[dict]:
+        """
+        Yield the full ticket dicts of every ticket matching the current query, walking
+        the cursor pagination from the first batch in pages of `page_size` tickets. The
+        next page is requested on the shared export pool while the tickets of the current
+        one are consumed, so at most two pages are held at a time, however many tickets
+        the account has. Does NOT modify the URL pointers. Raise a RuntimeError if a page
+        cannot be fetched, since an export must not silently skip tickets.
+        """
+        # run each fetch in a copy of the caller's context, as in `get_neighbours()`
+        url: str = self._first_batch_url(page_size)
+        future: Optional[Future] = \
+            _export_pool.submit(copy_context().run, self._request_export_page, url)
+
+        try:
+            while future is not None:
+                page: dict = future.result()
+                tickets: list = page['tickets']
+                next_url: Optional[str] = page['links'].get('next')
+
+                # request the next page before handing out the tickets of this one; the
+                # walk ends on an empty page, or once Zendesk reports no more tickets
+                future = None
+                if tickets and next_url and page.get('meta', {}).get('has_more', True):
+                    future = _export_pool.submit(
+                        copy_context().run, self._request_export_page, next_url
+                    )
+
+                yield from tickets
+
+        finally:
+            # stop fetching if the consumer gave up early
+            if future is not None:
+                future.cancel()
+
+
+class AsyncAllTickets(AllTickets):
+    """
+    A variant of AllTickets whose upstream requests are made through the asynchronous
+    HTTP client, so that awaiting them does not hold an OS thread. Adds coroutine
+    counterparts, prefixed with `a`, of the public methods; the synchronous methods
+    remain available.
+    """
+
+    def __init__(
+        self,
+        api_url_root: str,
+        auth_tuple: tuple[str, str],
+        page_size: int = 25,
+        async_http_client: Optional[AsyncZendeskHTTPClient] = None,
+        **kwargs
+    ) -> None:
+        """
+        Accept the same parameters as AllTickets. Async requests go through
+        `async_http_client`, or the process-wide async client if omitted.
+        """
+        super().__init__(api_url_root, auth_tuple, page_size, **kwargs)
+        self.async_http_client: AsyncZendeskHTTPClient = \
+            async_http_client or get_async_http_client()
+
+    async def _arequest_tickets(self, url) -> dict:
+        """
+        Request a batch of tickets as in `_request_tickets()`, asynchronously.
+        """
+        try:
+            if url.startswith(MIRROR_URL_ROOT):
+                return self._read_mirror(url)
+
+            # perform a conditional GET request, reusing the decoded batch if unchanged
+            return await self.async_http_client.get_decoded(
+                url, self.auth_tuple, lambda response: self._decode_tickets(response, url)
+            )
+
+        except Exception as e:
+            print(f'---\n{e}\n---')
+
+        return {}
+
+    async def _afetch_block(self, block_url) -> dict:
+        """
+        Return a block of tickets as in `_fetch_block()`, asynchronously.
+        """
+        block: Optional[dict] = self._batch_cache.get(block_url)
+
+        if block is None:
+            block = await self._arequest_tickets(block_url)
+            self._remember_batch(block_url, block)
+
+        return block
+
+    async def _afetch_batch(self, url) -> dict:
+        """
+        Return a batch of tickets as in `_fetch_batch()`, asynchronously.
+        """
+        block_url, offset = split_batch_url(url)
+        return self._batch_of_block(block_url, offset, await self._afetch_block(block_url))
+
+    async def aget_current_batch(self) -> list:
+        """
+        Fetch the current batch of tickets as in `get_current_batch()`, asynchronously.
+        """
+        return self._apply_current_batch(await self._afetch_batch(self._url_curr))
+
+    async def aseek_batch(self, direction) -> dict:
+        """
+        Fetch the previous or the next batch of tickets as in `seek_batch()`,
+        asynchronously.
+        """
+        url: str = self._seek_url(direction)
+        return self._available_batch(await self._afetch_batch(url)) if url else {}
+
+    async def aget_batch_window(self) -> tuple[list, dict, dict]:
+        """
+        Fetch the current batch of tickets along with its neighbours as in
+        `get_batch_window()`, awaiting both neighbours concurrently instead of using the
+        neighbour thread pool.
+        """
+        current_list: list = await self.aget_current_batch()
+
+        if not current_list:
+            return [], {}, {}
+
+        return (current_list, *await self.aget_neighbours())
+
+    async def aget_neighbours(self) -> tuple[dict, dict]:
+        """
+        Fetch the previous and next batches of tickets as in `get_neighbours()`, awaiting
+        both concurrently instead of using the neighbour thread pool.
+        """
+        prev_batch, next_batch = await asyncio.gather(
+            self.aseek_batch("prev"), self.aseek_batch("next")
+        )
+        return prev_batch, next_batch
+
+    async def agoto_next_batch(self) -> list:
+        """
+        Move to the next batch of tickets as in `goto_next_batch()`, asynchronously.
+        """
+        return self._shift_to_next_batch(await self.aseek_batch("next"))
+
+    async def agoto_prev_batch(self) -> list:
+        """
+        Move to the previous batch of tickets as in `goto_prev_batch()`, asynchronously.
+        """
+        return self._shift_to_prev_batch(await self.aseek_batch("prev"))
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3.9
+"""
+An asynchronous pooled HTTP client shared by every async upstream request made to the
+Zendesk API.
+
+All requests are multiplexed over one `httpx.AsyncClient` running on a dedicated event
+loop thread, so many slow upstream requests can be in flight at once without holding an
+OS thread each. Coroutines running on any other event loop, such as the per-request loop
+of a Flask async view, can await the client's requests. Requests share the process-wide
+rate limit scheduler with the synchronous client, and identical concurrent requests share
+a single upstream request. Requests made through `get_decoded()` are conditional, and
+every request is recorded in the process-wide metrics and in the `Server-Timing`
+breakdown of the app request awaiting it, as with the synchronous client.
+
+Public methods:
+    - AsyncZendeskHTTPClient(pool_maxsize: int = 100, connect_timeout: float = 3.05,
+                             read_timeout: float = 10.0,
+                             transport: Optional[httpx.AsyncBaseTransport] = None,
+                             scheduler: Optional[RateLimitScheduler] = None,
+                             etag_store_size: int = 256)
+    - await AsyncZendeskHTTPClient.get(url: str, auth: tuple[str, str],
+                                       priority: int = PRIORITY_INTERACTIVE,
+                                       headers: Optional[dict] = None) -> httpx.Response
+    - await AsyncZendeskHTTPClient.get_decoded(url: str, auth: tuple[str, str],
+                                               decode: Callable[[httpx.Response], Any],
+                                               priority: int = PRIORITY_INTERACTIVE)
+          -> Any
+    - AsyncZendeskHTTPClient.close() -> None
+    - get_async_http_client() -> AsyncZendeskHTTPClient
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import httpx
+
+from main.metrics import observe_upstream, upstream_queue
+from main.server_timing import timed
+from main.upstream.cache import TTLCache
+from main.upstream.rate_limit import (
+    PRIORITY_INTERACTIVE, PRIORITY_NAMES, RateLimitScheduler, get_rate_limit_scheduler
+)
+from main.upstream.single_flight import AsyncSingleFlight
+
+
+class AsyncZendeskHTTPClient:
+    """
+    A wrapper around an `httpx.AsyncClient` with a bounded keep-alive connection pool and
+    default timeouts, owned by its own event loop thread.
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = 100,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        scheduler: Optional[RateLimitScheduler] = None,
+        etag_store_size: int = 256
+    ) -> None:
+        """
+        Start the event loop thread and create the underlying client on it.
+        `pool_maxsize` is the number of concurrent connections kept per upstream host;
+        requests beyond that wait for a pooled connection to free up. A `transport` may
+        be given to replace the network, e.g. with an `httpx.MockTransport` in tests.
+        Requests are paced by `scheduler`, or the process-wide scheduler if omitted.
+        The ETags and decoded bodies of up to `etag_store_size` URLs are kept for
+        conditional requests.
+        """
+        self.pool_maxsize: int = pool_maxsize
+        self.timeout: tuple[float, float] = (connect_timeout, read_timeout)
+        self.scheduler: RateLimitScheduler = scheduler or get_rate_limit_scheduler()
+        self._single_flight: AsyncSingleFlight = AsyncSingleFlight()
+        self.etag_store: TTLCache = TTLCache(maxsize=etag_store_size, name='etags')
+
+        self._loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self._thread: threading.Thread = threading.Thread(
+            target=self._loop.run_forever, name='async-upstream', daemon=True
+        )
+        self._thread.start()
+
+        async def make_client() -> httpx.AsyncClient:
+            return httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=pool_maxsize,
+                    max_keepalive_connections=pool_maxsize,
+                ),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                transport=transport,
+            )
+
+        self._client: httpx.AsyncClient = asyncio.run_coroutine_threadsafe(
+            make_client(), self._loop
+        ).result()
+
+    async def _get(
+        self,
+        url: str,
+        auth: tuple[str, str],
+        priority: int,
+        headers: Optional[dict] = None
+    ) -> httpx.Response:
+        """
+        Perform a GET request on the client's own event loop, paced and retried like the
+        synchronous client's requests, including the wait budget of interactive requests.
+        """
+        attempt: int = 0
+        deadline: Optional[float] = self.scheduler.deadline(priority)
+        response: Optional[httpx.Response] = None
+
+        while True:
+            queued_at: float = time.perf_counter()
+            if not await self.scheduler.acquire_async(priority, deadline):
+                if response is not None:
+                    return response
+                return httpx.Response(429, request=httpx.Request('GET', url))
+            sent_at: float = time.perf_counter()
+            response = await self._client.get(url, auth=auth, headers=headers)
+            self.scheduler.observe(response.status_code, response.headers)
+
+            upstream_queue.observe(sent_at - queued_at, priority=PRIORITY_NAMES[priority])
+            observe_upstream(
+                url, response.status_code, time.perf_counter() - sent_at,
+                len(response.content)
+            )
+
+            if not self.scheduler.should_retry(response.status_code, attempt):
+                return response
+
+            delay: float = self.scheduler.retry_delay(attempt, response.headers)
+            if not self.scheduler.can_wait(delay, deadline):
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(
+        self,
+        url: str,
+        auth: tuple[str, str],
+        priority: int = PRIORITY_INTERACTIVE,
+        headers: Optional[dict] = None
+    ) -> httpx.Response:
+        """
+        Perform a GET request at the specified URL over a pooled connection, with the
+        configured connect/read timeouts and any extra `headers`, once the rate limit
+        scheduler lets a request of the given priority through, and await its response
+        from any event loop. Retry while Zendesk answers that it is rate limited, and
+        return the last response. Callers requesting the same URL with the same
+        credentials, priority and headers while a request is in flight share its
+        response.
+        """
+        # requests of different priorities are never shared, so that an interactive
+        # request never waits behind the background reserve of a coalesced one
+        key: tuple = (url, auth, priority, tuple(sorted((headers or {}).items())))
+        shared_get = self._single_flight.do(
+            key, lambda: self._get(url, auth, priority, headers)
+        )
+        with timed('upstream'):
+            return await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(shared_get, self._loop)
+            )
+
+    async def get_decoded(
+        self,
+        url: str,
+        auth: tuple[str, str],
+        decode: Callable[[httpx.Response], Any],
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Any:
+        """
+        Perform a conditional GET request as in `ZendeskHTTPClient.get_decoded()`, and
+        await its decoded response from any event loop.
+        """
+        stored: Optional[tuple[str, Any]] = self.etag_store.get((url, auth))
+        headers: dict = {'If-None-Match': stored[0]} if stored else {}
+
+        response: httpx.Response = await self.get(url, auth, priority, headers)
+        if response.status_code == 304 and stored is not None:
+            return stored[1]
+
+        with timed('decode'):
+            decoded: Any = decode(response)
+        if etag := response.headers.get('ETag'):
+            self.etag_store.put((url, auth), (etag, decoded))
+        return decoded
+
+    def close(self) -> None:
+        """
+        Close all pooled connections and stop the event loop thread.
+        """
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+# the process-wide client, created on first use
+_async_http_client: Optional[AsyncZendeskHTTPClient] = None
+_async_http_client_lock: threading.Lock = threading.Lock()
+
+
+def get_async_http_client() -> AsyncZendeskHTTPClient:
+    """
+    Return the process-wide AsyncZendeskHTTPClient, creating it on first use from the
+    configuration in `zendesk_common`.
+    """
+    global _async_http_client
+
+    with _async_http_client_lock:
+        if _async_http_client is None:
+            from main.upstream.zendesk_common import (
+                CONNECT_TIMEOUT, READ_TIMEOUT, ETAG_STORE_SIZE
+            )
+            _async_http_client = AsyncZendeskHTTPClient(
+                connect_timeout=CONNECT_TIMEOUT,
+                read_timeout=READ_TIMEOUT,
+                etag_store_size=ETAG_STORE_SIZE,
+            )
+
+    return _async_http_client
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3.9
+"""
+A small thread-safe in-memory cache with a maximum size, per-entry time-to-live, and
+least-recently-used eviction, used to avoid repeating upstream Zendesk requests.
+
+Public methods:
+    - TTLCache(maxsize: int, ttl: Optional[float] = None, sliding: bool = False,
+               name: Optional[str] = None)
+    - TTLCache.get(key: Hashable) -> Optional[Any]
+    - TTLCache.put(key: Hashable, value: Any) -> None
+    - TTLCache.pop(key: Hashable) -> Optional[Any]
+    - TTLCache.purge_expired() -> int
+    - TTLCache.clear() -> None
+    - len(TTLCache) -> int
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from main.metrics import cache_evictions, cache_requests
+
+
+class TTLCache:
+    """
+    A bounded mapping whose entries expire `ttl` seconds after they were stored, and
+    whose least recently used entry is evicted once more than `maxsize` entries are held.
+    Keeps hit, miss, eviction and expiration counters for instrumentation; the hits,
+    misses and evictions of a named cache are also added to the process-wide metrics,
+    together with those of every other cache of the same name.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        sliding: bool = False,
+        name: Optional[str] = None
+    ) -> None:
+        """
+        Save the maximum number of entries and the time-to-live in seconds. A `ttl` of
+        None means entries never expire and are only evicted by size. If `sliding` is
+        set, the time-to-live of an entry restarts whenever it is read, so that entries
+        expire after being idle for `ttl` seconds. If `name` is set, the cache's counters
+        are reported in the metrics under that name.
+        """
+        self.maxsize: int = maxsize
+        self.ttl: Optional[float] = ttl
+        self.sliding: bool = sliding
+        self.name: Optional[str] = name
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+        self._entries: OrderedDict = OrderedDict()  # key -> (stored_at, value)
+        self._lock: threading.Lock = threading.Lock()
+
+    def _is_expired(self, stored_at: float) -> bool:
+        """
+        Return whether an entry stored at the monotonic time `stored_at` has expired.
+        """
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the value stored under `key` and mark it as most recently used.
+        Return None if the key is absent or its entry has expired.
+        """
+        with self._lock:
+            entry: Optional[tuple] = self._entries.get(key)
+
+            if entry is None:
+                self._count_miss()
+                return None
+
+            if self._is_expired(entry[0]):
+                # drop the stale entry so that it does not occupy space
+                del self._entries[key]
+                self.expirations += 1
+                self._count_miss()
+                return None
+
+            if self.sliding:
+                self._entries[key] = (time.monotonic(), entry[1])
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if self.name:
+                cache_requests.inc(cache=self.name, result='hit')
+            return entry[1]
+
+    def _count_miss(self) -> None:
+        """
+        Count a lookup that found no live entry.
+        """
+        self.misses += 1
+        if self.name:
+            cache_requests.inc(cache=self.name, result='miss')
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store `value` under `key`, resetting its time-to-live, and evict the least
+        recently used entries if the cache grows beyond `maxsize`.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                if self.name:
+                    cache_evictions.inc(cache=self.name)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """
+        Remove and return the value stored under `key`, or None if it is absent.
+        """
+        with self._lock:
+            entry: Optional[tuple] = self._entries.pop(key, None)
+
+        return None if entry is None else entry[1]
+
+    def purge_expired(self) -> int:
+        """
+        Remove expired entries, starting from the least recently used end and stopping
+        at the first live entry. This finds every expired entry in a sliding cache, where
+        recency order is also expiry order. Return the number of entries removed.
+        """
+        purged: int = 0
+
+        with self._lock:
+            while self._entries:
+                key, (stored_at, _) = next(iter(self._entries.items()))
+                if not self._is_expired(stored_at):
+                    break
+                del self._entries[key]
+                purged += 1
+
+            self.expirations += purged
+
+        return purged
+
+    def clear(self) -> None:
+        """
+        Remove all entries; the counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries held, including any not yet purged after expiry.
+        """
+        return len(self._entries)
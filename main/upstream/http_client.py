@@ -0,0 +1,227 @@
+#!/usr/bin/env python3.9
+"""
+A pooled HTTP client shared by every upstream request made to the Zendesk API.
+
+Keeps TCP/TLS connections to `{subdomain}.zendesk.com` alive between requests, limits
+the number of pooled connections per host, and applies connect/read timeouts to every
+request so that a slow upstream socket cannot hold a worker thread indefinitely. Every
+request is paced by the process-wide rate limit scheduler, and retried when Zendesk
+answers that it is rate limited; interactive requests give up and return the 429
+response rather than wait past the scheduler's budget. Identical requests made concurrently, e.g. by many new
+sessions loading the first page at once, share a single upstream request.
+
+Requests made through `get_decoded()` are conditional: the client remembers the ETag of
+each URL's last response along with its decoded body, in a bounded store, and sends it
+back in an `If-None-Match` header, so that an unchanged resource is neither downloaded
+nor decoded again.
+
+Every request is recorded in the process-wide metrics: its endpoint, status, duration,
+response size, and the time it waited for the rate limit scheduler. The time spent
+waiting for responses and decoding them is also added to the `Server-Timing` breakdown
+of the app request that made it.
+
+Public methods:
+    - ZendeskHTTPClient(pool_maxsize: int = 10, connect_timeout: float = 3.05,
+                        read_timeout: float = 10.0,
+                        scheduler: Optional[RateLimitScheduler] = None,
+                        etag_store_size: int = 256)
+    - ZendeskHTTPClient.get(url: str, auth: tuple[str, str],
+                            priority: int = PRIORITY_INTERACTIVE,
+                            headers: Optional[dict] = None) -> requests.Response
+    - ZendeskHTTPClient.get_decoded(url: str, auth: tuple[str, str],
+                                    decode: Callable[[requests.Response], Any],
+                                    priority: int = PRIORITY_INTERACTIVE) -> Any
+    - ZendeskHTTPClient.close() -> None
+    - get_http_client() -> ZendeskHTTPClient
+"""
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from main.metrics import observe_upstream, upstream_queue
+from main.server_timing import timed
+from main.upstream.cache import TTLCache
+from main.upstream.rate_limit import (
+    PRIORITY_INTERACTIVE, PRIORITY_NAMES, RateLimitScheduler, get_rate_limit_scheduler
+)
+from main.upstream.single_flight import SingleFlight
+
+
+class ZendeskHTTPClient:
+    """
+    A thin wrapper around a `requests.Session` with a bounded keep-alive connection pool
+    and default timeouts.
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        scheduler: Optional[RateLimitScheduler] = None,
+        etag_store_size: int = 256
+    ) -> None:
+        """
+        Create the underlying session and mount a pooled adapter for both HTTP and HTTPS.
+        `pool_maxsize` is the number of keep-alive connections kept per upstream host;
+        requests beyond that block until a pooled connection frees up, rather than
+        opening unbounded extra sockets. Requests are paced by `scheduler`, or the
+        process-wide rate limit scheduler if omitted. The ETags and decoded bodies of up
+        to `etag_store_size` URLs are kept for conditional requests.
+        """
+        self.pool_maxsize: int = pool_maxsize
+        self.timeout: tuple[float, float] = (connect_timeout, read_timeout)
+        self.scheduler: RateLimitScheduler = scheduler or get_rate_limit_scheduler()
+        self._single_flight: SingleFlight = SingleFlight()
+        self.etag_store: TTLCache = TTLCache(maxsize=etag_store_size, name='etags')
+
+        self._session: requests.Session = requests.Session()
+        adapter: HTTPAdapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,
+        )
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def get(
+        self,
+        url: str,
+        auth: tuple[str, str],
+        priority: int = PRIORITY_INTERACTIVE,
+        headers: Optional[dict] = None
+    ) -> requests.Response:
+        """
+        Perform a GET request at the specified URL over a pooled connection, with the
+        configured connect/read timeouts and any extra `headers`, once the rate limit
+        scheduler lets a request of the given priority through. Retry while Zendesk
+        answers that it is rate limited, and return the last response. Callers requesting
+        the same URL with the same credentials, priority and headers while a request is
+        in flight share its response.
+        """
+        # requests of different priorities are never shared, so that an interactive
+        # request never waits behind the background reserve of a coalesced one
+        key: tuple = (url, auth, priority, tuple(sorted((headers or {}).items())))
+        with timed('upstream'):
+            return self._single_flight.do(
+                key, lambda: self._get(url, auth, priority, headers)
+            )
+
+    def get_decoded(
+        self,
+        url: str,
+        auth: tuple[str, str],
+        decode: Callable[[requests.Response], Any],
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Any:
+        """
+        Perform a conditional GET request at the specified URL as in `get()`, and return
+        its response decoded by `decode`. If the URL's ETag is remembered, send it in an
+        `If-None-Match` header, and return the remembered decoded body if Zendesk answers
+        304 Not Modified. The decoded body is shared by all callers, and must not be
+        modified. Exceptions raised by `decode` propagate, and nothing is remembered.
+        """
+        # the remembered ETag and decoded body, held on to in case they are evicted
+        stored: Optional[tuple[str, Any]] = self.etag_store.get((url, auth))
+        headers: dict = {'If-None-Match': stored[0]} if stored else {}
+
+        response: requests.Response = self.get(url, auth, priority, headers)
+        if response.status_code == 304 and stored is not None:
+            return stored[1]
+
+        with timed('decode'):
+            decoded: Any = decode(response)
+        if etag := response.headers.get('ETag'):
+            self.etag_store.put((url, auth), (etag, decoded))
+        return decoded
+
+    def _get(
+        self,
+        url: str,
+        auth: tuple[str, str],
+        priority: int,
+        headers: Optional[dict] = None
+    ) -> requests.Response:
+        """
+        Perform a paced GET request, retrying while Zendesk answers that it is rate
+        limited, and return the last response. An interactive request that would wait
+        past its budget is answered with the last response, or a bodiless 429 response
+        if it was never sent.
+        """
+        attempt: int = 0
+        deadline: Optional[float] = self.scheduler.deadline(priority)
+        response: Optional[requests.Response] = None
+
+        while True:
+            queued_at: float = time.perf_counter()
+            if not self.scheduler.acquire(priority, deadline):
+                return response if response is not None else self._rate_limited(url)
+            sent_at: float = time.perf_counter()
+            response = \
+                self._session.get(url, auth=auth, timeout=self.timeout, headers=headers)
+            self.scheduler.observe(response.status_code, response.headers)
+
+            # record the wait for the scheduler apart from the request itself
+            upstream_queue.observe(sent_at - queued_at, priority=PRIORITY_NAMES[priority])
+            observe_upstream(
+                url, response.status_code, time.perf_counter() - sent_at,
+                len(response.content)
+            )
+
+            if not self.scheduler.should_retry(response.status_code, attempt):
+                return response
+
+            delay: float = self.scheduler.retry_delay(attempt, response.headers)
+            if not self.scheduler.can_wait(delay, deadline):
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _rate_limited(url: str) -> requests.Response:
+        """
+        Return a bodiless 429 response for a request that was not sent, because the wait
+        for the rate limit would have outlasted its budget.
+        """
+        response: requests.Response = requests.Response()
+        response.status_code = 429
+        response.url = url
+        response._content = b''
+        return response
+
+    def close(self) -> None:
+        """
+        Close all pooled connections.
+        """
+        self._session.close()
+
+
+# the process-wide client, created on first use
+_http_client: Optional[ZendeskHTTPClient] = None
+_http_client_lock: threading.Lock = threading.Lock()
+
+
+def get_http_client() -> ZendeskHTTPClient:
+    """
+    Return the process-wide ZendeskHTTPClient, creating it on first use from the
+    configuration in `zendesk_common`.
+    """
+    global _http_client
+
+    with _http_client_lock:
+        if _http_client is None:
+            from main.upstream.zendesk_common import (
+                CONNECT_TIMEOUT, READ_TIMEOUT, POOL_MAXSIZE, ETAG_STORE_SIZE
+            )
+            _http_client = ZendeskHTTPClient(
+                pool_maxsize=POOL_MAXSIZE,
+                connect_timeout=CONNECT_TIMEOUT,
+                read_timeout=READ_TIMEOUT,
+                etag_store_size=ETAG_STORE_SIZE,
+            )
+
+    return _http_client
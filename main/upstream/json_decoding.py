@@ -0,0 +1,104 @@
+#!/usr/bin/env python3.9
+"""
+Decode the JSON bodies of Zendesk API responses with the fastest JSON backend available:
+`orjson` if it is installed, otherwise the standard library's `json` module. The backend
+can be forced with the ZENDESK_JSON_BACKEND environment variable, e.g. to compare them.
+The variable is read on the first decoding with the default backend, not on import, so
+that an unavailable backend raises an EnvironmentError only then.
+
+Bodies are decoded straight from their bytes, skipping the text decoding and encoding
+detection of `requests.Response.json()`. Pages of tickets for the ticket list are reduced
+to their TicketSummary records while they are decoded, so the full ticket dicts, with
+their descriptions, custom fields and other fields the list never reads, are dropped as
+soon as the page is parsed instead of being held along with the batch.
+
+To compare the backends on pages of 25 and 100 tickets, run from the project repository
+root:
+    python3.9 -m bench.bench_json
+
+Public methods:
+    - get_backend() -> str
+    - loads(data: Union[bytes, str], backend: Optional[str] = None) -> Any
+    - decode_json(response: Any) -> Any
+    - decode_ticket_page(content: bytes, backend: Optional[str] = None) -> dict
+"""
+
+import json
+import os
+from typing import Any, Callable, Optional, Union
+
+from main.upstream.ticket_summary import TicketSummary
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; responses are then decoded by the json module
+    orjson = None  # type: ignore[assignment]
+
+
+# the available backends, keyed by name, in order of preference
+BACKENDS: dict[str, Callable[[Union[bytes, str]], Any]] = {'json': json.loads}
+if orjson is not None:
+    BACKENDS = {'orjson': orjson.loads, **BACKENDS}
+
+# the backend used unless another is asked for, chosen on first use
+_json_backend: Optional[str] = None
+
+
+def get_backend() -> str:
+    """
+    Return the name of the backend used unless another is asked for: the one named by
+    the ZENDESK_JSON_BACKEND environment variable, or the preferred available one if it
+    is not set. Raise an EnvironmentError if the variable names an unavailable backend.
+    """
+    global _json_backend
+
+    if _json_backend is None:
+        name: str = os.getenv("ZENDESK_JSON_BACKEND") or next(iter(BACKENDS))
+        if name not in BACKENDS:
+            raise EnvironmentError(
+                f"\tError: JSON backend {name} is not available; "
+                f"choose one of: {', '.join(BACKENDS)}."
+            )
+        _json_backend = name
+
+    return _json_backend
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Resolve the module-level name JSON_BACKEND, the default backend, on access.
+    """
+    if name == 'JSON_BACKEND':
+        return get_backend()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def loads(data: Union[bytes, str], backend: Optional[str] = None) -> Any:
+    """
+    Decode a JSON document with the given backend, or the default one if omitted.
+    """
+    return BACKENDS[backend or get_backend()](data)
+
+
+def decode_json(response: Any) -> Any:
+    """
+    Decode the JSON body of a `requests` or `httpx` response from its bytes.
+    """
+    return loads(response.content)
+
+
+def decode_ticket_page(content: bytes, backend: Optional[str] = None) -> dict:
+    """
+    Decode the body of a `/tickets.json` response into the shape returned by
+    `summarize_batch()`: its tickets as TicketSummary records, and its links. Each full
+    ticket dict is released as soon as its summary is built.
+    """
+    page: dict = loads(content, backend)
+    tickets: list = page['tickets']
+
+    # replace each ticket by its summary in place, so that no second list is built
+    for i, ticket in enumerate(tickets):
+        tickets[i] = TicketSummary.from_dict(ticket)
+
+    return {'tickets': tickets, 'links': page['links']}
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3.9
+"""
+A token-bucket scheduler that paces every upstream request made to the Zendesk API so
+that the app as a whole stays under the account's API rate limit.
+
+The bucket holds up to one minute's worth of requests and refills continuously. It
+follows the `X-Rate-Limit` and `X-Rate-Limit-Remaining` headers of upstream responses,
+pauses all requests for the `Retry-After` period of a 429 response, and reserves part of
+the bucket for interactive requests, which also take precedence over waiting background
+requests. Interactive requests only wait, for tokens or between retries, within a
+budget of a few seconds, so that a long `Retry-After` period cannot hold the worker
+thread of a page load for minutes; past it they are answered with the 429 response.
+
+Public methods:
+    - RateLimitScheduler(rate_per_minute: int = 200, background_reserve: float = 0.2,
+                         max_retries: int = 3, backoff_base: float = 0.5,
+                         backoff_cap: float = 8.0, interactive_wait_budget: float = 5.0)
+    - RateLimitScheduler.deadline(priority: int) -> Optional[float]
+    - RateLimitScheduler.can_wait(delay: float, deadline: Optional[float]) -> bool
+    - RateLimitScheduler.acquire(priority: int = PRIORITY_INTERACTIVE,
+                                 deadline: Optional[float] = None) -> bool
+    - await RateLimitScheduler.acquire_async(priority: int = PRIORITY_INTERACTIVE,
+                                             deadline: Optional[float] = None) -> bool
+    - RateLimitScheduler.under_pressure() -> bool
+    - RateLimitScheduler.observe(status_code: int, headers: Mapping) -> None
+    - RateLimitScheduler.should_retry(status_code: int, attempt: int) -> bool
+    - RateLimitScheduler.retry_delay(attempt: int, headers: Mapping) -> float
+    - get_rate_limit_scheduler() -> RateLimitScheduler
+"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Mapping, Optional
+
+
+# request priorities; interactive requests serve a user waiting on a page, background
+# requests only warm caches
+PRIORITY_INTERACTIVE: int = 0
+PRIORITY_BACKGROUND: int = 1
+PRIORITY_NAMES: dict[int, str] = {
+    PRIORITY_INTERACTIVE: 'interactive', PRIORITY_BACKGROUND: 'background'
+}
+
+# upstream status codes that mean "slow down and try again"
+RETRY_STATUS_CODES: frozenset = frozenset({429, 503})
+
+# the longest a waiting request sleeps before re-checking the bucket
+MAX_POLL_INTERVAL: float = 1.0
+
+
+class RateLimitScheduler:
+    """
+    A thread-safe token bucket shared by all upstream requests of a process.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: int = 200,
+        background_reserve: float = 0.2,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+        interactive_wait_budget: float = 5.0
+    ) -> None:
+        """
+        Save the initial rate limit in requests per minute, which later follows the
+        `X-Rate-Limit` response header, and start with a full bucket. Background requests
+        may not take the last `background_reserve` fraction of the bucket. Requests
+        answered with 429 or 503 are retried up to `max_retries` times, after the
+        `Retry-After` period or otherwise a jittered exponential backoff of
+        `backoff_base` seconds doubling up to `backoff_cap` seconds. An interactive
+        request waits at most `interactive_wait_budget` seconds in total.
+        """
+        self.rate_per_minute: int = rate_per_minute
+        self.background_reserve: float = background_reserve
+        self.max_retries: int = max_retries
+        self.backoff_base: float = backoff_base
+        self.backoff_cap: float = backoff_cap
+        self.interactive_wait_budget: float = interactive_wait_budget
+
+        self._tokens: float = float(rate_per_minute)
+        self._refilled_at: float = time.monotonic()
+        self._paused_until: float = 0.0
+        self._interactive_waiting: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """
+        Add the tokens accrued since the last refill, up to a full bucket.
+        """
+        self._tokens = min(
+            float(self.rate_per_minute),
+            self._tokens + (now - self._refilled_at) * self.rate_per_minute / 60,
+        )
+        self._refilled_at = now
+
+    def try_acquire(self, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """
+        Take a token for a request of the given priority if one may be taken now, and
+        return 0. Otherwise return the number of seconds to wait before trying again.
+        """
+        with self._lock:
+            now: float = time.monotonic()
+            self._refill(now)
+
+            # every request waits out a Retry-After pause
+            if now < self._paused_until:
+                return self._paused_until - now
+
+            # background requests leave a reserve, and give way to interactive ones
+            needed: float = 1.0
+            if priority == PRIORITY_BACKGROUND:
+                if self._interactive_waiting:
+                    return MAX_POLL_INTERVAL / 10
+                needed += self.background_reserve * self.rate_per_minute
+
+            if self._tokens >= needed:
+                self._tokens -= 1
+                return 0.0
+
+            return (needed - self._tokens) * 60 / self.rate_per_minute
+
+    def under_pressure(self) -> bool:
+        """
+        Return whether a background request would have to wait now, because requests are
+        paused, interactive requests are waiting, or the bucket is down to the reserve of
+        interactive requests. Background work that may be skipped should then be skipped.
+        """
+        with self._lock:
+            now: float = time.monotonic()
+            self._refill(now)
+
+            return now < self._paused_until or self._interactive_waiting > 0 or \
+                self._tokens < 1.0 + self.background_reserve * self.rate_per_minute
+
+    @contextmanager
+    def _waiting(self, priority: int) -> Iterator[None]:
+        """
+        Count interactive requests while they wait for a token.
+        """
+        if priority == PRIORITY_INTERACTIVE:
+            with self._lock:
+                self._interactive_waiting += 1
+        try:
+            yield
+        finally:
+            if priority == PRIORITY_INTERACTIVE:
+                with self._lock:
+                    self._interactive_waiting -= 1
+
+    def deadline(self, priority: int) -> Optional[float]:
+        """
+        Return the monotonic time by which a request of the given priority starting now
+        must stop waiting: the end of the wait budget for interactive requests, and None
+        for background requests, which may wait as long as needed.
+        """
+        if priority == PRIORITY_INTERACTIVE:
+            return time.monotonic() + self.interactive_wait_budget
+        return None
+
+    @staticmethod
+    def can_wait(delay: float, deadline: Optional[float]) -> bool:
+        """
+        Return whether waiting `delay` seconds from now ends by the `deadline`, if any.
+        """
+        return deadline is None or time.monotonic() + delay <= deadline
+
+    def acquire(
+        self, priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None
+    ) -> bool:
+        """
+        Block the calling thread until a token is taken for a request of the given
+        priority, and return True. Return False without taking a token as soon as the
+        wait is known to outlast the `deadline`, if one is given.
+        """
+        with self._waiting(priority):
+            while (delay := self.try_acquire(priority)) > 0:
+                if not self.can_wait(delay, deadline):
+                    return False
+                time.sleep(min(delay, MAX_POLL_INTERVAL))
+        return True
+
+    async def acquire_async(
+        self, priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None
+    ) -> bool:
+        """
+        Wait without blocking the event loop until a token is taken for a request of the
+        given priority, and return True, or return False like `acquire()` once the wait
+        is known to outlast the `deadline`.
+        """
+        with self._waiting(priority):
+            while (delay := self.try_acquire(priority)) > 0:
+                if not self.can_wait(delay, deadline):
+                    return False
+                await asyncio.sleep(min(delay, MAX_POLL_INTERVAL))
+        return True
+
+    @staticmethod
+    def _retry_after(headers: Mapping) -> Optional[float]:
+        """
+        Return the `Retry-After` period of a response in seconds, or None if absent.
+        """
+        try:
+            return max(0.0, float(headers['Retry-After']))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def observe(self, status_code: int, headers: Mapping) -> None:
+        """
+        Update the bucket from the rate limit headers of an upstream response: follow the
+        account's limit, never hold more tokens than the requests Zendesk says remain,
+        and pause all requests for the `Retry-After` period of a 429 or 503 response.
+        """
+        with self._lock:
+            try:
+                if (limit := int(headers['X-Rate-Limit'])) > 0:
+                    self.rate_per_minute = limit
+            except (KeyError, TypeError, ValueError):
+                pass
+
+            try:
+                self._tokens = min(self._tokens, float(headers['X-Rate-Limit-Remaining']))
+            except (KeyError, TypeError, ValueError):
+                pass
+
+            if status_code in RETRY_STATUS_CODES:
+                retry_after: Optional[float] = self._retry_after(headers)
+                if retry_after is not None:
+                    self._paused_until = max(
+                        self._paused_until, time.monotonic() + retry_after
+                    )
+
+    def should_retry(self, status_code: int, attempt: int) -> bool:
+        """
+        Return whether a request answered with `status_code` on its `attempt`-th try,
+        counting from 0, should be retried.
+        """
+        return status_code in RETRY_STATUS_CODES and attempt < self.max_retries
+
+    def retry_delay(self, attempt: int, headers: Mapping) -> float:
+        """
+        Return the number of seconds to wait before retrying a request after its
+        `attempt`-th try, counting from 0: a "full jitter" exponential backoff, after the
+        response's `Retry-After` period if given, so that retries of many requests
+        rejected at once are spread out.
+        """
+        jitter: float = random.uniform(
+            0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+        )
+
+        retry_after: Optional[float] = self._retry_after(headers)
+        if retry_after is not None:
+            return retry_after + jitter
+
+        return jitter
+
+
+# the process-wide scheduler, created on first use
+_scheduler: Optional[RateLimitScheduler] = None
+_scheduler_lock: threading.Lock = threading.Lock()
+
+
+def get_rate_limit_scheduler() -> RateLimitScheduler:
+    """
+    Return the process-wide RateLimitScheduler, creating it on first use from the
+    configuration in `zendesk_common`.
+    """
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            from main.upstream.zendesk_common import RATE_LIMIT
+            _scheduler = RateLimitScheduler(rate_per_minute=RATE_LIMIT)
+
+    return _scheduler
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3.9
+"""
+Request coalescing ("single-flight") for identical concurrent upstream requests: while a
+request for a key is in flight, further callers asking for the same key wait for it and
+share its result instead of making their own request.
+
+Public methods:
+    - SingleFlight()
+    - SingleFlight.do(key: Hashable, fn: Callable[[], Any]) -> Any
+    - AsyncSingleFlight()
+    - await AsyncSingleFlight.do(key: Hashable, fn: Callable[[], Awaitable]) -> Any
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Coalesces identical calls made concurrently from several threads.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the table of calls in flight.
+        """
+        self._in_flight: dict = {}  # key -> Future
+        self._lock: threading.Lock = threading.Lock()
+        self.shared: int = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Call `fn()` and return its result, unless a call for the same key is already in
+        flight, in which case wait for that call and return its result instead. An
+        exception raised by `fn()` is raised in every waiting caller.
+        """
+        with self._lock:
+            in_flight: Optional[Future] = self._in_flight.get(key)
+            if in_flight is None:
+                future: Future = Future()
+                self._in_flight[key] = future
+            else:
+                self.shared += 1
+
+        if in_flight is not None:
+            return in_flight.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+        return future.result()
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces identical coroutine calls made concurrently on one event loop.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the table of calls in flight.
+        """
+        self._in_flight: dict = {}  # key -> asyncio.Task
+        self.shared: int = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]) -> Any:
+        """
+        Await `fn()` and return its result, unless a call for the same key is already in
+        flight, in which case await that call and return its result instead.
+        """
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = self._in_flight[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.shared += 1
+
+        # shield the shared call, so that one cancelled caller does not cancel the others
+        return await asyncio.shield(task)
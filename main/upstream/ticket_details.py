@@ -2,12 +2,56 @@
 """
 Fetch a ticket with associated user info from the Zendesk API for a given Zendesk account.
 
+Optionally, a TicketDetailsPrefetcher warms up the details of the tickets on a served
+page in the background, in bulk, into a details cache shared by all sessions, from which
+`get_ticket()` serves them.
+
 Public methods:
-    - TicketDetails(api_url_root: str, auth_tuple: tuple[str, str])
+    - TicketDetails(api_url_root: str, auth_tuple: tuple[str, str],
+                    http_client: Optional[ZendeskHTTPClient] = None,
+                    sideload_users: bool = True)
     - TicketDetails.get_ticket(url) -> dict
+    - AsyncTicketDetails(api_url_root: str, auth_tuple: tuple[str, str],
+                         async_http_client: Optional[AsyncZendeskHTTPClient] = None, ...)
+    - await AsyncTicketDetails.aget_ticket(url) -> dict
+    - TicketDetailsPrefetcher(api_url_root: str, auth_tuple: tuple[str, str],
+                              http_client: Optional[ZendeskHTTPClient] = None,
+                              max_workers: int = 2, max_pending: int = 8)
+    - TicketDetailsPrefetcher.prefetch(tickets: list[TicketSummary]) -> bool
+    - TicketDetailsPrefetcher.prefetch_now(tickets: list[TicketSummary]) -> int
 """
 
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from main.upstream.async_http_client import AsyncZendeskHTTPClient, get_async_http_client
+from main.upstream.cache import TTLCache
+from main.upstream.http_client import ZendeskHTTPClient, get_http_client
+from main.upstream.json_decoding import decode_json
+from main.upstream.rate_limit import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+
+# a bounded cache of user profiles shared by all sessions, keyed by the account's API URL
+# root and user id; the same few agents are assigned to most tickets, so most lookups are
+# served from here
+USER_CACHE_SIZE: int = 1024
+USER_CACHE_TTL: float = 300.0
+user_cache: TTLCache = TTLCache(
+    maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, name='users'
+)
+
+# a bounded cache of ticket details with their users, filled by TicketDetailsPrefetcher
+# and shared by all sessions, keyed by the account's API URL root and ticket URL; kept
+# briefly, as tickets change often
+DETAILS_CACHE_SIZE: int = 1024
+DETAILS_CACHE_TTL: float = 60.0
+details_cache: TTLCache = TTLCache(
+    maxsize=DETAILS_CACHE_SIZE, ttl=DETAILS_CACHE_TTL, name='details'
+)
+
+# the most ids the `show_many` endpoints accept per request
+SHOW_MANY_MAX_IDS: int = 100
 
 
 class TicketDetails:
@@ -16,87 +60,482 @@ class TicketDetails:
     account. Includes the ability to fetch user info as well.
     """
 
-    def __init__(self, api_url_root: str, auth_tuple: tuple[str, str]) -> None:
+    def __init__(
+        self,
+        api_url_root: str,
+        auth_tuple: tuple[str, str],
+        http_client: Optional[ZendeskHTTPClient] = None,
+        sideload_users: bool = True
+    ) -> None:
         """
         Save Zendesk API URL root in a string and authentication info in a tuple.
+        Requests go through `http_client`, or the process-wide pooled client if omitted.
+        If `sideload_users` is set, tickets are requested together with their users.
         """
         self.api_url_root: str = api_url_root
         self.auth_tuple: tuple[str, str] = auth_tuple
+        self.http_client: ZendeskHTTPClient = http_client or get_http_client()
+        self.sideload_users: bool = sideload_users
+        self.priority: int = PRIORITY_INTERACTIVE
+
+    @staticmethod
+    def _decode_response(response: Any, url: str, what: str) -> Any:
+        """
+        Decode the response of a request for `what` at the specified URL. Return the JSON
+        results. Raise a RuntimeError if the HTTP response is not 200 (thus unsuccessful).
+        """
+        # handle when HTTP request is unsuccessful
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"""
+                Failed to fetch {what}.
+                Status: {response.status_code}
+                URL: {url}
+                """
+            )
+
+        return decode_json(response)
+
+    @staticmethod
+    def _sideload_url(url: str) -> str:
+        """
+        Return the URL of a ticket with its related users sideloaded.
+        """
+        return url + ('&' if '?' in url else '?') + 'include=users'
+
+    def _user_url(self, user_id) -> str:
+        """
+        Return the URL of the user with the specified user_id.
+        """
+        return self.api_url_root + f'/users/{user_id}.json'
+
+    def _users_url(self, user_ids) -> str:
+        """
+        Return the `users/show_many` URL of the users with the specified list of user_ids.
+        """
+        ids: str = ','.join(str(user_id) for user_id in user_ids)
+        return self.api_url_root + f'/users/show_many.json?ids={ids}'
 
     def _request_ticket(self, url) -> dict:
         """
         Request a ticket from the Zendesk API at the specified URL. Return the
-        JSON results as a dict. Raise a RuntimeError if the HTTP response is not 200 (thus
-        unsuccessful). Return an empty dict upon failure.
+        JSON results as a dict. Return an empty dict upon failure.
         """
         try:
-            # assemble the request URL and perform the GET request
-            response = requests.get(url, auth=self.auth_tuple)
-
-            # handle when HTTP request is unsuccessful
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f"""
-                    Failed to fetch a ticket's details.
-                    Status: {response.status_code}
-                    URL: {url}
-                    """
-                )
-
-            return response.json()['ticket']
+            # perform a conditional GET request, reusing the decoded ticket if unchanged
+            return self.http_client.get_decoded(
+                url, self.auth_tuple,
+                lambda response: self._decode_response(
+                    response, url, "a ticket's details"
+                ),
+                priority=self.priority
+            )['ticket']
 
         except Exception as e:
             print(f'---\n{e}\n---')
 
         return {}
 
+    def _request_ticket_with_users(self, url) -> tuple[dict, dict]:
+        """
+        Request a ticket from the Zendesk API at the specified URL, sideloading its
+        related users in the same response. Return the ticket as a dict, along with the
+        sideloaded users as a dict keyed by user id. Return two empty dicts upon failure.
+        """
+        try:
+            # assemble the request URL and perform the GET request
+            sideload_url: str = self._sideload_url(url)
+            body: dict = self.http_client.get_decoded(
+                sideload_url, self.auth_tuple,
+                lambda response: self._decode_response(
+                    response, sideload_url, "a ticket's details with its users"
+                ),
+                priority=self.priority
+            )
+            users: dict = {user['id']: user for user in body.get('users', [])}
+            return body['ticket'], users
+
+        except Exception as e:
+            print(f'---\n{e}\n---')
+
+        return {}, {}
+
     def _request_user(self, user_id) -> dict:
         """
         Request a user from the Zendesk API with the specified user_id. Return the
-        JSON results as a dict. Raise a RuntimeError if the HTTP response is not 200 (thus
-        unsuccessful). Return an empty dict upon failure.
+        JSON results as a dict. Return an empty dict upon failure.
         """
         try:
             # assemble the request URL and perform the GET request
-            url: str = self.api_url_root + f'/users/{user_id}.json'
-            response = requests.get(url, auth=self.auth_tuple)
-
-            # handle when HTTP request is unsuccessful
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f"""
-                    Failed to fetch user info for {user_id}.
-                    Status: {response.status_code}
-                    URL: {url}
-                    """
-                )
+            url: str = self._user_url(user_id)
+            response = self.http_client.get(
+                url, auth=self.auth_tuple, priority=self.priority
+            )
+            return self._decode_response(response, url, f"user info for {user_id}")['user']
 
-            return response.json()['user']
+        except Exception as e:
+            print(f'---\n{e}\n---')
+
+        return {}
+
+    def _request_users(self, user_ids) -> dict:
+        """
+        Request several users at once from the Zendesk API with the specified list of
+        user_ids, using the `users/show_many` endpoint. Return the users as a dict keyed
+        by user id. Return an empty dict upon failure.
+        """
+        try:
+            # assemble the request URL and perform the GET request
+            url: str = self._users_url(user_ids)
+            response = self.http_client.get(
+                url, auth=self.auth_tuple, priority=self.priority
+            )
+            body: dict = self._decode_response(response, url, f"user info for {user_ids}")
+            return {user['id']: user for user in body['users']}
 
         except Exception as e:
             print(f'---\n{e}\n---')
 
         return {}
 
+    def _cached_users(self, user_ids) -> tuple[dict, list]:
+        """
+        Look up each distinct user of the specified list of user_ids in the shared user
+        cache, among those of this account. Return the cached users as a dict keyed by
+        user id, along with the list of user_ids missing from the cache.
+        """
+        users: dict = {}
+        missing: list = []
+
+        for user_id in dict.fromkeys(user_ids):
+            if user_id is None:
+                continue
+            if (user := user_cache.get((self.api_url_root, user_id))) is not None:
+                users[user_id] = user
+            else:
+                missing.append(user_id)
+
+        return users, missing
+
+    def _remember_users(self, users: dict, fetched: dict) -> None:
+        """
+        Store the fetched users, a dict keyed by user id, in the shared user cache under
+        this account and in the `users` dict.
+        """
+        for user_id, user in fetched.items():
+            user_cache.put((self.api_url_root, user_id), user)
+            users[user_id] = user
+
+    def _get_users(self, user_ids) -> dict:
+        """
+        Return the profiles of the specified users as a dict keyed by user id, serving
+        them from the shared user cache where possible. Users missing from the cache are
+        requested together in a single upstream call, and cached upon success. Users
+        that cannot be fetched are left out of the result.
+        """
+        users, missing = self._cached_users(user_ids)
+
+        # request the remaining users; a single user does not need the batch endpoint
+        fetched: dict = {}
+        if len(missing) == 1:
+            if (user := self._request_user(user_id=missing[0])) != {}:
+                fetched[missing[0]] = user
+        elif missing:
+            fetched = self._request_users(user_ids=missing)
+
+        self._remember_users(users, fetched)
+        return users
+
+    @staticmethod
+    def _ticket_user_ids(ticket_details: dict) -> list:
+        """
+        Return the user_ids of the requester and assignee of a ticket.
+        """
+        return [ticket_details['requester_id'], ticket_details['assignee_id']]
+
+    @staticmethod
+    def _attach_users(ticket_details: dict, users: dict) -> dict:
+        """
+        Append the requester and assignee user profiles, found in the `users` dict keyed
+        by user id, to a copy of the ticket details and return it, leaving the decoded
+        ticket, which may be shared through the HTTP client's ETag store, unchanged.
+        Return an empty dict if either user profile is missing.
+        """
+        requester: dict = users.get(ticket_details['requester_id'], {})
+        assignee: dict = users.get(ticket_details['assignee_id'], {})
+
+        if requester != {} and assignee != {}:
+            # append associated requester and assignee user profiles to ticket details
+            return {**ticket_details, 'requester': requester, 'assignee': assignee}
+
+        return {}
+
     def get_ticket(self, url) -> dict:
         """
         Attempt to fetch a Zendesk ticket based on the provided url. Additionally, attempt
         to fetch the associated requester and assignee user profiles, and include them in
-        the return result.
+        the return result. When sideloading is enabled, the ticket and its users are
+        fetched in a single request; otherwise, or if that request fails, the ticket is
+        fetched on its own. Users that were not sideloaded are served from the shared user
+        cache where possible, and otherwise fetched together in one request.
+        Tickets warmed up by a TicketDetailsPrefetcher are served from the shared details
+        cache without any upstream request.
         Return an empty dict if unsuccessful.
         """
-        # attemp to fetch the specified ticket
-        ticket_details: dict = self._request_ticket(url)
+        if (cached := details_cache.get((self.api_url_root, url))) is not None:
+            return cached
+
+        ticket_details: dict = {}
+
+        # attempt to fetch the specified ticket together with its users
+        if self.sideload_users:
+            ticket_details, sideloaded_users = self._request_ticket_with_users(url)
+            self._remember_users({}, sideloaded_users)
+
+        # fall back to fetching the specified ticket on its own
+        if ticket_details == {}:
+            ticket_details = self._request_ticket(url)
 
         if ticket_details != {}:
             # attempt to fetch the associated requester and assignee user profiles
-            requester: dict = self._request_user(user_id=ticket_details['requester_id'])
-            assignee: dict = self._request_user(user_id=ticket_details['assignee_id'])
+            users: dict = self._get_users(self._ticket_user_ids(ticket_details))
+            return self._attach_users(ticket_details, users)
+
+        return {}
 
-            if requester != {} and assignee != {}:
-                # append associated requester and assignee user profiles to ticket details
-                ticket_details['requester'] = requester
-                ticket_details['assignee'] = assignee
-                return ticket_details
+
+class AsyncTicketDetails(TicketDetails):
+    """
+    A variant of TicketDetails whose upstream requests are made through the asynchronous
+    HTTP client, so that awaiting them does not hold an OS thread. Adds `aget_ticket()`,
+    the coroutine counterpart of `get_ticket()`, which remains available.
+    """
+
+    def __init__(
+        self,
+        api_url_root: str,
+        auth_tuple: tuple[str, str],
+        async_http_client: Optional[AsyncZendeskHTTPClient] = None,
+        **kwargs
+    ) -> None:
+        """
+        Accept the same parameters as TicketDetails. Async requests go through
+        `async_http_client`, or the process-wide async client if omitted.
+        """
+        super().__init__(api_url_root, auth_tuple, **kwargs)
+        self.async_http_client: AsyncZendeskHTTPClient = \
+            async_http_client or get_async_http_client()
+
+    async def _arequest_ticket(self, url) -> dict:
+        """
+        Request a ticket as in `_request_ticket()`, asynchronously.
+        """
+        try:
+            return (await self.async_http_client.get_decoded(
+                url, self.auth_tuple,
+                lambda response: self._decode_response(response, url, "a ticket's details")
+            ))['ticket']
+
+        except Exception as e:
+            print(f'---\n{e}\n---')
+
+        return {}
+
+    async def _arequest_ticket_with_users(self, url) -> tuple[dict, dict]:
+        """
+        Request a ticket with its users sideloaded as in `_request_ticket_with_users()`,
+        asynchronously.
+        """
+        try:
+            sideload_url: str = self._sideload_url(url)
+            body: dict = await self.async_http_client.get_decoded(
+                sideload_url, self.auth_tuple,
+                lambda response: self._decode_response(
+                    response, sideload_url, "a ticket's details with its users"
+                )
+            )
+            users: dict = {user['id']: user for user in body.get('users', [])}
+            return body['ticket'], users
+
+        except Exception as e:
+            print(f'---\n{e}\n---')
+
+        return {}, {}
+
+    async def _arequest_user(self, user_id) -> dict:
+        """
+        Request a user as in `_request_user()`, asynchronously.
+        """
+        try:
+            url: str = self._user_url(user_id)
+            response = await self.async_http_client.get(url, auth=self.auth_tuple)
+            return self._decode_response(response, url, f"user info for {user_id}")['user']
+
+        except Exception as e:
+            print(f'---\n{e}\n---')
+
+        return {}
+
+    async def _arequest_users(self, user_ids) -> dict:
+        """
+        Request several users at once as in `_request_users()`, asynchronously.
+        """
+        try:
+            url: str = self._users_url(user_ids)
+            response = await self.async_http_client.get(url, auth=self.auth_tuple)
+            body: dict = self._decode_response(response, url, f"user info for {user_ids}")
+            return {user['id']: user for user in body['users']}
+
+        except Exception as e:
+            print(f'---\n{e}\n---')
+
+        return {}
+
+    async def _aget_users(self, user_ids) -> dict:
+        """
+        Return the profiles of the specified users as in `_get_users()`, asynchronously.
+        """
+        users, missing = self._cached_users(user_ids)
+
+        fetched: dict = {}
+        if len(missing) == 1:
+            if (user := await self._arequest_user(user_id=missing[0])) != {}:
+                fetched[missing[0]] = user
+        elif missing:
+            fetched = await self._arequest_users(user_ids=missing)
+
+        self._remember_users(users, fetched)
+        return users
+
+    async def aget_ticket(self, url) -> dict:
+        """
+        Fetch a Zendesk ticket with its requester and assignee user profiles as in
+        `get_ticket()`, asynchronously.
+        """
+        if (cached := details_cache.get((self.api_url_root, url))) is not None:
+            return cached
+
+        ticket_details: dict = {}
+
+        if self.sideload_users:
+            ticket_details, sideloaded_users = await self._arequest_ticket_with_users(url)
+            self._remember_users({}, sideloaded_users)
+
+        if ticket_details == {}:
+            ticket_details = await self._arequest_ticket(url)
+
+        if ticket_details != {}:
+            users: dict = await self._aget_users(self._ticket_user_ids(ticket_details))
+            return self._attach_users(ticket_details, users)
 
         return {}
+
+
+class TicketDetailsPrefetcher(TicketDetails):
+    """
+    Warms up the shared details cache with the tickets of a page that was just served,
+    in the background, so that opening one of them needs no upstream request. Tickets are
+    requested in bulk through the `tickets/show_many` endpoint, and their users through
+    `users/show_many`, at background priority; a page is skipped while the rate limit is
+    under pressure, and pages are dropped rather than queued once `max_pending` of them
+    are waiting, so that prefetching never delays interactive requests.
+    """
+
+    def __init__(
+        self,
+        api_url_root: str,
+        auth_tuple: tuple[str, str],
+        http_client: Optional[ZendeskHTTPClient] = None,
+        max_workers: int = 2,
+        max_pending: int = 8
+    ) -> None:
+        """
+        Accept the same parameters as TicketDetails, along with the number of worker
+        threads prefetching pages and the most pages waiting to be prefetched.
+        """
+        super().__init__(api_url_root, auth_tuple, http_client, sideload_users=False)
+        self.priority = PRIORITY_BACKGROUND
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='details-prefetch'
+        )
+        self._pending: threading.BoundedSemaphore = \
+            threading.BoundedSemaphore(max_pending)
+
+    def _tickets_url(self, ticket_ids) -> str:
+        """
+        Return the `tickets/show_many` URL of the tickets with the specified list of ids.
+        """
+        ids: str = ','.join(str(ticket_id) for ticket_id in ticket_ids)
+        return self.api_url_root + f'/tickets/show_many.json?ids={ids}'
+
+    def _request_tickets(self, ticket_ids) -> list:
+        """
+        Request several tickets at once from the Zendesk API with the specified list of
+        ids, using the `tickets/show_many` endpoint. Return the list of tickets. Return
+        an empty list upon failure.
+        """
+        try:
+            # assemble the request URL and perform the GET request
+            url: str = self._tickets_url(ticket_ids)
+            response = self.http_client.get(
+                url, auth=self.auth_tuple, priority=self.priority
+            )
+            body: dict = self._decode_response(response, url, f"tickets {ticket_ids}")
+            return body['tickets']
+
+        except Exception as e:
+            print(f'---\n{e}\n---')
+
+        return []
+
+    def prefetch_now(self, tickets: list) -> int:
+        """
+        Fetch the details of the given ticket summaries that are not cached yet, and
+        store them in the shared details cache.
+        Return the number of tickets cached. Nothing is fetched while the rate limit is
+        under pressure.
+        """
+        missing: list = [
+            ticket for ticket in tickets
+            if ticket.url and details_cache.get((self.api_url_root, ticket.url)) is None
+        ]
+        if not missing or self.http_client.scheduler.under_pressure():
+            return 0
+
+        # request the tickets in as few calls as the endpoint allows
+        fetched: list = []
+        ids: list = [ticket.id for ticket in missing]
+        for start in range(0, len(ids), SHOW_MANY_MAX_IDS):
+            fetched += self._request_tickets(ids[start:start + SHOW_MANY_MAX_IDS])
+
+        # request all of their users at once, and cache the tickets that are complete
+        users: dict = self._get_users(
+            [user_id for ticket in fetched for user_id in self._ticket_user_ids(ticket)]
+        )
+        cached: int = 0
+        for ticket in fetched:
+            if (ticket_details := self._attach_users(ticket, users)) != {}:
+                details_cache.put((self.api_url_root, ticket['url']), ticket_details)
+                cached += 1
+
+        return cached
+
+    def prefetch(self, tickets: list) -> bool:
+        """
+        Schedule the given ticket summaries to be prefetched as in `prefetch_now()` by a
+        worker thread, without waiting. Return False if the page was dropped because too
+        many pages are already waiting.
+        """
+        if not self._pending.acquire(blocking=False):
+            return False
+
+        def run() -> None:
+            try:
+                self.prefetch_now(tickets)
+            except Exception as e:
+                print(f'---\n{e}\n---')
+            finally:
+                self._pending.release()
+
+        self.executor.submit(run)
+        return True
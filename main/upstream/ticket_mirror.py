@@ -0,0 +1,417 @@
+#!/usr/bin/env python3.9
+"""
+A local SQLite mirror of all tickets of a Zendesk account, kept up to date in the
+background with Zendesk's cursor-based incremental ticket export. AllTickets can serve
+batches of tickets from the mirror instead of the live API.
+
+Batches served from the mirror are addressed by `mirror://tickets` URLs, and are returned
+in the same shape as those of the `/tickets.json` endpoint, with `page[before]`/
+`page[after]` cursors in their links. Unlike the live API, batches from the mirror can be
+filtered by status and tag, and sorted by id or updated_at, through secondary indexes.
+
+A mirror only holds every ticket once one sync has reached the end of the export stream;
+until then, `is_synced()` is False, and the ticket list should be served from the API.
+
+Public methods:
+    - normalize_query(status: str = '', tag: str = '', sort: str = '') -> dict
+    - TicketMirror(path: str)
+    - TicketMirror.apply_export_page(tickets: list, cursor: Optional[str],
+                                     end_of_stream: bool = False) -> None
+    - TicketMirror.get_export_cursor() -> Optional[str]
+    - TicketMirror.is_synced() -> bool
+    - TicketMirror.first_batch_url(page_size: int, query: Optional[dict] = None) -> str
+    - TicketMirror.get_batch(url: str) -> dict
+    - TicketMirror.count() -> int
+    - MirrorSync(mirror: TicketMirror, api_url_root: str, auth_tuple: tuple[str, str],
+                 http_client: Optional[ZendeskHTTPClient] = None,
+                 interval: float = 60.0, start_time: int = 0)
+    - MirrorSync.sync_once() -> int
+    - MirrorSync.start() -> None
+    - MirrorSync.stop() -> None
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from main.upstream.http_client import ZendeskHTTPClient, get_http_client
+from main.upstream.json_decoding import decode_json, loads
+from main.upstream.rate_limit import PRIORITY_BACKGROUND
+
+
+# the URL root of batches served from the mirror
+MIRROR_URL_ROOT: str = 'mirror://tickets'
+
+# the ticket statuses the mirror can filter by, and the orders it can sort by; a leading
+# "-" sorts in descending order
+TICKET_STATUSES: tuple[str, ...] = ('new', 'open', 'pending', 'hold', 'solved', 'closed')
+SORT_ORDERS: tuple[str, ...] = ('id', '-id', 'updated_at', '-updated_at')
+
+# the version of the database schema, kept in SQLite's `user_version` pragma
+SCHEMA_VERSION: int = 1
+
+
+def normalize_query(status: str = '', tag: str = '', sort: str = '') -> dict:
+    """
+    Return the filter and sort query of a ticket list as a dict with the keys `status`,
+    `tag` and `sort`, where an empty `status` or `tag` does not filter, and an empty
+    `sort` sorts by ticket id. Raise a ValueError for an unknown status or sort order.
+    """
+    if status and status not in TICKET_STATUSES:
+        raise ValueError(f"'status' must be one of {', '.join(TICKET_STATUSES)}!")
+    if sort and sort not in SORT_ORDERS:
+        raise ValueError(f"'sort' must be one of {', '.join(SORT_ORDERS)}!")
+
+    return {'status': status, 'tag': tag.strip(), 'sort': sort or 'id'}
+
+
+class TicketMirror:
+    """
+    A class that stores tickets in a SQLite database, along with the incremental export
+    cursor to resume syncing from.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Save the database file path and create the tables and indexes if they do not
+        exist. Index the tags of tickets mirrored by an older schema without them.
+        """
+        self.path: str = path
+        self._local: threading.local = threading.local()
+        self._synced: bool = False
+
+        with self._connect() as conn:
+            # the status and updated_at columns, and the ticket_tags table, are secondary
+            # indexes of the JSON data, so that every filter and sort order is served by
+            # an index range scan in order, and a batch costs O(page_size)
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tickets (
+                    id INTEGER PRIMARY KEY,
+                    updated_at TEXT,
+                    status TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS tickets_status
+                    ON tickets (status, id);
+                CREATE INDEX IF NOT EXISTS tickets_updated_at
+                    ON tickets (updated_at, id);
+                CREATE INDEX IF NOT EXISTS tickets_status_updated_at
+                    ON tickets (status, updated_at, id);
+                CREATE TABLE IF NOT EXISTS ticket_tags (
+                    tag TEXT NOT NULL,
+                    ticket_id INTEGER NOT NULL,
+                    status TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (tag, ticket_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS ticket_tags_ticket
+                    ON ticket_tags (ticket_id);
+                CREATE INDEX IF NOT EXISTS ticket_tags_status
+                    ON ticket_tags (tag, status, ticket_id);
+                CREATE INDEX IF NOT EXISTS ticket_tags_updated_at
+                    ON ticket_tags (tag, updated_at, ticket_id);
+                CREATE INDEX IF NOT EXISTS ticket_tags_status_updated_at
+                    ON ticket_tags (tag, status, updated_at, ticket_id);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                """
+            )
+            if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                conn.execute(
+                    """
+                    INSERT OR IGNORE INTO ticket_tags
+                    SELECT tags.value, tickets.id, tickets.status, tickets.updated_at
+                    FROM tickets, json_each(tickets.data, '$.tags') AS tags
+                    """
+                )
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Return the database connection of the calling thread, opening it on first use.
+        """
+        if (conn := getattr(self._local, 'conn', None)) is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def apply_export_page(
+        self,
+        tickets: list,
+        cursor: Optional[str],
+        end_of_stream: bool = False
+    ) -> None:
+        """
+        Insert or update the tickets of one incremental export page, remove the tickets
+        it reports as deleted, and save the export cursor to resume from, if any, all in
+        one transaction, so that a restart never skips or loses a page. If the page is
+        the last of the stream, also record that the mirror holds every ticket.
+        """
+        with self._connect() as conn:
+            for ticket in tickets:
+                # replace the ticket's tags along with the ticket itself
+                conn.execute(
+                    'DELETE FROM ticket_tags WHERE ticket_id = ?', (ticket['id'],)
+                )
+                if ticket.get('status') == 'deleted':
+                    conn.execute('DELETE FROM tickets WHERE id = ?', (ticket['id'],))
+                else:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO tickets VALUES (?, ?, ?, ?)',
+                        (ticket['id'], ticket.get('updated_at'), ticket.get('status'),
+                         json.dumps(ticket))
+                    )
+                    conn.executemany(
+                        'INSERT OR IGNORE INTO ticket_tags VALUES (?, ?, ?, ?)',
+                        [(tag, ticket['id'], ticket.get('status'),
+                          ticket.get('updated_at')) for tag in ticket.get('tags') or []]
+                    )
+            if cursor:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sync_state VALUES ('export_cursor', ?)",
+                    (cursor,)
+                )
+            if end_of_stream:
+                conn.execute("INSERT OR REPLACE INTO sync_state VALUES ('synced', '1')")
+
+    def get_export_cursor(self) -> Optional[str]:
+        """
+        Return the saved incremental export cursor, or None if no page was synced yet.
+        """
+        row = self._connect().execute(
+            "SELECT value FROM sync_state WHERE key = 'export_cursor'"
+        ).fetchone()
+
+        return row[0] if row else None
+
+    def is_synced(self) -> bool:
+        """
+        Return whether a sync has reached the end of the export stream at least once, by
+        any process, so that the mirror holds every ticket.
+        """
+        # a mirror stays synced, so only look it up until it is
+        if not self._synced:
+            self._synced = self._connect().execute(
+                "SELECT 1 FROM sync_state WHERE key = 'synced'"
+            ).fetchone() is not None
+
+        return self._synced
+
+    @staticmethod
+    def first_batch_url(page_size: int, query: Optional[dict] = None) -> str:
+        """
+        Return the URL of the first batch of tickets of the given size in the mirror,
+        filtered and sorted by a `query` returned by `normalize_query()`, if given.
+        """
+        params: dict = {'page[size]': page_size}
+        params.update({key: value for key, value in (query or {}).items() if value})
+
+        return MIRROR_URL_ROOT + '?' + urlencode(params)
+
+    @staticmethod
+    def _batch_query(url: str) -> tuple[str, list]:
+        """
+        Return the SQL statement selecting the id, updated_at and data of the tickets of
+        the batch addressed by a `mirror://tickets` URL, along with its parameters.
+        """
+        query: dict = {
+            key: values[0] for key, values in parse_qs(urlsplit(url).query).items()
+        }
+        sort: str = query.get('sort', 'id')
+        descending: bool = sort.startswith('-')
+
+        # read the indexed columns of ticket_tags instead of tickets if filtering by tag,
+        # so that the filter and the sort order are served by the same index
+        source: str = 'tickets AS t'
+        id_column, status_column, updated_column = 't.id', 't.status', 't.updated_at'
+        conditions: list = []
+        params: list = []
+        if query.get('tag'):
+            source = 'ticket_tags AS k JOIN tickets AS t ON t.id = k.ticket_id'
+            id_column, status_column = 'k.ticket_id', 'k.status'
+            updated_column = 'k.updated_at'
+            conditions.append('k.tag = ?')
+            params.append(query['tag'])
+        if query.get('status'):
+            conditions.append(f'{status_column} = ?')
+            params.append(query['status'])
+
+        # keyset pagination on the sort key, ending with the id to break ties; a batch
+        # before the cursor is read backwards, then reversed by `get_batch()`
+        sort_key: list = [id_column]
+        if sort.lstrip('-') == 'updated_at':
+            sort_key = [updated_column, id_column]
+        backwards: bool = 'page[before]' in query
+        cursor: Optional[str] = query.get('page[before]', query.get('page[after]'))
+        if cursor is not None:
+            values: list = cursor.split(',')
+            values[-1] = int(values[-1])
+            conditions.append(
+                f"({', '.join(sort_key)}) {'<' if backwards != descending else '>'} "
+                f"({', '.join('?' * len(sort_key))})"
+            )
+            params.extend(values)
+        order: str = 'DESC' if backwards != descending else 'ASC'
+
+        sql: str = (
+            f"SELECT t.id, t.updated_at, t.data FROM {source} "
+            f"WHERE {' AND '.join(conditions) or 1} "
+            f"ORDER BY {', '.join(f'{column} {order}' for column in sort_key)} LIMIT ?"
+        )
+        return sql, params + [int(query.get('page[size]', 25))]
+
+    def get_batch(self, url: str) -> dict:
+        """
+        Return the batch of tickets addressed by a `mirror://tickets` URL, in the shape
+        of a `/tickets.json` response. The `prev` and `next` links are None if the batch
+        is empty, and keep the filter and sort order of the URL otherwise.
+        """
+        query: dict = {
+            key: values[0] for key, values in parse_qs(urlsplit(url).query).items()
+        }
+        sql, params = self._batch_query(url)
+        rows: list = self._connect().execute(sql, params).fetchall()
+        if query.pop('page[before]', None) is not None:
+            rows.reverse()
+        query.pop('page[after]', None)
+
+        def cursor(row: tuple) -> str:
+            """
+            Return the cursor of a row in the sort order of the batch.
+            """
+            if query.get('sort', 'id').lstrip('-') == 'updated_at':
+                return f'{row[1]},{row[0]}'
+            return str(row[0])
+
+        links: dict = {'prev': None, 'next': None}
+        if rows:
+            links = {
+                'prev': MIRROR_URL_ROOT + '?' + urlencode(
+                    {'page[before]': cursor(rows[0]), **query}
+                ),
+                'next': MIRROR_URL_ROOT + '?' + urlencode(
+                    {'page[after]': cursor(rows[-1]), **query}
+                ),
+            }
+
+        return {'tickets': [loads(data) for _, _, data in rows], 'links': links}
+
+    def count(self) -> int:
+        """
+        Return the number of tickets in the mirror.
+        """
+        return self._connect().execute('SELECT COUNT(*) FROM tickets').fetchone()[0]
+
+
+class MirrorSync:
+    """
+    A class that keeps a TicketMirror up to date with the incremental ticket export of a
+    given Zendesk account, either on demand or periodically on a background thread.
+    """
+
+    def __init__(
+        self,
+        mirror: TicketMirror,
+        api_url_root: str,
+        auth_tuple: tuple[str, str],
+        http_client: Optional[ZendeskHTTPClient] = None,
+        interval: float = 60.0,
+        start_time: int = 0
+    ) -> None:
+        """
+        Save the mirror, the Zendesk API URL root and authentication info. The background
+        thread syncs every `interval` seconds. A mirror that was never synced starts
+        exporting tickets updated since the Unix time `start_time`.
+        """
+        self.mirror: TicketMirror = mirror
+        self.api_url_root: str = api_url_root
+        self.auth_tuple: tuple[str, str] = auth_tuple
+        self.http_client: ZendeskHTTPClient = http_client or get_http_client()
+        self.interval: float = interval
+        self.start_time: int = start_time
+        self._stopped: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _request_export_page(self, url) -> dict:
+        """
+        Request a page of the incremental ticket export at the specified URL, as a
+        background request. Return the JSON results as a dict. Raise a RuntimeError if
+        the HTTP response is not 200 (thus unsuccessful).
+        """
+        response = self.http_client.get(
+            url, auth=self.auth_tuple, priority=PRIORITY_BACKGROUND
+        )
+
+        # handle when HTTP request is unsuccessful
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"""
+                Failed to fetch a page of the incremental ticket export.
+                Status: {response.status_code}
+                URL: {url}
+                """
+            )
+
+        return decode_json(response)
+
+    def sync_once(self) -> int:
+        """
+        Apply incremental export pages to the mirror, resuming from its saved cursor,
+        until the end of the stream. Return the number of tickets applied. Upon failure,
+        stop early; the pages applied so far are kept.
+        """
+        applied: int = 0
+
+        try:
+            while True:
+                cursor: Optional[str] = self.mirror.get_export_cursor()
+                query: str = urlencode(
+                    {'cursor': cursor} if cursor else {'start_time': str(self.start_time)}
+                )
+                page: dict = self._request_export_page(
+                    self.api_url_root + '/incremental/tickets/cursor.json?' + query
+                )
+
+                self.mirror.apply_export_page(
+                    page['tickets'], page['after_cursor'], page['end_of_stream']
+                )
+                applied += len(page['tickets'])
+
+                if page['end_of_stream']:
+                    break
+
+        except Exception as e:
+            print(f'---\n{e}\n---')
+
+        return applied
+
+    def _run(self) -> None:
+        """
+        Sync every `interval` seconds until stopped.
+        """
+        while not self._stopped.is_set():
+            self.sync_once()
+            self._stopped.wait(self.interval)
+
+    def start(self) -> None:
+        """
+        Start syncing periodically on a background daemon thread.
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='mirror-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, waiting for a sync in progress to finish.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3.9
+"""
+A compact record of the ticket fields shown in the ticket list, used instead of the full
+ticket payload returned by the Zendesk API for batches of tickets, so that the batches
+held by each session only keep what the list view renders. The full ticket is loaded by
+TicketDetails when its details are requested.
+
+Public methods:
+    - TicketSummary(id: int, url: str, subject: str, status: str, tags: tuple[str, ...],
+                    updated_at: str)
+    - TicketSummary.from_dict(ticket: dict) -> TicketSummary
+    - TicketSummary.to_dict() -> dict
+    - summarize_batch(batch: dict) -> dict
+"""
+
+import sys
+from typing import NamedTuple
+
+
+class TicketSummary(NamedTuple):
+    """
+    The fields of a ticket shown in the ticket list, along with when it was last updated,
+    which identifies the version of the ticket. A tuple subclass, so that it holds no
+    per-instance dict, and compares equal to another summary of the same ticket.
+    """
+
+    id: int
+    url: str
+    subject: str
+    status: str
+    tags: tuple[str, ...]
+    updated_at: str
+
+    @classmethod
+    def from_dict(cls, ticket: dict) -> 'TicketSummary':
+        """
+        Return the summary of a ticket dict decoded from the Zendesk API. The status and
+        tags take few distinct values across tickets, so they are interned to share one
+        string object each.
+        """
+        return cls(
+            id=ticket['id'],
+            url=ticket.get('url') or '',
+            subject=ticket.get('subject') or '',
+            status=sys.intern(ticket.get('status') or ''),
+            tags=tuple(sys.intern(tag) for tag in ticket.get('tags') or ()),
+            updated_at=ticket.get('updated_at') or '',
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Return the summary as a JSON-serialisable dict.
+        """
+        return {
+            'id': self.id,
+            'url': self.url,
+            'subject': self.subject,
+            'status': self.status,
+            'tags': list(self.tags),
+            'updated_at': self.updated_at,
+        }
+
+
+def summarize_batch(batch: dict) -> dict:
+    """
+    Return a batch of tickets in the shape of a `/tickets.json` response, keeping only
+    its tickets, as summaries, and its links.
+    """
+    return {
+        'tickets': [TicketSummary.from_dict(ticket) for ticket in batch['tickets']],
+        'links': batch['links'],
+    }
@@ -3,27 +3,147 @@
 Common components for the Zendesk API, configured via environment variables.
     - API_URL_ROOT: the URL root for Zendesk API requests
         * depends on environment variable ZENDESK_API_SUBDOMAIN
+        * optional environment variable ZENDESK_API_URL_ROOT overrides it, e.g. to point
+          the app at a local stand-in server
     - AUTH_TUPLE: HTTP Basic Authentication tuple, to be supplied to the requests library
         * depends on environment variables ZENDESK_API_EMAIL, ZENDESK_API_TOEKEN
+    - CONNECT_TIMEOUT, READ_TIMEOUT: upstream socket timeouts in seconds
+        * optional environment variables ZENDESK_API_CONNECT_TIMEOUT,
+          ZENDESK_API_READ_TIMEOUT
+    - POOL_MAXSIZE: maximum number of pooled keep-alive connections per upstream host
+        * optional environment variable ZENDESK_API_POOL_MAXSIZE
+    - RATE_LIMIT: initial upstream rate limit in requests per minute, until Zendesk
+      reports the account's actual limit
+        * optional environment variable ZENDESK_API_RATE_LIMIT
+    - ETAG_STORE_SIZE: number of URLs whose ETag and decoded response are remembered for
+      conditional requests
+        * optional environment variable ZENDESK_API_ETAG_STORE_SIZE
+
+The environment variables are read on first access of any of these names, not on import,
+so that modules importing this one can be imported, and configured otherwise, without
+them. A missing required variable raises an EnvironmentError at the first access of
+API_URL_ROOT or AUTH_TUPLE; the optional tuning is read without them.
+
+Public methods:
+    - ZendeskConfig(api_url_root: str, auth_tuple: tuple, connect_timeout: float = 3.05,
+                    read_timeout: float = 10.0, pool_maxsize: int = 10,
+                    rate_limit: int = 200, etag_store_size: int = 256)
+    - ZendeskConfig.from_env(environ: Optional[Mapping[str, str]] = None) -> ZendeskConfig
+    - get_config() -> ZendeskConfig
 """
 
 import os
+import threading
+from typing import Any, Callable, Mapping, NamedTuple, Optional
+
+# the optional upstream connection tuning, by field: its environment variable, type and
+# default value
+_TUNING: dict[str, tuple[str, Callable[[str], Any], str]] = {
+    'connect_timeout': ("ZENDESK_API_CONNECT_TIMEOUT", float, "3.05"),
+    'read_timeout': ("ZENDESK_API_READ_TIMEOUT", float, "10"),
+    'pool_maxsize': ("ZENDESK_API_POOL_MAXSIZE", int, "10"),
+    'rate_limit': ("ZENDESK_API_RATE_LIMIT", int, "200"),
+    'etag_store_size': ("ZENDESK_API_ETAG_STORE_SIZE", int, "256"),
+}
+
+
+def _tuning_from_env(env: Mapping[str, str]) -> dict:
+    """
+    Return the upstream connection tuning read from the given environment variables,
+    keyed by field, falling back to the defaults of those that are not set.
+    """
+    return {
+        field: convert(env.get(variable, default))
+        for field, (variable, convert, default) in _TUNING.items()
+    }
+
+
+class ZendeskConfig(NamedTuple):
+    """
+    The configuration of the Zendesk API client.
+    """
+
+    api_url_root: str
+    auth_tuple: tuple
+    connect_timeout: float = 3.05
+    read_timeout: float = 10.0
+    pool_maxsize: int = 10
+    rate_limit: int = 200
+    etag_store_size: int = 256
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> 'ZendeskConfig':
+        """
+        Read the configuration from the given environment variables, or the process's if
+        omitted. Raise an EnvironmentError if a required variable is not set.
+        """
+        env: Mapping[str, str] = os.environ if environ is None else environ
+
+        # check for relevant environment variable ZENDESK_API_SUBDOMAIN
+        if not (subdomain := env.get("ZENDESK_API_SUBDOMAIN")):
+            raise EnvironmentError(
+                "\tError: environment variable ZENDESK_API_SUBDOMAIN not set."
+            )
+
+        # check for relevant environment variables ZENDESK_API_EMAIL, ZENDESK_API_TOEKEN
+        if not (email := env.get("ZENDESK_API_EMAIL")):
+            raise EnvironmentError(
+                "\tError: environment variable ZENDESK_API_EMAIL not set."
+            )
+        if not (token := env.get("ZENDESK_API_TOEKEN")):
+            raise EnvironmentError(
+                "\tError: environment variable ZENDESK_API_TOEKEN not set."
+            )
+
+        return cls(
+            # the Zendesk API root URL based on provided subdomain, unless overridden
+            api_url_root=env.get("ZENDESK_API_URL_ROOT") or
+            f'https://{subdomain}.zendesk.com/api/v2',
+            # HTTP basic authentication tuple, specificlly for the requests library
+            auth_tuple=(email + '/token', token),
+            # upstream connection tuning; these are optional and fall back to defaults
+            **_tuning_from_env(env),
+        )
+
+
+# the configuration read from the process's environment variables, on first use
+_config: Optional[ZendeskConfig] = None
+_config_lock: threading.Lock = threading.Lock()
+
+# the module-level names resolved from the configuration, and their fields
+_CONFIG_NAMES: dict[str, str] = {
+    'API_URL_ROOT': 'api_url_root',
+    'AUTH_TUPLE': 'auth_tuple',
+    'CONNECT_TIMEOUT': 'connect_timeout',
+    'READ_TIMEOUT': 'read_timeout',
+    'POOL_MAXSIZE': 'pool_maxsize',
+    'RATE_LIMIT': 'rate_limit',
+    'ETAG_STORE_SIZE': 'etag_store_size',
+}
+
+
+def get_config() -> ZendeskConfig:
+    """
+    Return the configuration read from the process's environment variables, reading it
+    on first use.
+    """
+    global _config
+
+    with _config_lock:
+        if _config is None:
+            _config = ZendeskConfig.from_env()
 
-# check for relevant environment variable ZENDESK_API_SUBDOMAIN
-if not (subdomain := os.getenv("ZENDESK_API_SUBDOMAIN")):
-    raise EnvironmentError("\tError: environment variable ZENDESK_API_SUBDOMAIN not set.")
+    return _config
 
-# the Zendesk API root URL based on provided subdomain
-API_URL_ROOT: str = f'https://{subdomain}.zendesk.com/api/v2'
 
-# check for relevant environment variables ZENDESK_API_EMAIL, ZENDESK_API_TOEKEN
-if not (email := os.getenv("ZENDESK_API_EMAIL")):
-    raise EnvironmentError("\tError: environment variable ZENDESK_API_EMAIL not set.")
-if not (token := os.getenv("ZENDESK_API_TOEKEN")):
-    raise EnvironmentError("\tError: environment variable ZENDESK_API_TOEKEN not set.")
+def __getattr__(name: str) -> Any:
+    """
+    Resolve the module-level configuration names, e.g. API_URL_ROOT, on access. The
+    tuning names are read without requiring the API URL root and credentials.
+    """
+    if name in _CONFIG_NAMES and _CONFIG_NAMES[name] in _TUNING:
+        return _tuning_from_env(os.environ)[_CONFIG_NAMES[name]]
+    if name in _CONFIG_NAMES:
+        return getattr(get_config(), _CONFIG_NAMES[name])
 
-# HTTP basic authentication tuple, specificlly for the requests library
-AUTH_TUPLE: tuple = (
-    email + '/token',
-    token,
-)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,11 +3,18 @@
 Test the `all_tickets.py` file under main/upstream.
 """
 
+import asyncio
+import time
 import pytest
 import json
 
+import httpx
+
 from main.upstream.zendesk_common import API_URL_ROOT, AUTH_TUPLE
-from main.upstream.all_tickets import AllTickets
+from main.upstream.all_tickets import AllTickets, AsyncAllTickets
+from main.upstream.async_http_client import AsyncZendeskHTTPClient
+from main.upstream.ticket_mirror import TicketMirror, normalize_query
+from main.upstream.ticket_summary import summarize_batch
 
 
 @pytest.fixture()
@@ -120,7 +127,7 @@ def test_request_tickets_success(at_instance, urls, resp, requests_mock):
     requests_mock.get(urls.page_1_init, json=resp.alltickets_p1)
     response: dict = at_instance._request_tickets(urls.page_1_init)
 
-    assert response == resp.alltickets_p1
+    assert response == summarize_batch(resp.alltickets_p1)
 
 
 def test_request_tickets_failure_404(at_instance, urls, resp, requests_mock):
@@ -141,7 +148,7 @@ def test_get_current_batch_success(at_instance, urls, resp, requests_mock):
     requests_mock.get(urls.page_1_init, json=resp.alltickets_p1)
     current_batch: dict = at_instance.get_current_batch()
 
-    assert current_batch == resp.alltickets_p1["tickets"]
+    assert current_batch == summarize_batch(resp.alltickets_p1)["tickets"]
 
 
 def test_get_current_batch_failure_404(at_instance, urls, resp, requests_mock):
@@ -167,7 +174,7 @@ def test_seek_batch_next_success(at_instance, urls, resp, requests_mock):
     requests_mock.get(urls.page_2, json=resp.alltickets_p2)
     next_batch: dict = at_instance.seek_batch("next")
 
-    assert next_batch == resp.alltickets_p2
+    assert next_batch == summarize_batch(resp.alltickets_p2)
 
 
 def test_seek_batch_prev_empty(at_instance, urls, resp, requests_mock):
@@ -201,7 +208,7 @@ def test_goto_next_batch(at_instance, urls, resp, requests_mock):
     assert at_instance._url_curr == urls.page_2
     assert at_instance._url_next == resp.alltickets_p2["links"]["next"]
 
-    assert next_batch_list == resp.alltickets_p2["tickets"]
+    assert next_batch_list == summarize_batch(resp.alltickets_p2)["tickets"]
 
 
 def test_goto_prev_batch(at_instance, urls, resp, requests_mock):
@@ -221,3 +228,355 @@ def test_goto_prev_batch(at_instance, urls, resp, requests_mock):
     assert at_instance._url_next == urls.page_2
 
     assert prev_batch_list == []
+
+
+def test_get_batch_window(at_instance, urls, resp, requests_mock):
+    """
+    Test the get_batch_window() method, check that it returns the current list of tickets
+    along with its neighbouring batches, without modifying any URL pointers.
+    """
+    requests_mock.get(urls.page_1_init, json=resp.alltickets_p1)
+    requests_mock.get(urls.page_0_empty, json=resp.alltickets_p0_empty)
+    requests_mock.get(urls.page_2, json=resp.alltickets_p2)
+    current_list, prev_batch, next_batch = at_instance.get_batch_window()
+
+    assert current_list == summarize_batch(resp.alltickets_p1)["tickets"]
+    assert prev_batch == {}
+    assert next_batch == summarize_batch(resp.alltickets_p2)
+
+    assert at_instance._url_prev == urls.page_0_empty
+    assert at_instance._url_curr == urls.page_1_init
+    assert at_instance._url_next == urls.page_2
+
+
+def test_get_batch_window_failure_404(at_instance, urls, resp, requests_mock):
+    """
+    Test the get_batch_window() method, make sure it does not seek any neighbours when
+    the current batch cannot be fetched.
+    """
+    requests_mock.get(urls.page_1_init, json=resp.common_404, status_code=404)
+    window: tuple = at_instance.get_batch_window()
+
+    assert window == ([], {}, {})
+    assert requests_mock.call_count == 1
+
+
+def test_batch_cache_navigation(at_instance, urls, resp, requests_mock):
+    """
+    Test that batches fetched while rendering are served from the batch cache when
+    navigating, so that moving to the next batch and re-rendering needs no extra request
+    for pages that are already held.
+    """
+    requests_mock.get(urls.page_1_init, json=resp.alltickets_p1)
+    requests_mock.get(urls.page_0_empty, json=resp.alltickets_p0_empty)
+    requests_mock.get(urls.page_2, json=resp.alltickets_p2)
+    requests_mock.get(resp.alltickets_p2["links"]["next"], json=resp.alltickets_p0_empty)
+    at_instance.get_batch_window()
+    assert requests_mock.call_count == 3
+
+    # the next batch was already fetched as a neighbour
+    at_instance.goto_next_batch()
+    assert requests_mock.call_count == 3
+
+    # re-rendering only needs the new next batch
+    current_list, prev_batch, next_batch = at_instance.get_batch_window()
+    assert requests_mock.call_count == 4
+    assert current_list == summarize_batch(resp.alltickets_p2)["tickets"]
+    assert next_batch == {}
+
+
+def test_get_neighbours_after_navigation(at_instance, urls, resp, requests_mock):
+    """
+    Test the get_neighbours() method after navigating, make sure the batch navigated
+    away from is served from the batch cache, so that only the new neighbour ahead is
+    requested.
+    """
+    requests_mock.get(urls.page_1_init, json=resp.alltickets_p1)
+    requests_mock.get(urls.page_0_empty, json=resp.alltickets_p0_empty)
+    requests_mock.get(urls.page_2, json=resp.alltickets_p2)
+    requests_mock.get(resp.alltickets_p2["links"]["next"], json=resp.alltickets_p0_empty)
+    at_instance.get_batch_window()
+    at_instance.goto_next_batch()
+
+    prev_batch, next_batch = at_instance.get_neighbours()
+    assert requests_mock.call_count == 4
+    assert prev_batch == summarize_batch(resp.alltickets_p1)
+    assert next_batch == {}
+
+
+def test_batch_cache_expiry(urls, resp, requests_mock):
+    """
+    Test that an expired cached batch is requested again.
+    """
+    at: AllTickets = AllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=25, batch_cache_ttl=0
+    )
+    requests_mock.get(urls.page_1_init, json=resp.alltickets_p1)
+    at.get_current_batch()
+    at.get_current_batch()
+
+    assert requests_mock.call_count == 2
+
+
+def test_state_resume(at_instance, urls, resp, requests_mock):
+    """
+    Test the get_state() method and the `state` parameter, make sure a new AllTickets
+    object resumes from the saved URL pointers.
+    """
+    requests_mock.get(urls.page_1_init, json=resp.alltickets_p1)
+    requests_mock.get(urls.page_2, json=resp.alltickets_p2)
+    at_instance.get_current_batch()
+    at_instance.goto_next_batch()
+
+    state: dict = json.loads(json.dumps(at_instance.get_state()))
+    resumed: AllTickets = AllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=25, state=state
+    )
+
+    assert resumed._url_prev == urls.page_1_init
+    assert resumed._url_curr == urls.page_2
+    assert resumed._url_next == resp.alltickets_p2["links"]["next"]
+
+
+def test_set_state(at_instance, urls):
+    """
+    Test the set_state() method, make sure it restores the URL pointers, and the default
+    query from a state saved without one.
+    """
+    at_instance.set_state({"curr": urls.page_2, "next": "", "prev": urls.page_1_init})
+
+    assert at_instance.get_state() == {
+        "curr": urls.page_2, "next": "", "prev": urls.page_1_init,
+        "query": normalize_query(),
+    }
+
+
+def test_set_state_other_source(at_instance, urls, tmp_path):
+    """
+    Test the set_state() method, make sure a state saved while listing the tickets from
+    the other source, the API or the mirror, is ignored.
+    """
+    mirror: TicketMirror = TicketMirror(str(tmp_path / "mirror.sqlite3"))
+    mirrored: AllTickets = AllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, mirror=mirror
+    )
+    first_batch_url: str = mirrored.get_state()["curr"]
+
+    assert not mirrored.set_state({"curr": urls.page_2, "next": "", "prev": ""})
+    assert mirrored.get_state()["curr"] == first_batch_url
+    assert not at_instance.set_state({"curr": first_batch_url, "next": "", "prev": ""})
+    assert at_instance.set_state({"curr": urls.page_2, "next": "", "prev": ""})
+
+
+def test_async_navigation(urls, resp):
+    """
+    Test the AsyncAllTickets class, make sure its coroutines fetch the batch window and
+    navigate like their synchronous counterparts.
+    """
+    responses: dict = {
+        urls.page_1_init: resp.alltickets_p1,
+        urls.page_0_empty: resp.alltickets_p0_empty,
+        urls.page_2: resp.alltickets_p2,
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        for url, body in responses.items():
+            if httpx.URL(url) == request.url:
+                return httpx.Response(200, json=body)
+        return httpx.Response(404, json=resp.common_404)
+
+    client: AsyncZendeskHTTPClient = AsyncZendeskHTTPClient(
+        transport=httpx.MockTransport(handler)
+    )
+    at: AsyncAllTickets = AsyncAllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=25,
+        async_http_client=client
+    )
+
+    current_list, prev_batch, next_batch = asyncio.run(at.aget_batch_window())
+    assert current_list == summarize_batch(resp.alltickets_p1)["tickets"]
+    assert prev_batch == {}
+    assert next_batch == summarize_batch(resp.alltickets_p2)
+
+    assert asyncio.run(at.agoto_prev_batch()) == []
+    assert asyncio.run(at.agoto_next_batch()) == \
+        summarize_batch(resp.alltickets_p2)["tickets"]
+    assert at._url_prev == urls.page_1_init
+    assert at._url_curr == urls.page_2
+
+    client.close()
+
+
+def test_iter_tickets(at_instance, urls, resp, requests_mock):
+    """
+    Test the iter_tickets() method, make sure it walks every page at the requested page
+    size, stops once Zendesk reports no more tickets, and leaves the URL pointers alone.
+    """
+    page_2: dict = {**resp.alltickets_p2, "meta": {"has_more": False}}
+    requests_mock.get(
+        API_URL_ROOT + "/tickets.json?page[size]=100", json=resp.alltickets_p1
+    )
+    requests_mock.get(urls.page_2, json=page_2)
+
+    tickets: list = list(at_instance.iter_tickets())
+
+    assert tickets == resp.alltickets_p1["tickets"] + resp.alltickets_p2["tickets"]
+    assert requests_mock.call_count == 2
+    assert at_instance.get_state()["curr"] == urls.page_1_init
+
+
+def test_iter_tickets_prefetch(at_instance, urls, resp, requests_mock):
+    """
+    Test the iter_tickets() method, make sure the next page is requested while the
+    tickets of the current one are consumed.
+    """
+    requests_mock.get(urls.page_1_init, json=resp.alltickets_p1)
+    requests_mock.get(urls.page_2, json=resp.alltickets_p0_empty)
+
+    tickets = at_instance.iter_tickets(page_size=25)
+    assert next(tickets) == {"id": 1}
+    for _ in range(100):
+        if requests_mock.call_count == 2:
+            break
+        time.sleep(0.01)
+
+    assert requests_mock.call_count == 2
+    assert len(list(tickets)) == 24
+
+
+def test_iter_tickets_failure_404(at_instance, urls, resp, requests_mock):
+    """
+    Test the iter_tickets() method, make sure it raises a RuntimeError instead of
+    skipping a page that cannot be fetched.
+    """
+    requests_mock.get(urls.page_1_init, json=resp.alltickets_p1)
+    requests_mock.get(urls.page_2, status_code=404, json=resp.common_404)
+
+    with pytest.raises(RuntimeError):
+        list(at_instance.iter_tickets(page_size=25))
+
+
+@pytest.fixture()
+def blocks(requests_mock):
+    """
+    Mock the Zendesk API serving tickets 1 to 70 in blocks of up to 50 tickets, and
+    provide the URLs of the blocks.
+    """
+    class Blocks:
+        first: str = API_URL_ROOT + "/tickets.json?page[size]=50"
+        before_1: str = API_URL_ROOT + "/tickets.json?page[size]=50&page[before]=1"
+        before_51: str = API_URL_ROOT + "/tickets.json?page[size]=50&page[before]=51"
+        after_50: str = API_URL_ROOT + "/tickets.json?page[size]=50&page[after]=50"
+        after_70: str = API_URL_ROOT + "/tickets.json?page[size]=50&page[after]=70"
+
+    def block(ids: range) -> dict:
+        return {
+            "tickets": [{"id": i} for i in ids],
+            "links": {
+                "prev": API_URL_ROOT + f"/tickets.json?page[size]=50&page[before]={ids[0]}",
+                "next": API_URL_ROOT + f"/tickets.json?page[size]=50&page[after]={ids[-1]}",
+            } if ids else {"prev": None, "next": None},
+        }
+
+    requests_mock.get(Blocks.first, json=block(range(1, 51)))
+    requests_mock.get(Blocks.before_1, json=block(range(0)))
+    requests_mock.get(Blocks.before_51, json=block(range(1, 51)))
+    requests_mock.get(Blocks.after_50, json=block(range(51, 71)))
+    requests_mock.get(Blocks.after_70, json=block(range(0)))
+    yield Blocks
+
+
+def ids_of(tickets: list) -> list:
+    """
+    Return the ids of a list of TicketSummary records.
+    """
+    return [t.id for t in tickets]
+
+
+def test_upstream_blocks_navigation(blocks, requests_mock):
+    """
+    Test AllTickets with an upstream page size larger than its page size, make sure
+    batches are cut from blocks, and navigating within a block makes no request.
+    """
+    at: AllTickets = AllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=25,
+        upstream_page_size=50
+    )
+
+    # the first batch, its missing previous batch, and its next batch in the same block
+    current_list, prev_batch, next_batch = at.get_batch_window()
+    assert ids_of(current_list) == list(range(1, 26))
+    assert prev_batch == {}
+    assert ids_of(next_batch["tickets"]) == list(range(26, 51))
+    assert requests_mock.call_count == 2
+
+    assert ids_of(at.goto_next_batch()) == list(range(26, 51))
+    assert at.get_state()["curr"] == blocks.first + "#offset=25"
+    assert requests_mock.call_count == 2
+
+    # the next batch starts the next block
+    assert ids_of(at.get_neighbours()[1]["tickets"]) == list(range(51, 71))
+    assert ids_of(at.goto_next_batch()) == list(range(51, 71))
+    assert at.get_neighbours()[1] == {}
+    assert ids_of(at.goto_prev_batch()) == list(range(26, 51))
+    assert requests_mock.call_count == 4
+
+
+def test_upstream_blocks_last_offset(blocks, requests_mock):
+    """
+    Test AllTickets with an upstream page size larger than its page size, make sure the
+    previous batch of a block is the last batch of the previous block.
+    """
+    at: AllTickets = AllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=25,
+        upstream_page_size=50, state={"curr": blocks.after_50, "next": "", "prev": ""}
+    )
+
+    assert ids_of(at.get_current_batch()) == list(range(51, 71))
+    assert at.get_state()["prev"] == blocks.before_51 + "#offset=last"
+    assert ids_of(at.goto_prev_batch()) == list(range(26, 51))
+    assert at.get_state()["prev"] == blocks.before_51
+    assert ids_of(at.goto_prev_batch()) == list(range(1, 26))
+    assert requests_mock.call_count == 2
+
+
+def test_upstream_blocks_cache_size(blocks, requests_mock):
+    """
+    Test that the batch cache holds as many blocks as hold its batches, but at least
+    two, so that blocks of several batches do not multiply the tickets held per session,
+    while the blocks either side of a block edge are both held.
+    """
+    def cache_size(upstream_page_size: int) -> int:
+        return AllTickets(
+            api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=25,
+            upstream_page_size=upstream_page_size
+        )._batch_cache.maxsize
+
+    assert cache_size(25) == 4
+    assert cache_size(50) == 2
+    assert cache_size(100) == 2
+
+    # the window at the edge of two blocks is served from both once they are fetched
+    at: AllTickets = AllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=25,
+        upstream_page_size=50, state={
+            "curr": blocks.first + "#offset=25", "next": "", "prev": ""
+        }
+    )
+    at.get_batch_window()
+    calls: int = requests_mock.call_count
+    assert ids_of(at.goto_next_batch()) == list(range(51, 71))
+    assert ids_of(at.goto_prev_batch()) == list(range(26, 51))
+    assert ids_of(at.goto_prev_batch()) == list(range(1, 26))
+    assert requests_mock.call_count == calls
+
+
+def test_upstream_page_size_multiple():
+    """
+    Test that an upstream page size that is not a multiple of the page size is refused.
+    """
+    with pytest.raises(ValueError):
+        AllTickets(
+            api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=25,
+            upstream_page_size=60
+        )
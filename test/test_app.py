@@ -0,0 +1,256 @@
+#!/usr/bin/env python3.9
+"""
+Test the `app.py` file under main, against the fake Zendesk API under bench.
+"""
+
+import json
+import re
+from typing import Optional
+
+import pytest
+import requests
+from flask import Flask
+
+from bench.fake_zendesk import FakeZendesk
+from main.app import AppServices, create_app, index, index_async
+from main.upstream.all_tickets import AllTickets
+from main.upstream.ticket_details import details_cache, user_cache
+
+AUTH_TUPLE: tuple = ("agent@example.com/token", "token")
+
+
+@pytest.fixture()
+def fake():
+    """
+    Serve a fake Zendesk API with 120 tickets, and stop it after the test. Start with
+    empty process-wide user and details caches.
+    """
+    fake: FakeZendesk = FakeZendesk(tickets=120, users=5)
+    fake.start()
+    user_cache.clear()
+    details_cache.clear()
+    yield fake
+    fake.stop()
+    user_cache.clear()
+    details_cache.clear()
+
+
+@pytest.fixture()
+def config(fake):
+    """
+    Provide the configuration of an app using the fake Zendesk API.
+    """
+    yield {
+        'API_URL_ROOT': fake.url_root,
+        'AUTH_TUPLE': AUTH_TUPLE,
+        'SECRET_KEY': 'test',
+        'STATE_BACKEND': 'memory',
+    }
+
+
+def test_create_app(fake, config):
+    """
+    Test the create_app() function, make sure the given configuration overrides the
+    environment variables, and each app has its own per-session objects.
+    """
+    app: Flask = create_app({**config, 'UPSTREAM_PAGE_SIZE': 50})
+    other: Flask = create_app(config)
+
+    assert app.config['API_URL_ROOT'] == fake.url_root
+    assert app.config['UPSTREAM_PAGE_SIZE'] == 50
+    assert app.view_functions['index'] is index
+    assert app.extensions['zendesk'] is not other.extensions['zendesk']
+
+    client = app.test_client()
+    response = client.get('/')
+    assert response.status_code == 200
+    assert b'ticketDetails(' in response.data
+    assert client.get('/navigate', query_string={'direction': 'next'}).json['has_prev']
+
+    services: AppServices = app.extensions['zendesk']
+    assert services.allticket_objs.live_sessions == 1
+    assert other.extensions['zendesk'].allticket_objs.live_sessions == 0
+
+
+def test_create_app_options(config):
+    """
+    Test the create_app() function, make sure the async views replace the sync ones
+    when enabled, and streaming is turned off with the cookie state backend.
+    """
+    app: Flask = create_app(
+        {**config, 'ASYNC_VIEWS': True, 'STATE_BACKEND': 'cookie', 'STREAM_INDEX': True}
+    )
+
+    assert app.view_functions['index'] is index_async
+    assert app.config['STREAM_INDEX'] is False
+
+
+def test_warm_up(fake, config):
+    """
+    Test that an app created with WARM_UP set fetches the first batch of tickets, and
+    caches the details of its tickets and their users, before serving any request.
+    """
+    app: Flask = create_app({**config, 'WARM_UP': True})
+
+    assert fake.stats()['tickets'] == 1
+    assert len(details_cache) == app.config['PAGE_SIZE']
+    assert len(user_cache) > 0
+
+    # the first session is answered from the warmed ETag store and details cache
+    client = app.test_client()
+    assert client.get('/').status_code == 200
+    first_url: str = fake.url_root + '/tickets/1.json'
+    response = client.get('/ticket_details', query_string={'ticket_url': first_url})
+    assert response.status_code == 200
+    assert fake.stats().get('tickets/show_many') == 1
+
+
+def test_warm_up_failure(fake, config, monkeypatch, capsys):
+    """
+    Test that an app created with WARM_UP set still starts when Zendesk fails to answer
+    the warm-up requests, and that the failure is printed.
+    """
+    def time_out(self) -> list:
+        """
+        Fail as a request timing out would.
+        """
+        raise requests.exceptions.ReadTimeout("Read timed out.")
+
+    monkeypatch.setattr(AllTickets, 'get_current_batch', time_out)
+    app: Flask = create_app({**config, 'WARM_UP': True})
+
+    assert "Warm-up failed: Read timed out." in capsys.readouterr().out
+    assert len(details_cache) == 0
+
+    # the app serves requests cold once Zendesk answers again
+    monkeypatch.undo()
+    assert app.test_client().get('/').status_code == 200
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_stream_index(config, backend, tmp_path):
+    """
+    Test that with STREAM_INDEX set, `/` is sent in chunks: the page shell before the
+    ticket list, and the navigation bars last, and that the navigation state is saved
+    once the ticket list is fetched, while the page is being streamed.
+    """
+    app: Flask = create_app({
+        **config, 'STREAM_INDEX': True, 'STATE_BACKEND': backend,
+        'STATE_DB_PATH': str(tmp_path / 'state.sqlite3'),
+    })
+    client = app.test_client()
+    response = client.get('/', buffered=False)
+    with client.session_transaction() as sess:
+        session_id: str = sess['session_id']
+    state_backend = app.extensions['zendesk'].state_backend
+
+    assert 'ETag' not in response.headers
+    chunks = iter(response.response)
+    shell: str = next(chunks).decode()
+    assert '<header' in shell and 'ticketDetails(' not in shell
+    assert state_backend.load(session_id) == {}
+
+    rest: list[str] = [chunk.decode() for chunk in chunks if chunk]
+    response.close()
+    assert len(rest) >= 2
+    assert 'ticketDetails(' in rest[0] and '<nav' not in rest[0]
+    assert '<nav' in ''.join(rest[1:]) and 'ticketDetails(' not in ''.join(rest[1:])
+    assert rest[-1].rstrip().endswith('</html>')
+
+    # the state saved by the streamed page is used by the session's next request
+    assert state_backend.load(session_id)['curr']
+    assert client.get('/navigate', query_string={'direction': 'next'}).json['has_prev']
+
+
+def test_stream_index_cookie_backend(config):
+    """
+    Test that STREAM_INDEX is ignored with the cookie state backend, whose session
+    cookie must be written after the page is rendered.
+    """
+    app: Flask = create_app({**config, 'STREAM_INDEX': True, 'STATE_BACKEND': 'cookie'})
+    response = app.test_client().get('/')
+
+    # rendered pages carry an ETag and a length, unlike streamed ones
+    assert 'ETag' in response.headers and 'Content-Length' in response.headers
+    assert b'ticketDetails(' in response.data and b'<nav' in response.data
+
+
+def ticket_range(html: str) -> tuple[int, int]:
+    """
+    Return the ids of the first and last tickets of a rendered ticket list.
+    """
+    match: Optional[re.Match] = re.search(r'&#35;(\d+) &mdash; &#35;(\d+)', html)
+    assert match is not None
+    return int(match[1]), int(match[2])
+
+
+@pytest.mark.parametrize('backend', ['memory', 'cookie'])
+def test_mirror_before_first_sync(fake, config, backend, tmp_path):
+    """
+    Test that until the ticket mirror completes its first sync, the ticket list and the
+    export are served from the API, and filtered requests are answered with 503. Once
+    it has synced, a session that browsed the API starts over from the first batch of
+    the mirror, and navigates it without any upstream request.
+    """
+    app: Flask = create_app({
+        **config, 'MIRROR_DB_PATH': str(tmp_path / 'mirror.sqlite3'), 'MIRROR_SYNC': False,
+        'STATE_BACKEND': backend,
+    })
+    services: AppServices = app.extensions['zendesk']
+    client = app.test_client()
+
+    # a partial mirror is not used; browse the API to tickets 101 to 125
+    services.ticket_mirror.apply_export_page(fake.tickets[:10], 'cursor-1')
+    assert ticket_range(client.get('/').get_data(as_text=True)) == (1, 25)
+    for _ in range(4):
+        navigated = client.get('/navigate', query_string={'direction': 'next'}).json
+    assert ticket_range(navigated['tickets_html']) == (101, 120)
+    assert fake.stats()['tickets'] >= 1
+
+    filtered = client.get('/', query_string={'status': 'open'})
+    assert filtered.status_code == 503
+    assert filtered.headers['Retry-After'] == '60'
+    assert client.get('/export').data.count(b'\n') == len(fake.tickets)
+
+    # once synced, the session's list is served from the mirror, from its first batch
+    services.ticket_mirror.apply_export_page(
+        fake.tickets[10:], 'cursor-2', end_of_stream=True
+    )
+    upstream_calls: int = fake.stats()['tickets']
+    assert ticket_range(client.get('/').get_data(as_text=True)) == (1, 25)
+    navigated = client.get('/navigate', query_string={'direction': 'next'}).json
+    assert ticket_range(navigated['tickets_html']) == (26, 50)
+    navigated = client.get('/navigate', query_string={'direction': 'prev'}).json
+    assert ticket_range(navigated['tickets_html']) == (1, 25)
+    assert not navigated['has_prev']
+    assert fake.stats()['tickets'] == upstream_calls
+
+    # filtered requests are served from the mirror too
+    assert client.get('/', query_string={'status': 'open'}).status_code == 200
+    assert fake.stats()['tickets'] == upstream_calls
+
+
+def test_export_failure(fake, config, monkeypatch):
+    """
+    Test that an export whose second page fails to be fetched keeps the tickets of the
+    first page, and ends with an error record.
+    """
+    request_export_page = AllTickets._request_export_page
+
+    def fail_second_page(self, url) -> dict:
+        """
+        Fetch the first page, and fail as Zendesk answering 503 would on the next.
+        """
+        if 'page%5Bafter%5D' in url or 'page[after]' in url:
+            raise RuntimeError("Failed to fetch a page of tickets. Status: 503")
+        return request_export_page(self, url)
+
+    monkeypatch.setattr(AllTickets, '_request_export_page', fail_second_page)
+    response = create_app(config).test_client().get('/export')
+    lines: list = response.get_data(as_text=True).splitlines()
+
+    assert response.status_code == 200
+    assert len(lines) == 101
+    assert json.loads(lines[-1]) == {
+        "error": "Failed to fetch a page of tickets. Status: 503"
+    }
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3.9
+"""
+Test the `async_http_client.py` file under main/upstream.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from main.upstream.zendesk_common import AUTH_TUPLE
+from main.upstream.async_http_client import AsyncZendeskHTTPClient
+from main.upstream.rate_limit import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimitScheduler
+)
+
+
+@pytest.fixture()
+def requests_seen():
+    """
+    Provide a list that records the requests received by the mock transport.
+    """
+    yield []
+
+
+@pytest.fixture()
+def client(requests_seen):
+    """
+    Initialize and yield an instance of the AsyncZendeskHTTPClient class, whose requests
+    are answered by a mock transport.
+    """
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"ticket": {"id": 2}})
+
+    ac: AsyncZendeskHTTPClient = AsyncZendeskHTTPClient(
+        pool_maxsize=4, connect_timeout=1.5, read_timeout=7.0,
+        transport=httpx.MockTransport(handler)
+    )
+    yield ac
+    ac.close()
+
+
+def test_init(client):
+    """
+    Test the __init__() method, make sure it records the configured pool and timeouts.
+    """
+    assert client.pool_maxsize == 4
+    assert client.timeout == (1.5, 7.0)
+    assert client._client.timeout == httpx.Timeout(7.0, connect=1.5)
+
+
+def test_get(client, requests_seen):
+    """
+    Test the get() method, make sure it can be awaited from another event loop and sends
+    the authentication.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    response: httpx.Response = asyncio.run(client.get(MOCK_URL, auth=AUTH_TUPLE))
+
+    assert response.json() == {"ticket": {"id": 2}}
+    assert str(requests_seen[0].url) == MOCK_URL
+    assert requests_seen[0].headers["authorization"].startswith("Basic ")
+
+
+def test_get_concurrent(client, requests_seen):
+    """
+    Test the get() method, make sure concurrent requests are in flight at the same time
+    rather than one after another.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    async def fetch_many() -> float:
+        loop = asyncio.get_running_loop()
+        start: float = loop.time()
+        await asyncio.gather(
+            *(client.get(f"{MOCK_URL}?n={n}", auth=AUTH_TUPLE) for n in range(20))
+        )
+        return loop.time() - start
+
+    elapsed: float = asyncio.run(fetch_many())
+
+    assert len(requests_seen) == 20
+    assert elapsed < 0.05 * 10
+
+
+def test_get_coalesced(client, requests_seen):
+    """
+    Test the get() method, make sure identical concurrent requests share one upstream
+    request and all receive its response.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    async def fetch_many() -> list:
+        return await asyncio.gather(
+            *(client.get(MOCK_URL, auth=AUTH_TUPLE) for _ in range(20))
+        )
+
+    responses: list = asyncio.run(fetch_many())
+
+    assert len(requests_seen) == 1
+    assert all(r.json() == {"ticket": {"id": 2}} for r in responses)
+
+
+def test_get_coalesced_by_priority(client, requests_seen):
+    """
+    Test the get() method, make sure identical concurrent requests are only shared by
+    requests of the same priority.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    async def fetch_many() -> list:
+        return await asyncio.gather(*(
+            client.get(MOCK_URL, auth=AUTH_TUPLE, priority=priority)
+            for priority in [PRIORITY_BACKGROUND] * 10 + [PRIORITY_INTERACTIVE] * 10
+        ))
+
+    asyncio.run(fetch_many())
+
+    assert len(requests_seen) == 2
+
+
+def test_get_decoded_conditional():
+    """
+    Test the get_decoded() coroutine, make sure it sends the remembered ETag back, and
+    reuses the remembered decoded body on a 304 response.
+    """
+    conditional: list = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        conditional.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, json={"ticket": {"id": 2}}, headers={"ETag": '"v1"'})
+
+    ac: AsyncZendeskHTTPClient = AsyncZendeskHTTPClient(
+        transport=httpx.MockTransport(handler)
+    )
+    url: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    async def fetch_twice() -> tuple:
+        first = await ac.get_decoded(url, AUTH_TUPLE, lambda response: response.json())
+        second = await ac.get_decoded(url, AUTH_TUPLE, lambda response: response.json())
+        return first, second
+
+    first, second = asyncio.run(fetch_twice())
+    ac.close()
+
+    assert first == {"ticket": {"id": 2}}
+    assert second is first
+    assert conditional == [None, '"v1"']
+
+
+def test_get_wait_budget():
+    """
+    Test the get() coroutine, make sure an interactive request answered with a long
+    `Retry-After` period returns the 429 response within its wait budget, and that the
+    next one is answered with a 429 response without being sent while requests are
+    paused.
+    """
+    requests_seen: list = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        return httpx.Response(429, headers={"Retry-After": "60"})
+
+    ac: AsyncZendeskHTTPClient = AsyncZendeskHTTPClient(
+        transport=httpx.MockTransport(handler),
+        scheduler=RateLimitScheduler(interactive_wait_budget=1.0)
+    )
+    url: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    async def fetch_twice() -> tuple:
+        return await ac.get(url, AUTH_TUPLE), await ac.get(url, AUTH_TUPLE)
+
+    started: float = time.monotonic()
+    first, second = asyncio.run(fetch_twice())
+    ac.close()
+
+    assert first.status_code == second.status_code == 429
+    assert len(requests_seen) == 1
+    assert time.monotonic() - started < 1.0
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3.9
+"""
+Test the `cache.py` file under main/upstream.
+"""
+
+import pytest
+
+from main.upstream import cache
+from main.upstream.cache import TTLCache
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    """
+    Replace the monotonic clock used by the cache with a controllable one.
+    """
+    class Clock:
+        now: float = 1000.0
+
+        def __call__(self) -> float:
+            return self.now
+
+    fake: Clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", fake)
+    yield fake
+
+
+def test_get_put(clock):
+    """
+    Test the get() and put() methods, make sure stored values are returned and counted
+    as hits, and absent keys as misses.
+    """
+    c: TTLCache = TTLCache(maxsize=2, ttl=10)
+    c.put("a", 1)
+
+    assert c.get("a") == 1
+    assert c.get("b") is None
+    assert (c.hits, c.misses) == (1, 1)
+
+
+def test_ttl_expiry(clock):
+    """
+    Test that entries expire once their time-to-live has passed.
+    """
+    c: TTLCache = TTLCache(maxsize=2, ttl=10)
+    c.put("a", 1)
+
+    clock.now += 10
+    assert c.get("a") == 1
+
+    clock.now += 1
+    assert c.get("a") is None
+    assert len(c) == 0
+
+
+def test_lru_eviction(clock):
+    """
+    Test that the least recently used entry is evicted when the cache is full.
+    """
+    c: TTLCache = TTLCache(maxsize=2)
+    c.put("a", 1)
+    c.put("b", 2)
+    c.get("a")
+    c.put("c", 3)
+
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.get("c") == 3
+    assert c.evictions == 1
+
+
+def test_pop_clear(clock):
+    """
+    Test the pop() and clear() methods.
+    """
+    c: TTLCache = TTLCache(maxsize=2)
+    c.put("a", 1)
+    c.put("b", 2)
+
+    assert c.pop("a") == 1
+    assert c.pop("a") is None
+
+    c.clear()
+    assert len(c) == 0
+
+
+def test_sliding_ttl(clock):
+    """
+    Test that reading an entry of a sliding cache restarts its time-to-live.
+    """
+    c: TTLCache = TTLCache(maxsize=2, ttl=10, sliding=True)
+    c.put("a", 1)
+
+    clock.now += 8
+    assert c.get("a") == 1
+
+    clock.now += 8
+    assert c.get("a") == 1
+
+    clock.now += 11
+    assert c.get("a") is None
+    assert c.expirations == 1
+
+
+def test_purge_expired(clock):
+    """
+    Test the purge_expired() method, make sure it removes expired entries only.
+    """
+    c: TTLCache = TTLCache(maxsize=3, ttl=10, sliding=True)
+    c.put("a", 1)
+    c.put("b", 2)
+    clock.now += 5
+    c.put("c", 3)
+
+    clock.now += 6
+    assert c.purge_expired() == 2
+    assert c.get("c") == 3
+    assert c.expirations == 2
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3.9
+"""
+Test the `export.py` file under main.
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+from main.export import CSV_FIELDS, chunked, csv_rows, export_body, ndjson_rows
+
+
+@pytest.fixture()
+def tickets():
+    """
+    Provide mock tickets, one of them with a comma and a quote in its subject.
+    """
+    yield [
+        {"id": 1, "subject": 'printer, "again"', "status": "open", "tags": ["a", "b"],
+         "description": "line 1\nline 2"},
+        {"id": 2, "subject": "ünïcode", "status": "solved", "tags": []},
+    ]
+
+
+def test_ndjson_rows(tickets):
+    """
+    Test the ndjson_rows() function, make sure each ticket is one line of JSON holding
+    all of its fields.
+    """
+    lines: list = list(ndjson_rows(tickets))
+
+    assert len(lines) == 2
+    assert all(line.endswith('\n') and line.count('\n') == 1 for line in lines)
+    assert [json.loads(line) for line in lines] == tickets
+
+
+def test_csv_rows(tickets):
+    """
+    Test the csv_rows() function, make sure it writes a header row, quotes values, and
+    joins list values with spaces.
+    """
+    rows: list = list(csv.reader(io.StringIO(''.join(csv_rows(tickets)))))
+
+    assert rows[0] == list(CSV_FIELDS)
+    assert len(rows) == 3
+    record: dict = dict(zip(rows[0], rows[1]))
+    assert record["id"] == "1"
+    assert record["subject"] == 'printer, "again"'
+    assert record["tags"] == "a b"
+    assert record["assignee_id"] == ""
+
+
+def test_chunked():
+    """
+    Test the chunked() function, make sure rows are joined into chunks of at least the
+    given size, and none is lost.
+    """
+    chunks: list = list(chunked(["ab", "cd", "ef", "g"], size=3))
+
+    assert chunks == ["abcd", "efg"]
+    assert list(chunked([], size=3)) == []
+
+
+def test_export_body(tickets):
+    """
+    Test the export_body() function, make sure it serialises lazily, and rejects an
+    unknown format at once.
+    """
+    consumed: list = []
+
+    def source():
+        for ticket in tickets:
+            consumed.append(ticket["id"])
+            yield ticket
+
+    body = export_body(source(), "ndjson")
+    assert consumed == []
+    assert ''.join(body).count('\n') == 2
+
+    with pytest.raises(ValueError):
+        export_body(tickets, "xml")
+
+
+@pytest.mark.parametrize('export_format', ['ndjson', 'csv'])
+def test_export_body_failure(tickets, export_format):
+    """
+    Test the export_body() function, make sure the tickets served before a failure are
+    kept, and the export ends with an error row telling it is incomplete.
+    """
+    def source():
+        yield tickets[0]
+        raise RuntimeError("""
+            Failed to fetch a batch of tickets.
+            Status: 503
+            """)
+
+    lines: list = ''.join(export_body(source(), export_format)).splitlines()
+
+    if export_format == 'ndjson':
+        assert json.loads(lines[0]) == tickets[0]
+        assert json.loads(lines[-1]) == {
+            "error": "Failed to fetch a batch of tickets. Status: 503"
+        }
+    else:
+        assert lines[-1] == \
+            "# export incomplete: Failed to fetch a batch of tickets. Status: 503"
+        assert len(lines) == 3
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3.9
+"""
+Test the `fake_zendesk.py` file under bench, against the app's own upstream clients.
+"""
+
+import pytest
+import requests
+
+from bench.fake_zendesk import FakeZendesk
+from main.upstream.all_tickets import AllTickets
+from main.upstream.http_client import ZendeskHTTPClient
+from main.upstream.ticket_details import TicketDetails, details_cache, user_cache
+
+AUTH_TUPLE: tuple = ("agent@example.com/token", "token")
+
+
+@pytest.fixture()
+def fake():
+    """
+    Serve a fake Zendesk API with 60 tickets, and stop it after the test.
+    """
+    fake: FakeZendesk = FakeZendesk(tickets=60, users=5)
+    fake.start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture()
+def http_client():
+    """
+    Provide an HTTP client of its own, so that no ETags are shared between tests.
+    """
+    client: ZendeskHTTPClient = ZendeskHTTPClient()
+    yield client
+    client.close()
+
+
+def test_paginate(fake, http_client):
+    """
+    Test that AllTickets pages through every ticket of the fake API, forward and back.
+    """
+    at: AllTickets = AllTickets(
+        api_url_root=fake.url_root, auth_tuple=AUTH_TUPLE, page_size=25,
+        http_client=http_client
+    )
+
+    forward: list = [t.id for t in at.get_current_batch()]
+    while batch := at.goto_next_batch():
+        forward += [t.id for t in batch]
+    at.goto_prev_batch()
+
+    assert forward == list(range(1, 61))
+    assert [t.id for t in at.get_current_batch()] == list(range(26, 51))
+
+
+def test_get_ticket(fake, http_client):
+    """
+    Test that TicketDetails fetches a ticket with its users in one sideloading call, and
+    that refetching it unchanged is answered with 304.
+    """
+    user_cache.clear()
+    details_cache.clear()
+    td: TicketDetails = TicketDetails(
+        api_url_root=fake.url_root, auth_tuple=AUTH_TUPLE, http_client=http_client
+    )
+
+    first: dict = td.get_ticket(fake.url_root + "/tickets/7.json")
+    second: dict = td.get_ticket(fake.url_root + "/tickets/7.json")
+
+    assert first['id'] == 7
+    assert first['requester']['id'] == fake.tickets[6]['requester_id']
+    assert second == first
+    assert fake.stats() == {'ticket': 2, 'total': 2}
+
+
+def test_rate_limit(fake):
+    """
+    Test that calls beyond the rate limit are answered with 429 and a Retry-After period.
+    """
+    fake.rate_limit = 2
+    responses: list = [
+        requests.get(fake.url_root + "/users/1.json", auth=AUTH_TUPLE) for _ in range(3)
+    ]
+
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[1].headers["X-Rate-Limit-Remaining"] == "0"
+    assert int(responses[2].headers["Retry-After"]) > 0
+    assert fake.stats()['429'] == 1
+
+
+def test_error_injection(fake):
+    """
+    Test that calls fail with 503 at the configured error rate, and require credentials.
+    """
+    fake.error_rate = 1.0
+
+    url: str = fake.url_root + "/users/1.json"
+
+    assert requests.get(url, auth=AUTH_TUPLE).status_code == 503
+    assert requests.get(url).status_code == 401
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3.9
+"""
+Test the `http_caching.py` file under main.
+"""
+
+import gzip
+import os
+import pytest
+
+from flask import Flask, make_response, url_for
+
+from main.http_caching import init_http_caching, not_modified, precompress_static, \
+    static_version, view_etag, with_etag
+
+
+@pytest.fixture()
+def static_folder(tmp_path):
+    """
+    Provide a static folder holding a stylesheet and an image.
+    """
+    folder = tmp_path / "static"
+    folder.mkdir()
+    (folder / "style.css").write_text("body { color: #17494d; }\n" * 100)
+    (folder / "logo.png").write_bytes(b"\x89PNG" + b"\x00" * 100)
+    yield str(folder)
+
+
+@pytest.fixture()
+def app(static_folder):
+    """
+    Initialize and yield a Flask app with HTTP caching, and a view that renders a large
+    page with an ETag.
+    """
+    app: Flask = Flask(__name__, static_folder=static_folder)
+    init_http_caching(app)
+
+    @app.route('/page')
+    def page():
+        etag: str = view_etag("page", 1)
+        if response := not_modified(etag):
+            return response
+        return with_etag(make_response("<p>ticket</p>" * 100), etag)
+
+    @app.route('/small')
+    def small():
+        return "<p>ticket</p>"
+
+    yield app
+
+
+def test_static_url_hash(app, static_folder):
+    """
+    Test that static URLs carry the content hash of the file, which changes with it.
+    """
+    with app.test_request_context():
+        url: str = url_for('static', filename='style.css')
+    version: str = static_version(static_folder, 'style.css')
+
+    assert url == f"/static/style.css?v={version}"
+
+    with open(f"{static_folder}/style.css", "a") as f:
+        f.write("p { margin: 0; }\n")
+    with app.test_request_context():
+        assert url_for('static', filename='style.css') != url
+
+
+def test_static_immutable(app, static_folder):
+    """
+    Test that static assets are cached as immutable only at their current hashed URL.
+    """
+    client = app.test_client()
+    version: str = static_version(static_folder, 'style.css')
+
+    hashed = client.get(f"/static/style.css?v={version}")
+    stale = client.get("/static/style.css?v=0")
+
+    assert hashed.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert "immutable" not in stale.headers.get("Cache-Control", "")
+
+
+def test_precompressed_static(app, static_folder):
+    """
+    Test the precompress_static() function, make sure it only compresses compressible
+    assets, and that the variant is served to clients that accept it.
+    """
+    assert precompress_static(static_folder) >= 1
+    assert precompress_static(static_folder) == 0
+
+    client = app.test_client()
+    compressed = client.get("/static/style.css", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/static/style.css")
+    image = client.get("/static/logo.png", headers={"Accept-Encoding": "gzip"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.mimetype == "text/css"
+    assert gzip.decompress(compressed.data) == plain.data
+    assert "Content-Encoding" not in plain.headers
+    assert "Content-Encoding" not in image.headers
+
+
+def test_stale_precompressed_static(app, static_folder):
+    """
+    Test that a precompressed variant is no longer served once its asset is edited, so
+    that the asset's new hashed URL is never cached with the old content.
+    """
+    assert precompress_static(static_folder) >= 1
+
+    # edit the stylesheet after its variants were generated, a while ago
+    path: str = f"{static_folder}/style.css"
+    for name in os.listdir(static_folder):
+        if name.startswith("style.css."):
+            variant: str = os.path.join(static_folder, name)
+            os.utime(variant, (0, os.path.getmtime(variant) - 10))
+    with open(path, "a") as f:
+        f.write("p { margin: 0; }\n")
+
+    client = app.test_client()
+    version: str = static_version(static_folder, 'style.css')
+    response = client.get(
+        f"/static/style.css?v={version}", headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert "Content-Encoding" not in response.headers
+    assert response.data.endswith(b"p { margin: 0; }\n")
+    assert "immutable" in response.headers["Cache-Control"]
+
+    # regenerating the variants serves them again
+    assert precompress_static(static_folder) >= 1
+    response = client.get(
+        f"/static/style.css?v={version}", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).endswith(b"p { margin: 0; }\n")
+
+
+def test_compress_response(app):
+    """
+    Test that large compressible responses are gzip-compressed for clients accepting
+    gzip, with a weak ETag, while small ones are left as they are.
+    """
+    client = app.test_client()
+
+    compressed = client.get("/page", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/page")
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert compressed.headers["ETag"] == f'W/"{view_etag("page", 1)}"'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert "Content-Encoding" not in plain.headers
+    assert "Content-Encoding" not in small.headers
+
+
+def test_not_modified(app):
+    """
+    Test that a view answers 304 to a client holding its current ETag, compressed or not.
+    """
+    client = app.test_client()
+    etag: str = client.get("/page").headers["ETag"]
+    weak_etag: str = client.get("/page", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+
+    assert client.get("/page", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/page", headers={"If-None-Match": weak_etag}).status_code == 304
+    assert client.get("/page", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert client.get("/page").headers["Cache-Control"] == "private, no-cache"
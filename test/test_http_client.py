@@ -0,0 +1,231 @@
+#!/usr/bin/env python3.9
+"""
+Test the `http_client.py` file under main/upstream.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from main.upstream.zendesk_common import (
+    AUTH_TUPLE, CONNECT_TIMEOUT, READ_TIMEOUT, POOL_MAXSIZE
+)
+from main.upstream import http_client
+from main.upstream.http_client import ZendeskHTTPClient, get_http_client
+from main.upstream.rate_limit import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, \
+    RateLimitScheduler
+from main.upstream.all_tickets import AllTickets
+from main.upstream.ticket_details import TicketDetails
+
+
+@pytest.fixture()
+def client():
+    """
+    Initialize and yield an instance of the ZendeskHTTPClient class.
+    """
+    hc: ZendeskHTTPClient = ZendeskHTTPClient(
+        pool_maxsize=4, connect_timeout=1.5, read_timeout=7.0
+    )
+    yield hc
+    hc.close()
+
+
+def test_init(client):
+    """
+    Test the __init__() method, make sure it records the configured pool and timeouts.
+    """
+    assert client.pool_maxsize == 4
+    assert client.timeout == (1.5, 7.0)
+
+    adapter = client._session.get_adapter("https://example.zendesk.com/api/v2")
+    assert adapter._pool_maxsize == 4
+    assert adapter._pool_block is True
+
+
+def test_get_applies_timeout(client, requests_mock):
+    """
+    Test the get() method, make sure every request carries the configured timeouts.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    requests_mock.get(MOCK_URL, json={"ticket": {"id": 2}})
+    response = client.get(MOCK_URL, auth=AUTH_TUPLE)
+
+    assert response.json() == {"ticket": {"id": 2}}
+    assert requests_mock.last_request.timeout == (1.5, 7.0)
+
+
+def test_get_http_client_shared():
+    """
+    Test the get_http_client() function, make sure it returns one process-wide client
+    configured from `zendesk_common`, and that the upstream classes use it by default.
+    """
+    shared: ZendeskHTTPClient = get_http_client()
+
+    assert get_http_client() is shared
+    assert shared.timeout == (CONNECT_TIMEOUT, READ_TIMEOUT)
+    assert shared.pool_maxsize == POOL_MAXSIZE
+
+    assert AllTickets(api_url_root="", auth_tuple=AUTH_TUPLE).http_client is shared
+    assert TicketDetails(api_url_root="", auth_tuple=AUTH_TUPLE).http_client is shared
+
+
+def test_get_retries_rate_limited(requests_mock, monkeypatch):
+    """
+    Test the get() method, make sure a 429 response is retried after its `Retry-After`
+    period and the successful response is returned.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+    slept: list = []
+    monkeypatch.setattr(http_client.time, "sleep", slept.append)
+
+    hc: ZendeskHTTPClient = ZendeskHTTPClient(scheduler=RateLimitScheduler())
+    requests_mock.get(MOCK_URL, [
+        {"status_code": 429, "headers": {"Retry-After": "0"}},
+        {"status_code": 200, "json": {"ticket": {"id": 2}}},
+    ])
+    response = hc.get(MOCK_URL, auth=AUTH_TUPLE)
+
+    assert response.status_code == 200
+    assert requests_mock.call_count == 2
+    assert len(slept) == 1 and 0 <= slept[0] <= 0.5
+
+
+def test_get_gives_up_rate_limited(requests_mock, monkeypatch):
+    """
+    Test the get() method, make sure it returns the last response once the retries are
+    exhausted.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+
+    hc: ZendeskHTTPClient = ZendeskHTTPClient(scheduler=RateLimitScheduler(max_retries=2))
+    requests_mock.get(MOCK_URL, status_code=429)
+    response = hc.get(MOCK_URL, auth=AUTH_TUPLE)
+
+    assert response.status_code == 429
+    assert requests_mock.call_count == 3
+
+
+def test_get_wait_budget(requests_mock):
+    """
+    Test the get() method, make sure an interactive request answered with a long
+    `Retry-After` period returns the 429 response within its wait budget, and that the
+    next one is answered with a 429 response without being sent while requests are
+    paused.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    hc: ZendeskHTTPClient = ZendeskHTTPClient(
+        scheduler=RateLimitScheduler(interactive_wait_budget=1.0)
+    )
+    requests_mock.get(MOCK_URL, status_code=429, headers={"Retry-After": "60"})
+
+    started: float = time.monotonic()
+    response = hc.get(MOCK_URL, auth=AUTH_TUPLE)
+    assert response.status_code == 429
+    assert requests_mock.call_count == 1
+
+    response = hc.get(MOCK_URL, auth=AUTH_TUPLE)
+    assert response.status_code == 429
+    assert response.content == b''
+    assert requests_mock.call_count == 1
+    assert time.monotonic() - started < 1.0
+
+
+def test_get_decoded_conditional(client, requests_mock):
+    """
+    Test the get_decoded() method, make sure it sends the remembered ETag back, and
+    reuses the remembered decoded body without decoding again on a 304 response.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+    decoded: list = []
+
+    def decode(response) -> dict:
+        decoded.append(response.status_code)
+        return response.json()
+
+    requests_mock.get(MOCK_URL, [
+        {"json": {"ticket": {"id": 2}}, "headers": {"ETag": 'W/"v1"'}},
+        {"status_code": 304, "headers": {"ETag": 'W/"v1"'}},
+    ])
+    first: dict = client.get_decoded(MOCK_URL, AUTH_TUPLE, decode)
+    second: dict = client.get_decoded(MOCK_URL, AUTH_TUPLE, decode)
+
+    assert first == {"ticket": {"id": 2}}
+    assert second is first
+    assert decoded == [200]
+    assert "If-None-Match" not in requests_mock.request_history[0].headers
+    assert requests_mock.request_history[1].headers["If-None-Match"] == 'W/"v1"'
+
+
+def test_get_decoded_unconditional(client, requests_mock):
+    """
+    Test the get_decoded() method, make sure responses without an ETag, and failed
+    decodes, are not remembered.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    def decode(response) -> dict:
+        if response.status_code != 200:
+            raise RuntimeError(response.status_code)
+        return response.json()
+
+    requests_mock.get(MOCK_URL, [
+        {"json": {"ticket": {"id": 2}}},
+        {"status_code": 500, "headers": {"ETag": 'W/"v1"'}},
+        {"json": {"ticket": {"id": 2}}},
+    ])
+    client.get_decoded(MOCK_URL, AUTH_TUPLE, decode)
+    with pytest.raises(RuntimeError):
+        client.get_decoded(MOCK_URL, AUTH_TUPLE, decode)
+    client.get_decoded(MOCK_URL, AUTH_TUPLE, decode)
+
+    assert len(client.etag_store) == 0
+    assert all("If-None-Match" not in r.headers for r in requests_mock.request_history)
+
+
+def test_etag_store_bounded(requests_mock):
+    """
+    Test that the ETag store keeps at most `etag_store_size` URLs.
+    """
+    hc: ZendeskHTTPClient = ZendeskHTTPClient(etag_store_size=2)
+    for i in range(5):
+        url: str = f"https://zccsammdu.zendesk.com/api/v2/tickets/{i}.json"
+        requests_mock.get(url, json={"ticket": {"id": i}}, headers={"ETag": f'"{i}"'})
+        hc.get_decoded(url, AUTH_TUPLE, lambda response: response.json())
+
+    assert len(hc.etag_store) == 2
+    hc.close()
+
+
+def test_get_coalesced_by_priority(client, monkeypatch):
+    """
+    Test the get() method, make sure concurrent requests for the same URL share one
+    upstream request only with requests of the same priority, so that an interactive
+    request never waits as a background one would.
+    """
+    MOCK_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+    release: threading.Event = threading.Event()
+    priorities: list = []
+
+    def slow_get(url, auth, priority, headers) -> str:
+        priorities.append(priority)
+        release.wait(timeout=5)
+        return f"response at priority {priority}"
+
+    monkeypatch.setattr(client, '_get', slow_get)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures: list = [
+            pool.submit(client.get, MOCK_URL, AUTH_TUPLE, priority)
+            for priority in [PRIORITY_BACKGROUND] * 4 + [PRIORITY_INTERACTIVE] * 4
+        ]
+        while len(priorities) < 2:
+            release.wait(timeout=0.01)
+        release.set()
+        results: list = [future.result() for future in futures]
+
+    assert sorted(priorities) == [PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND]
+    assert results[-1] == f"response at priority {PRIORITY_INTERACTIVE}"
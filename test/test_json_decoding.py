@@ -0,0 +1,92 @@
+#!/usr/bin/env python3.9
+"""
+Test the `json_decoding.py` file under main/upstream.
+"""
+
+import json
+
+import pytest
+import requests
+
+from main.upstream.json_decoding import BACKENDS, JSON_BACKEND, decode_json, \
+    decode_ticket_page, loads
+from main.upstream.ticket_summary import summarize_batch
+
+
+@pytest.fixture()
+def page():
+    """
+    Provide the body of a mock `/tickets.json` response, with fields the ticket list
+    does not read.
+    """
+    yield {
+        "tickets": [
+            {"id": i, "url": f"https://x.zendesk.com/api/v2/tickets/{i}.json",
+             "subject": f"ticket {i} ✓", "status": "open", "tags": ["vip"],
+             "updated_at": "2021-11-28T03:00:00Z", "description": "long " * 50,
+             "custom_fields": [{"id": 1, "value": None}], "via": {"channel": "web"}}
+            for i in range(1, 4)
+        ],
+        "meta": {"has_more": False},
+        "links": {"prev": "https://x/prev", "next": None},
+    }
+
+
+def test_default_backend():
+    """
+    Test that the standard library is always available, and preferred last.
+    """
+    assert 'json' in BACKENDS
+    assert list(BACKENDS)[-1] == 'json'
+    assert JSON_BACKEND in BACKENDS
+
+
+def test_unavailable_backend(monkeypatch):
+    """
+    Set the ZENDESK_JSON_BACKEND environment variable to an unavailable backend, and
+    see if the module still imports, raising an EnvironmentError only when a document
+    is decoded with the default backend.
+    """
+    import importlib
+    from main.upstream import json_decoding
+
+    monkeypatch.setenv("ZENDESK_JSON_BACKEND", "simdjson")
+    reloaded = importlib.reload(json_decoding)
+    assert reloaded.loads(b'{"id": 1}', 'json') == {"id": 1}
+    with pytest.raises(EnvironmentError):
+        reloaded.loads(b'{"id": 1}')
+
+    monkeypatch.undo()
+    importlib.reload(json_decoding)
+
+
+@pytest.mark.parametrize('backend', list(BACKENDS))
+def test_loads(backend, page):
+    """
+    Test the loads() function, make sure every backend decodes bytes and text alike.
+    """
+    body: str = json.dumps(page)
+
+    assert loads(body.encode(), backend) == page
+    assert loads(body, backend) == page
+
+
+@pytest.mark.parametrize('backend', list(BACKENDS))
+def test_decode_ticket_page(backend, page):
+    """
+    Test the decode_ticket_page() function, make sure it returns what summarize_batch()
+    returns for the decoded page, with every backend.
+    """
+    decoded: dict = decode_ticket_page(json.dumps(page).encode(), backend)
+
+    assert decoded == summarize_batch(page)
+    assert decoded["tickets"][0].subject == "ticket 1 ✓"
+
+
+def test_decode_json(page, requests_mock):
+    """
+    Test the decode_json() function, make sure it decodes a `requests` response body.
+    """
+    requests_mock.get("https://x/tickets.json", json=page)
+
+    assert decode_json(requests.get("https://x/tickets.json")) == page
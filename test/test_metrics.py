@@ -0,0 +1,134 @@
+#!/usr/bin/env python3.9
+"""
+Test the `metrics.py` file under main.
+"""
+
+import pytest
+
+from flask import Flask
+
+from main.metrics import Counter, Histogram, cache_requests, init_metrics, \
+    observe_upstream, upstream_endpoint, upstream_requests
+from main.upstream.cache import TTLCache
+
+
+@pytest.fixture()
+def app():
+    """
+    Initialize and yield a Flask app with metrics, a view, and a gauge.
+    """
+    app: Flask = Flask(__name__)
+    init_metrics(app, gauges={'test_live_things': ("Things alive.", lambda: 3)})
+
+    @app.route('/page')
+    def page():
+        return "<p>ticket</p>"
+
+    yield app
+
+
+def test_counter():
+    """
+    Test the Counter class, make sure counts are kept and rendered per label values.
+    """
+    counter: Counter = Counter('test_events_total', "Events.", ('kind',))
+    counter.inc(kind='a')
+    counter.inc(2, kind='a')
+    counter.inc(kind='b"c')
+
+    assert counter.value(kind='a') == 3
+    assert counter.samples() == [
+        'test_events_total{kind="a"} 3.0',
+        'test_events_total{kind="b\\"c"} 1.0',
+    ]
+
+
+def test_histogram():
+    """
+    Test the Histogram class, make sure bucket counts are rendered cumulatively with
+    their sum and count.
+    """
+    histogram: Histogram = Histogram('test_seconds', "Durations.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    assert histogram.samples() == [
+        'test_seconds_bucket{le="0.1"} 1.0',
+        'test_seconds_bucket{le="1.0"} 3.0',
+        'test_seconds_bucket{le="+Inf"} 4.0',
+        'test_seconds_sum 4.25',
+        'test_seconds_count 4.0',
+    ]
+
+
+def test_upstream_endpoint():
+    """
+    Test the upstream_endpoint() function, make sure ids are replaced and the query
+    string is dropped.
+    """
+    root: str = "https://zccsammdu.zendesk.com/api/v2"
+
+    assert upstream_endpoint(root + "/tickets/25.json?include=users") == \
+        "/api/v2/tickets/{id}.json"
+    assert upstream_endpoint(root + "/users/show_many.json?ids=1,2") == \
+        "/api/v2/users/show_many.json"
+    assert upstream_endpoint(root + "/tickets.json?page[size]=25") == "/api/v2/tickets.json"
+
+
+def test_observe_upstream():
+    """
+    Test the observe_upstream() function, make sure requests are recorded by endpoint
+    and status.
+    """
+    before: int = upstream_requests.count(endpoint="/api/v2/users/{id}.json", status="404")
+    observe_upstream("https://zccsammdu.zendesk.com/api/v2/users/7.json", 404, 0.2, 60)
+
+    assert upstream_requests.count(
+        endpoint="/api/v2/users/{id}.json", status="404"
+    ) == before + 1
+
+
+def test_named_cache():
+    """
+    Test that a named TTLCache counts its hits and misses in the metrics.
+    """
+    cache: TTLCache = TTLCache(maxsize=2, name='test')
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('b')
+
+    assert cache_requests.value(cache='test', result='hit') >= 1
+    assert cache_requests.value(cache='test', result='miss') >= 1
+
+
+def test_metrics_endpoint(app):
+    """
+    Test that requests are timed by endpoint, and that the metrics are served in the
+    Prometheus text format along with the gauges.
+    """
+    client = app.test_client()
+    client.get('/page')
+    response = client.get('/metrics')
+    text: str = response.get_data(as_text=True)
+
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert 'app_request_duration_seconds_count{endpoint="page",method="GET",status="200"}' \
+        in text
+    assert "# TYPE test_live_things gauge\ntest_live_things 3.0" in text
+    assert 'endpoint="metrics"' not in text
+
+
+def test_gauges_per_app(app):
+    """
+    Test that the gauges of a second app are served by its own metrics endpoint, and
+    leave those of the first app unchanged.
+    """
+    other: Flask = Flask(__name__)
+    init_metrics(other, gauges={'test_live_things': ("Things alive.", lambda: 5)})
+
+    text: str = app.test_client().get('/metrics').get_data(as_text=True)
+    other_text: str = other.test_client().get('/metrics').get_data(as_text=True)
+
+    assert "test_live_things 3.0" in text
+    assert "test_live_things 5.0" not in text
+    assert "test_live_things 5.0" in other_text
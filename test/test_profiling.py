@@ -0,0 +1,70 @@
+#!/usr/bin/env python3.9
+"""
+Test the `profiling.py` file under main.
+"""
+
+import os
+import pstats
+import pytest
+
+from flask import Flask
+
+from main.profiling import init_profiling, profile_token
+
+
+@pytest.fixture()
+def app(tmp_path):
+    """
+    Initialize and yield a Flask app with profiling into a temporary folder, and a view.
+    """
+    app: Flask = Flask(__name__)
+    app.secret_key = "secret"
+    app.config['PROFILE_DIR'] = str(tmp_path / "profiles")
+    app.config['PROFILE_KEEP'] = 2
+    init_profiling(app)
+
+    @app.route('/page')
+    def page():
+        return "".join(str(i) for i in range(1000))
+
+    yield app
+
+
+def test_not_profiled(app):
+    """
+    Test that requests are not profiled by default, nor with an invalid token.
+    """
+    client = app.test_client()
+
+    assert 'X-Profile' not in client.get('/page').headers
+    assert 'X-Profile' not in client.get('/page?profile=forged').headers
+    assert 'X-Profile' not in client.get(
+        '/page', headers={'X-Profile': profile_token("other secret")}
+    ).headers
+    assert not os.path.exists(app.config['PROFILE_DIR'])
+
+
+def test_profile_token(app):
+    """
+    Test that a request carrying a valid token is profiled, and its profile saved under
+    the name returned in the response.
+    """
+    response = app.test_client().get(
+        '/page', headers={'X-Profile': profile_token("secret")}
+    )
+    path: str = os.path.join(app.config['PROFILE_DIR'], response.headers['X-Profile'])
+
+    assert pstats.Stats(path).total_calls > 0
+
+
+def test_profile_sample_rate(app):
+    """
+    Test that every request is profiled with a sample rate of 1, and that only the
+    latest profiles are kept.
+    """
+    app.config['PROFILE_SAMPLE_RATE'] = 1.0
+    client = app.test_client()
+    names: list = [client.get('/page').headers['X-Profile'] for _ in range(3)]
+
+    assert len(set(names)) == 3
+    assert len(os.listdir(app.config['PROFILE_DIR'])) == 2
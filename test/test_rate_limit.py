@@ -0,0 +1,181 @@
+#!/usr/bin/env python3.9
+"""
+Test the `rate_limit.py` file under main/upstream.
+"""
+
+import asyncio
+
+import pytest
+
+from main.upstream import rate_limit
+from main.upstream.rate_limit import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimitScheduler
+)
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    """
+    Replace the monotonic clock and sleep used by the scheduler with controllable ones;
+    sleeping advances the clock instantly.
+    """
+    class Clock:
+        now: float = 1000.0
+        slept: float = 0.0
+
+        def __call__(self) -> float:
+            return self.now
+
+        def sleep(self, seconds: float) -> None:
+            self.now += seconds
+            self.slept += seconds
+
+    fake: Clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", fake)
+    monkeypatch.setattr(rate_limit.time, "sleep", fake.sleep)
+    yield fake
+
+
+def test_bucket_paces_requests(clock):
+    """
+    Test the acquire() method, make sure a full bucket lets a minute's worth of requests
+    through at once, and then paces requests at the configured rate.
+    """
+    scheduler: RateLimitScheduler = RateLimitScheduler(rate_per_minute=60)
+
+    for _ in range(60):
+        scheduler.acquire()
+    assert clock.slept == 0
+
+    scheduler.acquire()
+    scheduler.acquire()
+    assert clock.slept == pytest.approx(2.0)
+
+
+def test_background_reserve(clock):
+    """
+    Test the try_acquire() method, make sure background requests leave the reserved part
+    of the bucket to interactive requests.
+    """
+    scheduler: RateLimitScheduler = RateLimitScheduler(
+        rate_per_minute=10, background_reserve=0.2
+    )
+
+    for _ in range(8):
+        assert scheduler.try_acquire(PRIORITY_BACKGROUND) == 0
+    assert scheduler.try_acquire(PRIORITY_BACKGROUND) > 0
+    assert scheduler.try_acquire(PRIORITY_INTERACTIVE) == 0
+
+
+def test_background_yields_to_waiting_interactive(clock):
+    """
+    Test the try_acquire() method, make sure background requests wait while an
+    interactive request is waiting for a token.
+    """
+    scheduler: RateLimitScheduler = RateLimitScheduler(rate_per_minute=60)
+
+    with scheduler._waiting(PRIORITY_INTERACTIVE):
+        assert scheduler.try_acquire(PRIORITY_BACKGROUND) > 0
+    assert scheduler.try_acquire(PRIORITY_BACKGROUND) == 0
+
+
+def test_under_pressure(clock):
+    """
+    Test the under_pressure() method, make sure it reports when the bucket is down to
+    the interactive reserve, interactive requests are waiting, or requests are paused.
+    """
+    scheduler: RateLimitScheduler = RateLimitScheduler(
+        rate_per_minute=10, background_reserve=0.2
+    )
+    assert not scheduler.under_pressure()
+
+    with scheduler._waiting(PRIORITY_INTERACTIVE):
+        assert scheduler.under_pressure()
+
+    for _ in range(8):
+        scheduler.try_acquire(PRIORITY_INTERACTIVE)
+    assert scheduler.under_pressure()
+
+    clock.now += 60
+    assert not scheduler.under_pressure()
+    scheduler.observe(429, {"Retry-After": "7"})
+    assert scheduler.under_pressure()
+
+
+def test_observe_rate_limit_headers(clock):
+    """
+    Test the observe() method, make sure it follows the account's rate limit and the
+    number of requests remaining.
+    """
+    scheduler: RateLimitScheduler = RateLimitScheduler(rate_per_minute=60)
+    scheduler.observe(200, {"X-Rate-Limit": "700", "X-Rate-Limit-Remaining": "1"})
+
+    assert scheduler.rate_per_minute == 700
+    assert scheduler.try_acquire() == 0
+    assert scheduler.try_acquire() > 0
+
+
+def test_observe_retry_after(clock):
+    """
+    Test the observe() method, make sure a 429 response with `Retry-After` pauses all
+    requests for that period.
+    """
+    scheduler: RateLimitScheduler = RateLimitScheduler(rate_per_minute=60)
+    scheduler.observe(429, {"Retry-After": "7"})
+
+    assert scheduler.try_acquire() == pytest.approx(7.0)
+
+    scheduler.acquire()
+    assert clock.slept == pytest.approx(7.0)
+
+
+def test_acquire_async(clock, monkeypatch):
+    """
+    Test the acquire_async() method, make sure it waits out a pause without blocking.
+    """
+    async def fake_sleep(seconds: float) -> None:
+        clock.sleep(seconds)
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", fake_sleep)
+    scheduler: RateLimitScheduler = RateLimitScheduler(rate_per_minute=60)
+    scheduler.observe(429, {"Retry-After": "3"})
+    asyncio.run(scheduler.acquire_async())
+
+    assert clock.slept == pytest.approx(3.0)
+
+
+def test_retry_policy(clock):
+    """
+    Test the should_retry() and retry_delay() methods.
+    """
+    scheduler: RateLimitScheduler = RateLimitScheduler(
+        max_retries=2, backoff_base=0.5, backoff_cap=1.5
+    )
+
+    assert scheduler.should_retry(429, 0)
+    assert scheduler.should_retry(503, 1)
+    assert not scheduler.should_retry(429, 2)
+    assert not scheduler.should_retry(404, 0)
+
+    assert 4.0 <= scheduler.retry_delay(0, {"Retry-After": "4"}) <= 4.5
+    for attempt in range(5):
+        assert 0 <= scheduler.retry_delay(attempt, {}) <= min(1.5, 0.5 * 2 ** attempt)
+
+
+def test_acquire_deadline(clock):
+    """
+    Test the deadline() and acquire() methods, make sure an interactive request gives up
+    without a token when a Retry-After pause outlasts its wait budget, while a background
+    request waits the pause out.
+    """
+    scheduler: RateLimitScheduler = RateLimitScheduler(interactive_wait_budget=5.0)
+    scheduler.observe(429, {"Retry-After": "60"})
+
+    assert scheduler.deadline(PRIORITY_BACKGROUND) is None
+    assert not scheduler.acquire(
+        PRIORITY_INTERACTIVE, scheduler.deadline(PRIORITY_INTERACTIVE)
+    )
+    assert clock.slept == 0
+
+    assert scheduler.acquire(PRIORITY_BACKGROUND, scheduler.deadline(PRIORITY_BACKGROUND))
+    assert clock.slept == pytest.approx(60.0)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3.9
+"""
+Test the `server_timing.py` file under main.
+"""
+
+import pytest
+import threading
+from contextvars import copy_context
+
+from flask import Flask
+
+from main.server_timing import RequestTimings, current_timings, init_server_timing, timed
+
+
+@pytest.fixture()
+def app():
+    """
+    Initialize and yield a Flask app with Server-Timing, and a view that spends time in
+    each phase, partly on another thread.
+    """
+    app: Flask = Flask(__name__)
+    init_server_timing(app)
+
+    @app.route('/page')
+    def page():
+        worker = threading.Thread(target=copy_context().run, args=(timed_upstream,))
+        worker.start()
+        worker.join()
+        with timed('decode'):
+            pass
+        with timed('render'):
+            return "<p>ticket</p>"
+
+    def timed_upstream():
+        with timed('upstream'):
+            pass
+
+    yield app
+
+
+def test_duration_union():
+    """
+    Test the duration() method, make sure overlapping intervals are only counted once.
+    """
+    timings: RequestTimings = RequestTimings()
+    timings.add('upstream', 0.0, 1.0)
+    timings.add('upstream', 0.5, 1.5)
+    timings.add('upstream', 2.0, 2.25)
+    timings.add('upstream', 0.2, 0.3)
+
+    assert timings.duration('upstream') == 1.75
+    assert timings.duration('render') == 0.0
+
+
+def test_header():
+    """
+    Test the header() method, make sure every phase and the total are listed in ms.
+    """
+    timings: RequestTimings = RequestTimings()
+    timings.add('render', 1.0, 1.004)
+
+    assert timings.header(0.01) == \
+        "upstream;dur=0.0, decode;dur=0.0, render;dur=4.0, total;dur=10.0"
+
+
+def test_timed_outside_request():
+    """
+    Test that timed() records nothing outside of a request.
+    """
+    with timed('upstream'):
+        pass
+
+    assert current_timings() is None
+
+
+def test_server_timing_header(app):
+    """
+    Test that responses carry a Server-Timing header with every phase, including phases
+    timed on other threads in a copy of the request's context.
+    """
+    response = app.test_client().get('/page')
+    phases: dict = dict(
+        metric.split(';dur=') for metric in response.headers['Server-Timing'].split(', ')
+    )
+
+    assert list(phases) == ['upstream', 'decode', 'render', 'total']
+    assert all(float(duration) >= 0 for duration in phases.values())
+
+
+def test_server_timing_disabled(app):
+    """
+    Test that the header is left out if the SERVER_TIMING config is unset.
+    """
+    app.config['SERVER_TIMING'] = False
+
+    assert 'Server-Timing' not in app.test_client().get('/page').headers
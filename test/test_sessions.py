@@ -0,0 +1,105 @@
+#!/usr/bin/env python3.9
+"""
+Test the `sessions.py` file under main.
+"""
+
+import pytest
+
+from main.upstream import cache
+from main.metrics import cache_evictions, cache_requests
+from main.sessions import SessionStore
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    """
+    Replace the monotonic clock used by the underlying cache with a controllable one.
+    """
+    class Clock:
+        now: float = 1000.0
+
+        def __call__(self) -> float:
+            return self.now
+
+    fake: Clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", fake)
+    yield fake
+
+
+def test_get_or_create(clock):
+    """
+    Test the get_or_create() method, make sure the factory is only called for sessions
+    that are not held.
+    """
+    store: SessionStore = SessionStore(maxsize=2, idle_ttl=60)
+    obj = store.get_or_create("s1", object)
+
+    assert store.get_or_create("s1", object) is obj
+    assert store.get_or_create("s2", object) is not obj
+    assert store.live_sessions == 2
+    assert store.evictions == 0
+
+
+def test_lru_eviction(clock):
+    """
+    Test that the least recently used session is evicted and rebuilt when the store is
+    full.
+    """
+    store: SessionStore = SessionStore(maxsize=2, idle_ttl=60)
+    obj_1 = store.get_or_create("s1", object)
+    store.get_or_create("s2", object)
+    store.get_or_create("s1", object)
+    store.get_or_create("s3", object)
+
+    assert store.live_sessions == 2
+    assert store.evictions == 1
+    assert store.get_or_create("s1", object) is obj_1
+
+
+def test_idle_expiry(clock):
+    """
+    Test that idle sessions expire, while sessions in use are kept.
+    """
+    store: SessionStore = SessionStore(maxsize=3, idle_ttl=60)
+    obj_1 = store.get_or_create("s1", object)
+    obj_2 = store.get_or_create("s2", object)
+
+    clock.now += 40
+    store.get_or_create("s1", object)
+    clock.now += 40
+    store.get_or_create("s3", object)
+
+    assert store.live_sessions == 2
+    assert store.evictions == 1
+    assert store.get_or_create("s1", object) is obj_1
+    assert store.get_or_create("s2", object) is not obj_2
+
+
+def test_discard(clock):
+    """
+    Test the discard() method.
+    """
+    store: SessionStore = SessionStore(maxsize=2, idle_ttl=60)
+    store.get_or_create("s1", object)
+    store.discard("s1")
+
+    assert store.live_sessions == 0
+
+
+def test_session_metrics(clock):
+    """
+    Test that the hits, misses and evictions of the store are reported in the metrics
+    as those of the "sessions" cache.
+    """
+    hits: float = cache_requests.value(cache='sessions', result='hit')
+    misses: float = cache_requests.value(cache='sessions', result='miss')
+    evictions: float = cache_evictions.value(cache='sessions')
+
+    store: SessionStore = SessionStore(maxsize=1, idle_ttl=60)
+    store.get_or_create("s1", object)
+    store.get_or_create("s1", object)
+    store.get_or_create("s2", object)
+
+    assert cache_requests.value(cache='sessions', result='hit') == hits + 1
+    assert cache_requests.value(cache='sessions', result='miss') == misses + 2
+    assert cache_evictions.value(cache='sessions') == evictions + 1
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3.9
+"""
+Test the `single_flight.py` file under main/upstream.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from main.upstream.single_flight import SingleFlight, AsyncSingleFlight
+
+
+def test_do_coalesces_concurrent_calls():
+    """
+    Test the SingleFlight do() method, make sure concurrent calls for the same key run
+    the function once and all receive its result.
+    """
+    sf: SingleFlight = SingleFlight()
+    release: threading.Event = threading.Event()
+    calls: list = []
+
+    def slow_fetch() -> dict:
+        calls.append(1)
+        release.wait(timeout=5)
+        return {"id": 1}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures: list = [pool.submit(sf.do, "url", slow_fetch) for _ in range(8)]
+        while sf.shared < 7:
+            time.sleep(0.001)
+        release.set()
+        results: list = [f.result() for f in futures]
+
+    assert calls == [1]
+    assert results == [{"id": 1}] * 8
+
+
+def test_do_sequential_calls():
+    """
+    Test the SingleFlight do() method, make sure calls that do not overlap each run the
+    function, and calls for different keys are not coalesced.
+    """
+    sf: SingleFlight = SingleFlight()
+
+    assert sf.do("a", lambda: 1) == 1
+    assert sf.do("a", lambda: 2) == 2
+    assert sf.do("b", lambda: 3) == 3
+    assert sf.shared == 0
+
+
+def test_do_propagates_exception():
+    """
+    Test the SingleFlight do() method, make sure an exception reaches the caller and the
+    key is released afterwards.
+    """
+    sf: SingleFlight = SingleFlight()
+
+    def failing_fetch() -> dict:
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        sf.do("url", failing_fetch)
+    assert sf.do("url", lambda: {"id": 1}) == {"id": 1}
+
+
+def test_async_do_coalesces_concurrent_calls():
+    """
+    Test the AsyncSingleFlight do() method, make sure concurrent calls for the same key
+    await one call and all receive its result.
+    """
+    sf: AsyncSingleFlight = AsyncSingleFlight()
+    calls: list = []
+
+    async def slow_fetch() -> dict:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    async def fetch_many() -> list:
+        return await asyncio.gather(*(sf.do("url", slow_fetch) for _ in range(8)))
+
+    assert asyncio.run(fetch_many()) == [{"id": 1}] * 8
+    assert calls == [1]
+    assert sf.shared == 7
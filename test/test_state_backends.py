@@ -0,0 +1,151 @@
+#!/usr/bin/env python3.9
+"""
+Test the `state_backends.py` file under main.
+"""
+
+import pytest
+from flask import Flask
+
+from main import state_backends
+from main.upstream import cache
+from main.state_backends import (
+    StateBackend, CookieStateBackend, SQLiteStateBackend, MemoryStateBackend,
+    make_state_backend
+)
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    """
+    Replace the wall clock used by the SQLite backend, and the monotonic clock used by
+    the memory backend's cache, with one controllable clock.
+    """
+    class Clock:
+        now: float = 1000.0
+
+        def __call__(self) -> float:
+            return self.now
+
+    fake: Clock = Clock()
+    monkeypatch.setattr(state_backends.time, "time", fake)
+    monkeypatch.setattr(cache.time, "monotonic", fake)
+    yield fake
+
+
+@pytest.fixture()
+def state():
+    """
+    Provide a sample navigation state.
+    """
+    yield {
+        "curr": "https://zccsammdu.zendesk.com/api/v2/tickets.json?page[size]=25",
+        "next": "https://zccsammdu.zendesk.com/api/v2/tickets.json?page%5Bafter%5D=x",
+        "prev": "",
+    }
+
+
+def test_memory_backend(state):
+    """
+    Test the MemoryStateBackend class, make sure states are saved per session.
+    """
+    backend: StateBackend = MemoryStateBackend()
+    backend.save("s1", state)
+
+    assert backend.load("s1") == state
+    assert backend.load("s2") == {}
+
+
+def test_memory_backend_bounded(state, clock):
+    """
+    Test the MemoryStateBackend class, make sure idle sessions expire and the least
+    recently used session is evicted once the store is full.
+    """
+    backend: StateBackend = MemoryStateBackend(maxsize=2, idle_ttl=60)
+    backend.save("s1", state)
+    backend.save("s2", state)
+    backend.save("s3", state)
+
+    assert backend.load("s1") == {}
+    assert backend.load("s3") == state
+
+    clock.now += 61
+    assert backend.load("s2") == {}
+    assert backend.load("s3") == {}
+
+
+def test_sqlite_backend(state, tmp_path):
+    """
+    Test the SQLiteStateBackend class, make sure states are saved per session, replaced
+    on save, and shared by separate backend objects on the same database file.
+    """
+    path: str = str(tmp_path / "state.sqlite3")
+    backend: StateBackend = SQLiteStateBackend(path)
+    backend.save("s1", {"curr": "old", "next": "", "prev": ""})
+    backend.save("s1", state)
+
+    assert backend.load("s1") == state
+    assert backend.load("s2") == {}
+    assert SQLiteStateBackend(path).load("s1") == state
+
+
+def test_sqlite_backend_purge(state, tmp_path, clock):
+    """
+    Test the SQLiteStateBackend class, make sure states not saved within the idle
+    time-to-live are no longer loaded, and are deleted by a later save.
+    """
+    backend: SQLiteStateBackend = SQLiteStateBackend(
+        str(tmp_path / "state.sqlite3"), idle_ttl=60, purge_interval=10
+    )
+    backend.save("s1", state)
+
+    clock.now += 61
+    assert backend.load("s1") == {}
+
+    backend.save("s2", state)
+    rows: list = backend._connect().execute('SELECT session_id FROM nav_state').fetchall()
+    assert rows == [("s2",)]
+    assert backend.load("s2") == state
+
+
+def test_state_backend_abstract():
+    """
+    Test that the StateBackend interface cannot be instantiated, nor a backend missing
+    one of its methods.
+    """
+    class LoadOnly(StateBackend):
+        def load(self, session_id: str) -> dict:
+            return {}
+
+    with pytest.raises(TypeError):
+        StateBackend()
+    with pytest.raises(TypeError):
+        LoadOnly()
+
+
+def test_cookie_backend(state):
+    """
+    Test the CookieStateBackend class, make sure the state is kept in the Flask session.
+    """
+    app: Flask = Flask(__name__)
+    app.secret_key = "test"
+    backend: StateBackend = CookieStateBackend()
+
+    with app.test_request_context():
+        assert backend.load("s1") == {}
+        backend.save("s1", state)
+        assert backend.load("s1") == state
+
+
+def test_make_state_backend(tmp_path):
+    """
+    Test the make_state_backend() function, make sure it builds the named backend and
+    rejects unknown names.
+    """
+    assert isinstance(make_state_backend("cookie"), CookieStateBackend)
+    assert isinstance(make_state_backend("memory"), MemoryStateBackend)
+    assert isinstance(
+        make_state_backend("sqlite", path=str(tmp_path / "s.sqlite3")), SQLiteStateBackend
+    )
+
+    with pytest.raises(ValueError):
+        make_state_backend("redis")
@@ -3,11 +3,31 @@
 Test the `ticket_details.py` file under main/upstream.
 """
 
+import asyncio
 import pytest
 import json
+import threading
+
+import httpx
 
 from main.upstream.zendesk_common import API_URL_ROOT, AUTH_TUPLE
-from main.upstream.ticket_details import TicketDetails
+from main.upstream.ticket_details import TicketDetails, AsyncTicketDetails, \
+    TicketDetailsPrefetcher, details_cache, user_cache
+from main.upstream.ticket_summary import TicketSummary
+from main.upstream.async_http_client import AsyncZendeskHTTPClient
+from main.upstream.http_client import ZendeskHTTPClient
+
+
+@pytest.fixture(autouse=True)
+def empty_user_cache():
+    """
+    Make sure every test starts with empty process-wide user and details caches.
+    """
+    user_cache.clear()
+    details_cache.clear()
+    yield
+    user_cache.clear()
+    details_cache.clear()
 
 
 @pytest.fixture()
@@ -169,3 +189,290 @@ def test_get_ticket_failure_nouser(td_instance, resp, requests_mock):
     response: dict = td_instance.get_ticket(MOCK_TICKET_URL)
 
     assert response == {}
+
+
+def test_request_users_success(td_instance, resp, requests_mock):
+    """
+    Test the _request_users() method, make sure it returns the users keyed by id upon a
+    successful call.
+    """
+    MOCK_USERS_URL: str = "https://zccsammdu.zendesk.com/api/v2/users/show_many.json"
+    other_user: dict = dict(resp.user_success['user'], id=1910383993886)
+
+    requests_mock.get(
+        MOCK_USERS_URL, json={"users": [resp.user_success['user'], other_user]}
+    )
+    response: dict = td_instance._request_users([1910383993885, 1910383993886])
+
+    assert response == {
+        1910383993885: resp.user_success['user'],
+        1910383993886: other_user,
+    }
+    assert requests_mock.last_request.qs == {"ids": ["1910383993885,1910383993886"]}
+
+
+def test_request_users_failure_404(td_instance, resp, requests_mock):
+    """
+    Test the _request_users() method, make sure it returns {} upon a 404 HTTP error.
+    """
+    MOCK_USERS_URL: str = "https://zccsammdu.zendesk.com/api/v2/users/show_many.json"
+
+    requests_mock.get(MOCK_USERS_URL, json=resp.common_404, status_code=404)
+    response: dict = td_instance._request_users([1910383993885, 1910383993886])
+
+    assert response == {}
+
+
+def test_get_ticket_user_cache(td_instance, resp, requests_mock):
+    """
+    Test the get_ticket() method, make sure a second call serves the user profiles from
+    the shared user cache, even for a different TicketDetails object.
+    """
+    MOCK_TICKET_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+    MOCK_USER_URL: str = "https://zccsammdu.zendesk.com/api/v2/users/1910383993885.json"
+
+    requests_mock.get(MOCK_TICKET_URL, json=resp.ticket_success)
+    requests_mock.get(MOCK_USER_URL, json=resp.user_success)
+    td_instance.get_ticket(MOCK_TICKET_URL)
+    calls_cold: int = requests_mock.call_count
+
+    other: TicketDetails = TicketDetails(api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE)
+    response: dict = other.get_ticket(MOCK_TICKET_URL)
+
+    assert requests_mock.call_count - calls_cold == 1
+    assert response['requester'] == resp.user_success['user']
+    assert response['assignee'] == resp.user_success['user']
+
+
+def test_user_cache_per_account(td_instance, resp):
+    """
+    Test that the shared user cache keeps the users of each account apart, so that a
+    TicketDetails object for another account does not serve them.
+    """
+    user: dict = resp.user_success['user']
+    td_instance._remember_users({}, {user['id']: user})
+    other: TicketDetails = TicketDetails(
+        api_url_root="https://other.zendesk.com/api/v2", auth_tuple=AUTH_TUPLE
+    )
+
+    assert td_instance._cached_users([user['id']]) == ({user['id']: user}, [])
+    assert other._cached_users([user['id']]) == ({}, [user['id']])
+
+
+def test_get_ticket_show_many(td_instance, resp, requests_mock):
+    """
+    Test the get_ticket() method, make sure a distinct requester and assignee missing
+    from the user cache are fetched together in one show_many request.
+    """
+    MOCK_TICKET_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+    MOCK_USERS_URL: str = "https://zccsammdu.zendesk.com/api/v2/users/show_many.json"
+    ticket: dict = dict(resp.ticket_success['ticket'], assignee_id=1910383993886)
+    assignee: dict = dict(resp.user_success['user'], id=1910383993886, name="Agent")
+
+    requests_mock.get(MOCK_TICKET_URL, json={"ticket": ticket})
+    requests_mock.get(MOCK_USERS_URL, json={"users": [resp.user_success['user'], assignee]})
+    response: dict = td_instance.get_ticket(MOCK_TICKET_URL)
+
+    assert response['requester'] == resp.user_success['user']
+    assert response['assignee'] == assignee
+    assert [r.path for r in requests_mock.request_history].count(
+        "/api/v2/users/show_many.json"
+    ) == 1
+
+
+def test_request_ticket_with_users_success(td_instance, resp, requests_mock):
+    """
+    Test the _request_ticket_with_users() method, make sure it requests the users as a
+    sideload and returns the ticket along with the users keyed by id.
+    """
+    MOCK_TICKET_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    requests_mock.get(
+        MOCK_TICKET_URL,
+        json=dict(resp.ticket_success, users=[resp.user_success['user']])
+    )
+    ticket, users = td_instance._request_ticket_with_users(MOCK_TICKET_URL)
+
+    assert ticket == resp.ticket_success['ticket']
+    assert users == {1910383993885: resp.user_success['user']}
+    assert requests_mock.last_request.qs == {"include": ["users"]}
+
+
+def test_request_ticket_with_users_failure_404(td_instance, resp, requests_mock):
+    """
+    Test the _request_ticket_with_users() method, make sure it returns two empty dicts
+    upon a 404 HTTP error.
+    """
+    MOCK_TICKET_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/xyz.json"
+
+    requests_mock.get(MOCK_TICKET_URL, json=resp.common_404, status_code=404)
+    response: tuple = td_instance._request_ticket_with_users(MOCK_TICKET_URL)
+
+    assert response == ({}, {})
+
+
+def test_get_ticket_sideload(td_instance, resp, requests_mock):
+    """
+    Test the get_ticket() method, make sure sideloaded users are used without any further
+    upstream request.
+    """
+    MOCK_TICKET_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+
+    requests_mock.get(
+        MOCK_TICKET_URL,
+        json=dict(resp.ticket_success, users=[resp.user_success['user']])
+    )
+    response: dict = td_instance.get_ticket(MOCK_TICKET_URL)
+
+    assert requests_mock.call_count == 1
+    assert response['requester'] == resp.user_success['user']
+    assert response['assignee'] == resp.user_success['user']
+
+
+def test_get_ticket_sideload_fallback(td_instance, resp, requests_mock):
+    """
+    Test the get_ticket() method, make sure it falls back to separate requests for the
+    ticket and its users when the sideloading request fails.
+    """
+    MOCK_TICKET_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+    MOCK_USER_URL: str = "https://zccsammdu.zendesk.com/api/v2/users/1910383993885.json"
+
+    requests_mock.get(MOCK_TICKET_URL, json=resp.ticket_success)
+    requests_mock.get(MOCK_TICKET_URL + "?include=users", status_code=500)
+    requests_mock.get(MOCK_USER_URL, json=resp.user_success)
+    response: dict = td_instance.get_ticket(MOCK_TICKET_URL)
+
+    assert requests_mock.call_count == 3
+    assert response['requester'] == resp.user_success['user']
+    assert response['assignee'] == resp.user_success['user']
+
+
+def test_get_ticket_not_modified(resp, requests_mock):
+    """
+    Test the get_ticket() method with conditional requests, make sure an unchanged
+    ticket is served from the HTTP client's ETag store, which attaching its users leaves
+    unchanged.
+    """
+    MOCK_TICKET_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/2.json"
+    td: TicketDetails = TicketDetails(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, http_client=ZendeskHTTPClient()
+    )
+
+    requests_mock.get(MOCK_TICKET_URL, [
+        {"json": dict(resp.ticket_success, users=[resp.user_success['user']]),
+         "headers": {"ETag": 'W/"v1"'}},
+        {"status_code": 304},
+    ])
+    first: dict = td.get_ticket(MOCK_TICKET_URL)
+    second: dict = td.get_ticket(MOCK_TICKET_URL)
+
+    assert requests_mock.last_request.headers["If-None-Match"] == 'W/"v1"'
+    assert second == first
+    assert second['requester'] == resp.user_success['user']
+    stored_ticket: dict = td.http_client.etag_store.get(
+        (MOCK_TICKET_URL + "?include=users", AUTH_TUPLE)
+    )[1]['ticket']
+    assert 'requester' not in stored_ticket
+
+
+def test_prefetch_now(resp, requests_mock):
+    """
+    Test the TicketDetailsPrefetcher class, make sure prefetch_now() fetches the tickets
+    and their users in bulk, and that get_ticket() then serves them without requests.
+    """
+    MOCK_TICKETS_URL: str = "https://zccsammdu.zendesk.com/api/v2/tickets/show_many.json"
+    MOCK_USER_URL: str = "https://zccsammdu.zendesk.com/api/v2/users/1910383993885.json"
+    ticket: dict = resp.ticket_success['ticket']
+    summary: TicketSummary = TicketSummary.from_dict(ticket)
+    prefetcher: TicketDetailsPrefetcher = TicketDetailsPrefetcher(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, http_client=ZendeskHTTPClient()
+    )
+
+    requests_mock.get(MOCK_TICKETS_URL, json={"tickets": [ticket]})
+    requests_mock.get(MOCK_USER_URL, json=resp.user_success)
+
+    assert prefetcher.prefetch_now([summary]) == 1
+    assert requests_mock.last_request.qs == {}
+    assert requests_mock.request_history[0].qs == {"ids": ["2"]}
+    calls: int = requests_mock.call_count
+
+    td: TicketDetails = TicketDetails(api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE)
+    response: dict = td.get_ticket(ticket['url'])
+
+    assert requests_mock.call_count == calls
+    assert response['requester'] == resp.user_success['user']
+    assert prefetcher.prefetch_now([summary]) == 0
+    assert requests_mock.call_count == calls
+
+
+def test_prefetch_under_pressure(resp, requests_mock):
+    """
+    Test the prefetch_now() method, make sure nothing is fetched while the rate limit is
+    under pressure.
+    """
+    prefetcher: TicketDetailsPrefetcher = TicketDetailsPrefetcher(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, http_client=ZendeskHTTPClient()
+    )
+    prefetcher.http_client.scheduler.under_pressure = lambda: True
+
+    assert prefetcher.prefetch_now(
+        [TicketSummary.from_dict(resp.ticket_success['ticket'])]
+    ) == 0
+    assert requests_mock.call_count == 0
+
+
+def test_prefetch_bounded(resp):
+    """
+    Test the prefetch() method, make sure pages are dropped rather than queued once too
+    many are waiting.
+    """
+    prefetcher: TicketDetailsPrefetcher = TicketDetailsPrefetcher(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, http_client=ZendeskHTTPClient(),
+        max_workers=1, max_pending=1
+    )
+    release: threading.Event = threading.Event()
+    prefetcher.prefetch_now = lambda tickets: release.wait(5)
+    page: list = [TicketSummary.from_dict(resp.ticket_success['ticket'])]
+
+    assert prefetcher.prefetch(page) is True
+    assert prefetcher.prefetch(page) is False
+    release.set()
+    prefetcher.executor.shutdown(wait=True)
+
+
+def test_async_get_ticket(resp):
+    """
+    Test the AsyncTicketDetails class, make sure aget_ticket() falls back to separate
+    requests and fetches distinct users together, like get_ticket().
+    """
+    ticket: dict = dict(resp.ticket_success['ticket'], assignee_id=1910383993886)
+    assignee: dict = dict(resp.user_success['user'], id=1910383993886, name="Agent")
+    paths: list = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        if "include" in request.url.params:
+            return httpx.Response(500)
+        if request.url.path == "/api/v2/tickets/2.json":
+            return httpx.Response(200, json={"ticket": ticket})
+        if request.url.path == "/api/v2/users/show_many.json":
+            return httpx.Response(200, json={"users": [resp.user_success['user'], assignee]})
+        return httpx.Response(404, json=resp.common_404)
+
+    client: AsyncZendeskHTTPClient = AsyncZendeskHTTPClient(
+        transport=httpx.MockTransport(handler)
+    )
+    td: AsyncTicketDetails = AsyncTicketDetails(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, async_http_client=client
+    )
+    response: dict = asyncio.run(
+        td.aget_ticket("https://zccsammdu.zendesk.com/api/v2/tickets/2.json")
+    )
+
+    assert response['requester'] == resp.user_success['user']
+    assert response['assignee'] == assignee
+    assert paths == [
+        "/api/v2/tickets/2.json", "/api/v2/tickets/2.json", "/api/v2/users/show_many.json"
+    ]
+
+    client.close()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3.9
+"""
+Test the `ticket_mirror.py` file under main/upstream.
+"""
+
+import sqlite3
+import pytest
+
+from main.upstream.zendesk_common import API_URL_ROOT, AUTH_TUPLE
+from main.upstream.all_tickets import AllTickets
+from main.upstream.ticket_mirror import TicketMirror, MirrorSync, normalize_query
+
+
+@pytest.fixture()
+def mirror(tmp_path):
+    """
+    Initialize and yield an instance of the TicketMirror class on an empty database.
+    """
+    yield TicketMirror(str(tmp_path / "mirror.sqlite3"))
+
+
+def make_tickets(ids, status="open", tags=()) -> list:
+    """
+    Build mock tickets with the given ids.
+    """
+    return [
+        {"id": i, "status": status, "subject": f"ticket {i}", "tags": list(tags),
+         "updated_at": f"2021-11-28T03:{i % 60:02}:00Z"}
+        for i in ids
+    ]
+
+
+def ids_of(batch: dict) -> list:
+    """
+    Return the ids of the tickets in a batch.
+    """
+    return [t["id"] for t in batch["tickets"]]
+
+
+@pytest.fixture()
+def export_url():
+    """
+    Provide the incremental export URL.
+    """
+    yield API_URL_ROOT + "/incremental/tickets/cursor.json"
+
+
+def test_apply_export_page(mirror, tmp_path):
+    """
+    Test the apply_export_page() method, make sure it inserts, updates and deletes
+    tickets, and that the export cursor survives reopening the database.
+    """
+    mirror.apply_export_page(make_tickets(range(1, 6)), "cursor-1")
+    mirror.apply_export_page(
+        make_tickets([2], status="solved") + make_tickets([3], status="deleted"), "cursor-2"
+    )
+
+    assert mirror.count() == 4
+    assert mirror.get_batch(mirror.first_batch_url(2))["tickets"][1]["status"] == "solved"
+
+    reopened: TicketMirror = TicketMirror(str(tmp_path / "mirror.sqlite3"))
+    assert reopened.get_export_cursor() == "cursor-2"
+    assert reopened.count() == 4
+
+
+def test_get_batch_pagination(mirror):
+    """
+    Test the get_batch() method, make sure batches follow each other by ticket id through
+    their links, and an empty batch has no links.
+    """
+    mirror.apply_export_page(make_tickets(range(1, 6)), "cursor-1")
+
+    first: dict = mirror.get_batch(mirror.first_batch_url(2))
+    second: dict = mirror.get_batch(first["links"]["next"])
+    third: dict = mirror.get_batch(second["links"]["next"])
+    back: dict = mirror.get_batch(third["links"]["prev"])
+    before_first: dict = mirror.get_batch(first["links"]["prev"])
+
+    assert [t["id"] for t in first["tickets"]] == [1, 2]
+    assert [t["id"] for t in second["tickets"]] == [3, 4]
+    assert [t["id"] for t in third["tickets"]] == [5]
+    assert back == second
+    assert before_first == {"tickets": [], "links": {"prev": None, "next": None}}
+
+
+def test_sync_once(mirror, export_url, requests_mock):
+    """
+    Test the MirrorSync sync_once() method, make sure it applies export pages until the
+    end of the stream and resumes from the saved cursor.
+    """
+    requests_mock.get(export_url + "?start_time=0", complete_qs=True, json={
+        "tickets": make_tickets([1, 2]), "after_cursor": "c1", "end_of_stream": False
+    })
+    requests_mock.get(export_url + "?cursor=c1", complete_qs=True, json={
+        "tickets": make_tickets([3]), "after_cursor": "c2", "end_of_stream": True
+    })
+    requests_mock.get(export_url + "?cursor=c2", complete_qs=True, json={
+        "tickets": make_tickets([1], status="deleted"), "after_cursor": "c3",
+        "end_of_stream": True
+    })
+    sync: MirrorSync = MirrorSync(mirror, api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE)
+
+    assert not mirror.is_synced()
+    assert sync.sync_once() == 3
+    assert mirror.is_synced()
+    assert mirror.count() == 3
+    assert mirror.get_export_cursor() == "c2"
+
+    assert sync.sync_once() == 1
+    assert mirror.count() == 2
+    assert mirror.get_export_cursor() == "c3"
+
+
+def test_sync_once_failure(mirror, export_url, requests_mock):
+    """
+    Test the MirrorSync sync_once() method, make sure a failed request keeps the mirror
+    and cursor unchanged.
+    """
+    requests_mock.get(export_url, status_code=500)
+    sync: MirrorSync = MirrorSync(mirror, api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE)
+
+    assert sync.sync_once() == 0
+    assert mirror.get_export_cursor() is None
+    assert not mirror.is_synced()
+
+
+def test_is_synced(mirror, tmp_path):
+    """
+    Test the is_synced() method, make sure the mirror is only synced once a page at the
+    end of the export stream was applied, and stays so after reopening the database.
+    """
+    mirror.apply_export_page(make_tickets(range(1, 6)), "cursor-1")
+    assert not mirror.is_synced()
+
+    mirror.apply_export_page(make_tickets([6]), "cursor-2", end_of_stream=True)
+    assert mirror.is_synced()
+    assert TicketMirror(str(tmp_path / "mirror.sqlite3")).is_synced()
+
+
+def test_all_tickets_mirror_mode(mirror, requests_mock):
+    """
+    Test AllTickets with a mirror, make sure it serves and navigates batches from the
+    mirror without any upstream request.
+    """
+    mirror.apply_export_page(make_tickets(range(1, 6)), "cursor-1")
+    at: AllTickets = AllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=2, mirror=mirror
+    )
+
+    current_list, prev_batch, next_batch = at.get_batch_window()
+    assert [t.id for t in current_list] == [1, 2]
+    assert prev_batch == {}
+    assert [t.id for t in next_batch["tickets"]] == [3, 4]
+
+    assert [t.id for t in at.goto_next_batch()] == [3, 4]
+    assert [t.id for t in at.goto_next_batch()] == [5]
+    assert at.goto_next_batch() == []
+    assert [t.id for t in at.goto_prev_batch()] == [3, 4]
+
+    assert requests_mock.call_count == 0
+
+
+def test_normalize_query():
+    """
+    Test the normalize_query() function, make sure it defaults to sorting by id and
+    rejects unknown statuses and sort orders.
+    """
+    assert normalize_query() == {"status": "", "tag": "", "sort": "id"}
+    assert normalize_query("open", " vip ", "-updated_at") == \
+        {"status": "open", "tag": "vip", "sort": "-updated_at"}
+    with pytest.raises(ValueError):
+        normalize_query(status="unknown")
+    with pytest.raises(ValueError):
+        normalize_query(sort="subject")
+
+
+def test_get_batch_filter(mirror):
+    """
+    Test the get_batch() method with filters, make sure batches only hold tickets of the
+    given status and tag, and their links keep the filters.
+    """
+    mirror.apply_export_page(
+        make_tickets([1, 2], tags=["vip"]) + make_tickets([3, 4], status="solved")
+        + make_tickets([5, 6, 7], status="solved", tags=["vip", "billing"]),
+        "cursor-1"
+    )
+
+    solved: dict = mirror.get_batch(mirror.first_batch_url(3, normalize_query("solved")))
+    vip: dict = mirror.get_batch(mirror.first_batch_url(3, normalize_query(tag="vip")))
+    solved_vip: dict = mirror.get_batch(
+        mirror.first_batch_url(2, normalize_query("solved", "vip"))
+    )
+
+    assert ids_of(solved) == [3, 4, 5]
+    assert ids_of(mirror.get_batch(solved["links"]["next"])) == [6, 7]
+    assert ids_of(vip) == [1, 2, 5]
+    assert ids_of(mirror.get_batch(vip["links"]["next"])) == [6, 7]
+    assert ids_of(solved_vip) == [5, 6]
+    assert ids_of(mirror.get_batch(solved_vip["links"]["next"])) == [7]
+
+    # updating a ticket replaces its tags, and deleting it removes them
+    mirror.apply_export_page(
+        make_tickets([5], status="solved") + make_tickets([6], status="deleted"), None
+    )
+    assert ids_of(mirror.get_batch(
+        mirror.first_batch_url(2, normalize_query("solved", "vip"))
+    )) == [7]
+
+
+def test_get_batch_sort_updated_at(mirror):
+    """
+    Test the get_batch() method sorted by updated_at, make sure batches follow each
+    other in both directions, with ties broken by id.
+    """
+    tickets: list = make_tickets(range(1, 6))
+    tickets[0]["updated_at"] = "2021-12-01T00:00:00Z"
+    tickets[3]["updated_at"] = tickets[2]["updated_at"]
+    mirror.apply_export_page(tickets, "cursor-1")
+
+    first: dict = mirror.get_batch(
+        mirror.first_batch_url(2, normalize_query(sort="-updated_at"))
+    )
+    second: dict = mirror.get_batch(first["links"]["next"])
+    third: dict = mirror.get_batch(second["links"]["next"])
+
+    assert ids_of(first) == [1, 5]
+    assert ids_of(second) == [4, 3]
+    assert ids_of(third) == [2]
+    assert mirror.get_batch(third["links"]["prev"]) == second
+    assert ids_of(mirror.get_batch(first["links"]["prev"])) == []
+
+    ascending: dict = mirror.get_batch(
+        mirror.first_batch_url(3, normalize_query(sort="updated_at"))
+    )
+    assert ids_of(ascending) == [2, 3, 4]
+    assert ids_of(mirror.get_batch(ascending["links"]["next"])) == [5, 1]
+
+
+@pytest.mark.parametrize("query", [
+    normalize_query(sort="-id"),
+    normalize_query(status="open"),
+    normalize_query(status="open", sort="-updated_at"),
+    normalize_query(tag="vip", sort="updated_at"),
+    normalize_query(status="open", tag="vip", sort="-updated_at"),
+])
+def test_batch_query_plan(mirror, query):
+    """
+    Test that every filter and sort order is served by a scan of an index in order,
+    without sorting the matching tickets.
+    """
+    sql, params = mirror._batch_query(mirror.first_batch_url(25, query))
+    plan: str = " ".join(
+        row[-1] for row in mirror._connect().execute("EXPLAIN QUERY PLAN " + sql, params)
+    )
+
+    assert "TEMP B-TREE" not in plan
+    if query["status"] or query["tag"]:
+        assert "USING" in plan and "SCAN" not in plan
+
+
+def test_tags_backfill(tmp_path):
+    """
+    Test opening a mirror created without the ticket_tags table, make sure the tags of
+    its tickets are indexed.
+    """
+    path: str = str(tmp_path / "mirror.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE tickets (id INTEGER PRIMARY KEY, updated_at TEXT, status TEXT, "
+            "data TEXT NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO tickets VALUES (1, '2021-11-28T03:01:00Z', 'open', "
+            "'{\"id\": 1, \"tags\": [\"vip\"]}')"
+        )
+
+    mirror: TicketMirror = TicketMirror(path)
+
+    vip: dict = mirror.get_batch(mirror.first_batch_url(25, normalize_query(tag="vip")))
+    assert ids_of(vip) == [1]
+
+
+def test_all_tickets_set_query(mirror):
+    """
+    Test the AllTickets set_query() method, make sure a new query starts over from its
+    first batch and is kept in the navigation state, and that it requires a mirror.
+    """
+    mirror.apply_export_page(
+        make_tickets(range(1, 6)) + make_tickets(range(6, 9), status="pending"), "cursor-1"
+    )
+    at: AllTickets = AllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=2, mirror=mirror
+    )
+    at.goto_next_batch()
+
+    assert at.set_query(normalize_query(status="pending", sort="-id"))
+    assert [t.id for t in at.get_current_batch()] == [8, 7]
+    assert [t.id for t in at.goto_next_batch()] == [6]
+
+    # the same query keeps the position, and is restored along with the state
+    assert not at.set_query(normalize_query(status="pending", sort="-id"))
+    resumed: AllTickets = AllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=2, mirror=mirror,
+        state=at.get_state()
+    )
+    assert [t.id for t in resumed.get_current_batch()] == [6]
+    assert resumed.query == normalize_query(status="pending", sort="-id")
+
+    no_mirror: AllTickets = AllTickets(api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE)
+    no_mirror.set_query(normalize_query())
+    with pytest.raises(ValueError):
+        no_mirror.set_query(normalize_query(status="open"))
+
+
+def test_all_tickets_mirror_iter_tickets(mirror, requests_mock):
+    """
+    Test AllTickets.iter_tickets() with a mirror, make sure it walks the full tickets of
+    the current query without any upstream request.
+    """
+    mirror.apply_export_page(
+        make_tickets(range(1, 6)) + make_tickets(range(6, 9), status="solved"), "c1"
+    )
+    at: AllTickets = AllTickets(
+        api_url_root=API_URL_ROOT, auth_tuple=AUTH_TUPLE, page_size=2, mirror=mirror
+    )
+    at.set_query(normalize_query("open"))
+
+    assert list(at.iter_tickets(page_size=2)) == make_tickets(range(1, 6))
+    assert requests_mock.call_count == 0
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3.9
+"""
+Test the `ticket_summary.py` file under main/upstream.
+"""
+
+import pytest
+
+from main.upstream.ticket_summary import TicketSummary, summarize_batch
+
+
+@pytest.fixture()
+def ticket():
+    """
+    Provide a ticket as returned by the Zendesk API.
+    """
+    yield {
+        "url": "https://zccsammdu.zendesk.com/api/v2/tickets/1.json",
+        "id": 1,
+        "via": {"channel": "sample_ticket", "source": {"from": {}, "to": {}, "rel": None}},
+        "subject": "Sample ticket: Meet the ticket",
+        "description": "Hi there,\n\nI'm sending an email because I'm having a problem.",
+        "status": "open",
+        "requester_id": 1524028554601,
+        "tags": ["sample", "support", "zendesk"],
+        "custom_fields": [],
+        "updated_at": "2021-11-28T03:59:12Z",
+    }
+
+
+def test_from_dict(ticket):
+    """
+    Test the from_dict() method, make sure it keeps only the list view fields.
+    """
+    summary: TicketSummary = TicketSummary.from_dict(ticket)
+
+    assert summary == TicketSummary(
+        id=1,
+        url="https://zccsammdu.zendesk.com/api/v2/tickets/1.json",
+        subject="Sample ticket: Meet the ticket",
+        status="open",
+        tags=("sample", "support", "zendesk"),
+        updated_at="2021-11-28T03:59:12Z",
+    )
+    assert not hasattr(summary, "__dict__")
+
+
+def test_from_dict_missing_fields():
+    """
+    Test the from_dict() method, make sure missing or null fields become empty values.
+    """
+    summary: TicketSummary = TicketSummary.from_dict({"id": 2, "subject": None})
+
+    assert summary == TicketSummary(
+        id=2, url="", subject="", status="", tags=(), updated_at=""
+    )
+
+
+def test_to_dict(ticket):
+    """
+    Test the to_dict() method, make sure it returns the list view fields of the ticket.
+    """
+    assert TicketSummary.from_dict(ticket).to_dict() == {
+        key: ticket[key] for key in ("id", "url", "subject", "status", "tags", "updated_at")
+    }
+
+
+def test_summarize_batch(ticket):
+    """
+    Test the summarize_batch() function, make sure it summarizes the tickets and keeps
+    the links of the batch.
+    """
+    links: dict = {"prev": "prev-url", "next": "next-url"}
+    batch: dict = summarize_batch({"tickets": [ticket], "meta": {}, "links": links})
+
+    assert batch == {"tickets": [TicketSummary.from_dict(ticket)], "links": links}
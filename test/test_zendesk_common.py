@@ -42,3 +42,63 @@ def test_zendesk_common_auth(variables):
 
     from main.upstream.zendesk_common import AUTH_TUPLE
     assert AUTH_TUPLE == (f"{email}/token", token)
+
+
+def test_zendesk_common_url_root_override(monkeypatch):
+    """
+    Set the ZENDESK_API_URL_ROOT environment variable, and see if it replaces the URL root
+    derived from the subdomain.
+    """
+    import importlib
+    import main.upstream.zendesk_common as zendesk_common
+
+    monkeypatch.setenv("ZENDESK_API_URL_ROOT", "http://127.0.0.1:8765/api/v2")
+    assert importlib.reload(zendesk_common).API_URL_ROOT == "http://127.0.0.1:8765/api/v2"
+
+    monkeypatch.delenv("ZENDESK_API_URL_ROOT")
+    assert importlib.reload(zendesk_common).API_URL_ROOT.endswith(".zendesk.com/api/v2")
+
+
+def test_zendesk_config_from_env():
+    """
+    Read the configuration from a given mapping instead of the process's environment,
+    and see if the optional tuning falls back to its defaults, and a missing required
+    variable raises an EnvironmentError.
+    """
+    from main.upstream.zendesk_common import ZendeskConfig
+
+    environ: dict = {
+        "ZENDESK_API_SUBDOMAIN": "example",
+        "ZENDESK_API_EMAIL": "agent@example.com",
+        "ZENDESK_API_TOEKEN": "token",
+        "ZENDESK_API_READ_TIMEOUT": "5",
+    }
+    config: ZendeskConfig = ZendeskConfig.from_env(environ)
+    assert config.api_url_root == "https://example.zendesk.com/api/v2"
+    assert config.auth_tuple == ("agent@example.com/token", "token")
+    assert config.read_timeout == 5.0
+    assert config.pool_maxsize == 10
+
+    del environ["ZENDESK_API_TOEKEN"]
+    with pytest.raises(EnvironmentError):
+        ZendeskConfig.from_env(environ)
+
+
+def test_zendesk_common_lazy(monkeypatch):
+    """
+    Remove the required environment variables, and see if the module still imports and
+    serves the optional tuning, raising an EnvironmentError only when the URL root is
+    accessed.
+    """
+    import importlib
+    import main.upstream.zendesk_common as zendesk_common
+
+    monkeypatch.delenv("ZENDESK_API_SUBDOMAIN")
+    monkeypatch.setenv("ZENDESK_API_POOL_MAXSIZE", "4")
+    reloaded = importlib.reload(zendesk_common)
+    assert reloaded.POOL_MAXSIZE == 4
+    with pytest.raises(EnvironmentError):
+        reloaded.API_URL_ROOT
+
+    monkeypatch.undo()
+    importlib.reload(zendesk_common)